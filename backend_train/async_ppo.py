@@ -0,0 +1,329 @@
+import multiprocessing as mp
+import queue
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3 import PPO
+from stable_baselines3.common.env_util import is_wrapped
+from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv, VecFrameStack, VecNormalize
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper
+
+
+def _actor(actor_id, env_fns_wrapper, spec_wrapper, params, obs_stats, version, lock, rollouts, stop):
+    th.set_num_threads(1)
+    policy_class, policy_kwargs, n_stack, n_steps, normalize = spec_wrapper.var
+    envs = VecFrameStack(DummyVecEnv(env_fns_wrapper.var), n_stack)
+    policy = policy_class(envs.observation_space, envs.action_space, lambda _: 0.0, **policy_kwargs)
+    policy.set_training_mode(False)
+    flat_params = np.frombuffer(params, dtype=np.float32)
+    stats = np.frombuffer(obs_stats, dtype=np.float64).reshape(2, -1)
+    clip_obs, epsilon = normalize
+
+    def put(item):
+        # Bounded queue: actors wait here while the learner is behind, which bounds policy lag
+        while not stop.is_set():
+            try:
+                rollouts.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    obs = envs.reset()
+    if not put(("reset", actor_id, obs)):
+        return
+    k = envs.num_envs
+    episode_starts = np.ones(k, dtype=bool)
+    seen = -1
+    while not stop.is_set():
+        if version.value != seen:
+            with lock:
+                seen = version.value
+                th.nn.utils.vector_to_parameters(th.as_tensor(flat_params.copy()), policy.parameters())
+                mean, var = stats.copy()
+
+        chunk = {
+            "obs": np.zeros((n_steps, k, *obs.shape[1:]), dtype=obs.dtype),
+            "actions": np.zeros((n_steps, k), dtype=np.int64),
+            "rewards": np.zeros((n_steps, k), dtype=np.float32),
+            "episode_starts": np.zeros((n_steps, k), dtype=bool),
+            "log_probs": np.zeros((n_steps, k), dtype=np.float32),
+            "truncated": [],
+            "episodes": [],
+            "version": seen,
+        }
+        for t in range(n_steps):
+            obs_in = obs if clip_obs is None else np.clip((obs - mean) / np.sqrt(var + epsilon), -clip_obs, clip_obs)
+            with th.no_grad():
+                actions, _, log_probs = policy(th.as_tensor(obs_in, dtype=th.float32))
+            actions = actions.numpy()
+            new_obs, rewards, dones, infos = envs.step(actions)
+            chunk["obs"][t] = obs
+            chunk["actions"][t] = actions
+            chunk["rewards"][t] = rewards
+            chunk["episode_starts"][t] = episode_starts
+            chunk["log_probs"][t] = log_probs.numpy()
+            for e in np.flatnonzero(dones):
+                if infos[e].get("TimeLimit.truncated", False):
+                    chunk["truncated"].append((t, e, infos[e]["terminal_observation"]))
+                if "episode" in infos[e]:
+                    chunk["episodes"].append({"episode": infos[e]["episode"]})
+            obs = new_obs
+            episode_starts = dones
+        chunk["last_obs"] = obs
+        chunk["dones"] = episode_starts
+        if not put(("rollout", actor_id, chunk)):
+            break
+    envs.close()
+
+
+class AsyncActorPool(VecEnv):
+    """
+    Actor processes that keep collecting rollouts while the learner runs its PPO update.
+
+    Each actor steps ``envs_per_actor`` envs (frame-stacked inside the actor) with its own CPU
+    copy of the policy and sends ``n_steps``-long chunks through a bounded queue. Weights and
+    observation normalization stats are published through shared memory, so actors pick up
+    new parameters at the start of their next chunk without ever blocking the learner.
+
+    Only ``AsyncPPO`` drives it: it is a ``VecEnv`` so that PPO, ``VecNormalize`` and the
+    callbacks see the usual spaces and env count, but it cannot be stepped directly.
+    """
+
+    def __init__(self, env_fns, envs_per_actor=1, n_stack=4, start_method=None):
+        assert len(env_fns) % envs_per_actor == 0, "env count must be a multiple of envs_per_actor"
+        self.env_fns = env_fns
+        self.envs_per_actor = envs_per_actor
+        self.n_stack = n_stack
+        self.num_actors = len(env_fns) // envs_per_actor
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self.ctx = mp.get_context(start_method)
+        self.processes = []
+        self.started = False
+        self.closed = False
+        # Local copy of one env, only for spaces and attribute queries
+        self.template = VecFrameStack(DummyVecEnv(env_fns[:1]), n_stack)
+        super().__init__(len(env_fns), self.template.observation_space, self.template.action_space)
+
+    def start(self, policy, n_steps, normalizer=None):
+        if self.started:
+            return
+        flat = th.nn.utils.parameters_to_vector(policy.parameters()).detach().cpu().numpy()
+        obs_size = int(np.prod(self.observation_space.shape))
+        self.lock = self.ctx.Lock()
+        # Raw shared arrays guarded by one lock, so weights and stats always change together
+        self.params = self.ctx.Array("f", flat.size, lock=False)
+        self.obs_stats = self.ctx.Array("d", 2 * obs_size, lock=False)
+        self.version = self.ctx.Value("q", -1, lock=False)
+        self.rollouts = self.ctx.Queue(maxsize=self.num_actors)
+        self.stop = self.ctx.Event()
+        self.publish(policy, normalizer)
+
+        normalize = (normalizer.clip_obs, normalizer.epsilon) if normalizer is not None and normalizer.norm_obs else (None, None)
+        spec = CloudpickleWrapper((type(policy), _policy_kwargs(policy), self.n_stack, n_steps, normalize))
+        k = self.envs_per_actor
+        for actor_id in range(self.num_actors):
+            block = CloudpickleWrapper(self.env_fns[actor_id * k:(actor_id + 1) * k])
+            args = (actor_id, block, spec, self.params, self.obs_stats, self.version, self.lock, self.rollouts, self.stop)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = self.ctx.Process(target=_actor, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+        self.started = True
+        self.pending = []
+        self.initial_obs = None
+
+    def publish(self, policy, normalizer=None):
+        flat = th.nn.utils.parameters_to_vector(policy.parameters()).detach().cpu().numpy()
+        with self.lock:
+            np.frombuffer(self.params, dtype=np.float32)[:] = flat
+            if normalizer is not None and normalizer.norm_obs:
+                np.frombuffer(self.obs_stats, dtype=np.float64)[:] = np.concatenate([normalizer.obs_rms.mean.ravel(), normalizer.obs_rms.var.ravel()])
+            self.version.value += 1
+        return self.version.value
+
+    def reset(self):
+        assert self.started, "AsyncActorPool is started by AsyncPPO.learn()"
+        if self.initial_obs is None:
+            first = {}
+            while len(first) < self.num_actors:
+                kind, actor_id, data = self.rollouts.get()
+                if kind == "reset":
+                    first[actor_id] = data
+                else:
+                    self.pending.append((actor_id, data))
+            self.initial_obs = np.concatenate([first[a] for a in range(self.num_actors)])
+        # Actors never stop between learn() calls, so later resets just repeat the first one
+        return self.initial_obs.copy()
+
+    def get_rollout(self):
+        if self.pending:
+            return self.pending.pop(0)
+        kind, actor_id, data = self.rollouts.get()
+        return actor_id, data
+
+    def step_async(self, actions):
+        raise NotImplementedError("AsyncActorPool is stepped by its actor processes")
+
+    def step_wait(self):
+        raise NotImplementedError("AsyncActorPool is stepped by its actor processes")
+
+    def close(self):
+        if self.closed:
+            return
+        if self.started:
+            self.stop.set()
+            for process in self.processes:
+                # Drain so actors blocked on a full queue can see the stop flag
+                while process.is_alive():
+                    try:
+                        self.rollouts.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                process.join()
+        self.template.close()
+        self.closed = True
+
+    def get_attr(self, attr_name, indices=None):
+        return [self.template.get_attr(attr_name)[0] for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        raise NotImplementedError("Attributes of actor-owned envs cannot be set")
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        raise NotImplementedError("Methods of actor-owned envs cannot be called")
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        wrapped = is_wrapped(self.template.venv.envs[0], wrapper_class)
+        return [wrapped for _ in self._get_indices(indices)]
+
+
+def _policy_kwargs(policy):
+    # Constructor arguments of an ActorCriticPolicy, as passed by OnPolicyAlgorithm._setup_model
+    kwargs = dict(policy._get_constructor_parameters())
+    for key in ("observation_space", "action_space", "lr_schedule"):
+        kwargs.pop(key, None)
+    return kwargs
+
+
+class AsyncPPO(PPO):
+    """
+    PPO that trains on rollouts collected concurrently by an ``AsyncActorPool``.
+
+    While ``train()`` runs, actors keep stepping their envs with the previous weights, so the
+    next rollout is mostly ready when the update finishes. Data is at most a few policy
+    versions old; it is corrected the way decoupled PPO does it: values and advantages are
+    recomputed with the current critic, the clipping ratio is taken against the current
+    (proximal) policy, and advantages are weighted by the behaviour importance ratio
+    ``pi_current / pi_actor`` truncated at ``max_is_weight``. Chunks more than
+    ``max_policy_lag`` versions old are dropped.
+
+    ``env`` must be an ``AsyncActorPool``, optionally wrapped in ``VecNormalize``; its
+    statistics are updated here from the raw observations and rewards the actors send back.
+    """
+
+    def __init__(self, policy, env, max_policy_lag=4, max_is_weight=2.0, **kwargs):
+        self.max_policy_lag = max_policy_lag
+        self.max_is_weight = max_is_weight
+        super().__init__(policy, env, **kwargs)
+        self.pool = self.env.venv if isinstance(self.env, VecNormalize) else self.env
+        assert isinstance(self.pool, AsyncActorPool), "AsyncPPO collects rollouts from an AsyncActorPool"
+        assert isinstance(self.action_space, spaces.Discrete), "AsyncPPO only supports discrete actions"
+        self.returns = np.zeros((self.pool.num_actors, self.pool.envs_per_actor))
+
+    def _excluded_save_params(self):
+        # Saved zips load as a plain PPO; the actor processes are not part of the model
+        return super()._excluded_save_params() + ["pool", "returns"]
+
+    def _setup_learn(self, *args, **kwargs):
+        self.pool.start(self.policy, self.n_steps, self._vec_normalize_env)
+        return super()._setup_learn(*args, **kwargs)
+
+    def _normalize_chunk(self, actor_id, chunk):
+        # Same statistics VecNormalize would gather if it saw these steps, updated once per chunk
+        norm = self._vec_normalize_env
+        rewards = chunk["rewards"]
+        if norm is None:
+            return chunk["obs"], rewards, chunk["last_obs"], lambda obs: obs
+        if norm.training and norm.norm_obs:
+            norm.obs_rms.update(chunk["obs"].reshape(-1, *chunk["obs"].shape[2:]))
+        if norm.training and norm.norm_reward:
+            dones = np.concatenate([chunk["episode_starts"][1:], chunk["dones"][None]])
+            returns = np.zeros_like(rewards, dtype=np.float64)
+            ret = self.returns[actor_id]
+            for t in range(len(rewards)):
+                ret = ret * norm.gamma + rewards[t]
+                returns[t] = ret
+                ret = np.where(dones[t], 0.0, ret)
+            self.returns[actor_id] = ret
+            norm.ret_rms.update(returns.reshape(-1))
+        return norm.normalize_obs(chunk["obs"]), norm.normalize_reward(rewards), norm.normalize_obs(chunk["last_obs"]), norm.normalize_obs
+
+    def collect_rollouts(self, env, callback, rollout_buffer, n_rollout_steps):
+        version = self.pool.publish(self.policy, self._vec_normalize_env)
+        self.policy.set_training_mode(False)
+        rollout_buffer.reset()
+        callback.on_rollout_start()
+
+        k = self.pool.envs_per_actor
+        n_steps = n_rollout_steps
+        last_values = th.zeros(self.n_envs)
+        dones = np.zeros(self.n_envs, dtype=bool)
+        is_weights = np.zeros((n_steps, self.n_envs), dtype=np.float32)
+        infos, lags, dropped = [], [], 0
+        filled = 0
+        while filled < self.pool.num_actors:
+            actor_id, chunk = self.pool.get_rollout()
+            lag = version - chunk["version"]
+            # Dropped before normalizing, so stale chunks never reach obs_rms / ret_rms either
+            if lag > self.max_policy_lag:
+                dropped += 1
+                continue
+            lags.append(lag)
+            obs, rewards, last_obs, normalize_obs = self._normalize_chunk(actor_id, chunk)
+
+            cols = slice(filled * k, (filled + 1) * k)
+            obs_tensor = th.as_tensor(obs.reshape(n_steps * k, -1), dtype=th.float32, device=self.device)
+            actions = th.as_tensor(chunk["actions"].reshape(-1), device=self.device)
+            with th.no_grad():
+                values, log_probs, _ = self.policy.evaluate_actions(obs_tensor, actions)
+                last_values[cols] = self.policy.predict_values(th.as_tensor(last_obs, dtype=th.float32, device=self.device)).flatten().cpu()
+                rewards = rewards.astype(np.float32)
+                for t, e, terminal_obs in chunk["truncated"]:
+                    # Handle timeout by bootstrapping with value function, as in OnPolicyAlgorithm
+                    terminal = th.as_tensor(normalize_obs(terminal_obs)[None], dtype=th.float32, device=self.device)
+                    rewards[t, e] += self.gamma * self.policy.predict_values(terminal).item()
+            log_probs = log_probs.cpu().numpy().reshape(n_steps, k)
+
+            rollout_buffer.observations[:, cols] = obs.reshape(n_steps, k, *rollout_buffer.obs_shape)
+            rollout_buffer.actions[:, cols] = chunk["actions"].reshape(n_steps, k, 1)
+            rollout_buffer.rewards[:, cols] = rewards
+            rollout_buffer.episode_starts[:, cols] = chunk["episode_starts"]
+            rollout_buffer.values[:, cols] = values.cpu().numpy().reshape(n_steps, k)
+            rollout_buffer.log_probs[:, cols] = log_probs
+            is_weights[:, cols] = np.minimum(np.exp(log_probs - chunk["log_probs"]), self.max_is_weight)
+            dones[cols] = chunk["dones"]
+            infos.extend(chunk["episodes"])
+            filled += 1
+
+        for _ in range(n_steps):
+            self.num_timesteps += self.n_envs
+            callback.update_locals(locals())
+            if not callback.on_step():
+                return False
+        self._update_info_buffer(infos)
+
+        rollout_buffer.pos = rollout_buffer.buffer_size
+        rollout_buffer.full = True
+        rollout_buffer.compute_returns_and_advantage(last_values=last_values, dones=dones)
+        # Returns stay the critic's targets; only the policy-gradient signal is importance weighted
+        rollout_buffer.advantages *= is_weights
+
+        self.logger.record("async/policy_lag", float(np.mean(lags)))
+        self.logger.record("async/dropped_chunks", dropped)
+        self.logger.record("async/is_weight_mean", float(is_weights.mean()))
+        callback.update_locals(locals())
+        callback.on_rollout_end()
+        return True
@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import platform
+import time
+
+from model_hash import content_hash
+
+DEFAULT_CACHE = "models/autotune.json"
+# Bump when the measurement changes, so cached layouts are re-measured
+AUTOTUNE_VERSION = 2
+
+
+def host_fingerprint():
+    # Layouts are only reused on the same machine
+    import torch as th
+    return {"host": platform.node(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "torch_threads": th.get_num_threads()}
+
+
+def candidate_layouts(vec_env_type, total_envs, cpu_count=None):
+    """
+    (num_cpu, envs_per_worker) splits of ``total_envs`` worth measuring: every divisor up to the
+    CPU count as the process count. The total is never changed, since it sets PPO's rollout size
+    (n_steps * num_envs) and with it the learning dynamics and the update cost.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    # SubprocVecEnv runs one env per process, so there is nothing to choose
+    if vec_env_type == "subproc":
+        return [(total_envs, 1)]
+    return [(w, total_envs // w) for w in range(1, total_envs + 1) if total_envs % w == 0 and w <= cpu_count]
+
+
+def measure_layout(vec_env_type, num_cpu, envs_per_worker, seconds=2.0, seed=0, decision_interval=1):
+    """
+    Steps/s of the training pipeline (envs, frame stack, normalization) with a PPO policy
+    forward pass per step, as in collect_rollouts.
+    """
+    import numpy as np
+    import torch as th
+    from stable_baselines3.common.policies import ActorCriticPolicy
+    from stable_baselines3.common.vec_env import VecFrameStack, VecNormalize
+    from train_fast import make_vec_env
+
+    env = VecNormalize(VecFrameStack(make_vec_env(vec_env_type, num_cpu, envs_per_worker, seed=seed,
+                                                  decision_interval=decision_interval), n_stack=4), clip_obs=10.)
+    policy = ActorCriticPolicy(env.observation_space, env.action_space, lambda _: 0.0, activation_fn=th.nn.ReLU)
+    policy.set_training_mode(False)
+
+    def step(obs):
+        with th.no_grad():
+            actions, _, _ = policy(th.as_tensor(obs, dtype=th.float32))
+        return env.step(actions.numpy())[0]
+
+    obs = env.reset()
+    for _ in range(10):
+        obs = step(obs)
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        obs = step(obs)
+        calls += 1
+    elapsed = time.perf_counter() - start
+    env.close()
+    return calls * env.num_envs * decision_interval / elapsed if calls else float(np.nan)
+
+
+def autotune(vec_env_type, layouts, seconds=2.0, decision_interval=1, verbose=1):
+    """Measure every (num_cpu, envs_per_worker) layout; returns the results, fastest first."""
+    results = []
+    for num_cpu, envs_per_worker in layouts:
+        sps = measure_layout(vec_env_type, num_cpu, envs_per_worker, seconds, decision_interval=decision_interval)
+        results.append({"num_cpu": num_cpu, "envs_per_worker": envs_per_worker, "steps_per_sec": sps})
+        if verbose:
+            print(f"  {num_cpu:>3} workers x {envs_per_worker:>2} envs {sps:>12,.0f} steps/s")
+    return sorted(results, key=lambda r: r["steps_per_sec"], reverse=True)
+
+
+def tuned_layout(vec_env_type, default=(10, 1), cache_path=DEFAULT_CACHE, retune=False, seconds=2.0, decision_interval=1,
+                 verbose=1):
+    """
+    Fastest ``(num_cpu, envs_per_worker)`` split of the ``default`` layout's env count on this
+    machine: read from ``cache_path`` if this host measured it before, else measured now and
+    saved there. The batched engine runs in one process and subproc one env per process, so
+    both keep ``default``; "async" actors use the shared memory measurement.
+    """
+    total_envs = default[0] * default[1]
+    measured_type = "shared_memory" if vec_env_type == "async" else vec_env_type
+    # The configured layout is measured too, even if it oversubscribes the CPUs
+    layouts = sorted(set(candidate_layouts(measured_type, total_envs)) | {tuple(default)})
+    if vec_env_type == "batched" or len(layouts) < 2:
+        if verbose and vec_env_type == "subproc":
+            print("Auto-tune: subproc runs one env per process, nothing to tune; "
+                  "use shared_memory to let the tuner pick envs per worker")
+        return default
+    host = host_fingerprint()
+    key = content_hash(AUTOTUNE_VERSION, host, measured_type, layouts, decision_interval)
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+    if key not in cache or retune:
+        if verbose:
+            print(f"Auto-tuning the {measured_type} layout of {total_envs} envs on {host['cpu_count']} CPUs...")
+        results = autotune(measured_type, layouts, seconds, decision_interval, verbose)
+        cache[key] = {"vec_env": measured_type, "host": host, "total_envs": total_envs, "decision_interval": decision_interval,
+                      "timestamp": time.time(), "results": results}
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            tmp = cache_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp, cache_path)
+    best = cache[key]["results"][0]
+    if verbose:
+        print(f"Auto-tune: {best['num_cpu']} workers x {best['envs_per_worker']} envs "
+              f"({best['steps_per_sec']:,.0f} steps/s, {cache_path or 'not saved'})")
+    return best["num_cpu"], best["envs_per_worker"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker / envs-per-worker layouts and save the fastest.")
+    parser.add_argument("--vec-env", choices=["subproc", "shared_memory", "async"], default="shared_memory")
+    parser.add_argument("--envs", type=int, default=10, help="total env count to split between processes")
+    parser.add_argument("--seconds", type=float, default=2.0, help="measurement time per layout")
+    parser.add_argument("--decision-interval", type=int, default=1)
+    parser.add_argument("--cache", default=DEFAULT_CACHE)
+    parser.add_argument("--retune", action="store_true", help="measure again even if this host has a saved layout")
+    args = parser.parse_args()
+    tuned_layout(args.vec_env, default=(args.envs, 1), cache_path=args.cache, retune=args.retune, seconds=args.seconds,
+                 decision_interval=args.decision_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+from gymnasium.wrappers import TimeLimit
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecFrameStack, VecMonitor, VecNormalize
+
+from envs.fighting_env import FightingGameEnv
+from envs.batched_fighting_env import BatchedFightingEnv
+from envs.fused_vec_env import FusedVecEnv
+from envs.shm_vec_env import SharedMemoryVecEnv
+
+# Methods of FightingGameEnv timed individually by the phase breakdown
+PHASES = ("_apply_action", "_apply_physics", "_resolve_combat", "_update_stamina", "_get_obs", "_opponent_action")
+
+DEFAULT_OUTPUT = "benchmarks/env_bench.json"
+DEFAULT_BASELINE = "benchmarks/env_baseline.json"
+
+
+def make_env(rank, seed=0, monitor=True):
+    def _init():
+        env = FightingGameEnv()
+        if monitor:
+            env = TimeLimit(env, max_episode_steps=800)
+            env = Monitor(env)
+        env.reset(seed=seed + rank)
+        return env
+    return _init
+
+
+def bench_gym_env(env, steps, seed):
+    env.reset(seed=seed)
+    actions = np.random.default_rng(seed).integers(0, 9, size=steps).tolist()
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def bench_vec_env(venv, steps, seed, min_calls=200):
+    n = venv.num_envs
+    calls = max(steps // n, min_calls)
+    actions = np.random.default_rng(seed).integers(0, 9, size=(calls, n))
+    venv.reset()
+    for i in range(min(calls, 10)):
+        venv.step(actions[i])
+    start = time.perf_counter()
+    for i in range(calls):
+        venv.step(actions[i])
+    elapsed = time.perf_counter() - start
+    venv.close()
+    return calls * n / elapsed
+
+
+def run_setups(steps, workers, envs_per_worker, batched_sizes, seed, repeats):
+    setups = {
+        "bare": lambda: bench_gym_env(FightingGameEnv(), steps, seed),
+        "timelimit_monitor": lambda: bench_gym_env(Monitor(TimeLimit(FightingGameEnv(), max_episode_steps=800)), steps, seed),
+        "dummy_framestack_normalize": lambda: bench_vec_env(
+            VecNormalize(VecFrameStack(DummyVecEnv([make_env(0, seed)]), n_stack=4), norm_obs=True, norm_reward=True, clip_obs=10.),
+            steps, seed),
+        "dummy_fused": lambda: bench_vec_env(
+            FusedVecEnv(DummyVecEnv([make_env(0, seed, monitor=False)]), n_stack=4, clip_obs=10.), steps, seed),
+    }
+    for n in workers:
+        setups[f"subproc_{n}"] = lambda n=n: bench_vec_env(SubprocVecEnv([make_env(i, seed) for i in range(n)]), steps, seed)
+    for n in workers:
+        k = envs_per_worker
+        setups[f"shared_memory_{n}x{k}"] = lambda n=n, k=k: bench_vec_env(
+            SharedMemoryVecEnv([make_env(i, seed) for i in range(n * k)], envs_per_worker=k), steps, seed)
+    for n in batched_sizes:
+        setups[f"batched_{n}"] = lambda n=n: bench_vec_env(BatchedFightingEnv(n, seed=seed), steps, seed)
+        # Full training pipeline on top of the batched env: separate wrappers vs. FusedVecEnv
+        setups[f"batched_{n}_wrapped"] = lambda n=n: bench_vec_env(
+            VecNormalize(VecFrameStack(VecMonitor(BatchedFightingEnv(n, seed=seed)), n_stack=4), clip_obs=10.), steps, seed)
+        setups[f"batched_{n}_fused"] = lambda n=n: bench_vec_env(FusedVecEnv(BatchedFightingEnv(n, seed=seed), n_stack=4, clip_obs=10.), steps, seed)
+
+    results = {}
+    for name, run in setups.items():
+        # Best of several runs: slowdowns from other load on the box only ever lower the number
+        sps = max(run() for _ in range(repeats))
+        results[name] = {"steps_per_sec": sps}
+        print(f"{name:<30} {sps:>12,.0f} steps/s")
+    return results
+
+
+def time_phases(steps, seed):
+    env = FightingGameEnv()
+    totals = dict.fromkeys(PHASES, 0.0)
+
+    def timed(name, fn):
+        def wrapper(*args):
+            start = time.perf_counter()
+            out = fn(*args)
+            totals[name] += time.perf_counter() - start
+            return out
+        return wrapper
+
+    # Shadow the bound methods on this instance only, so step() picks up the timed versions
+    for name in PHASES:
+        setattr(env, name, timed(name, getattr(env, name)))
+
+    env.reset(seed=seed)
+    for name in PHASES:
+        totals[name] = 0.0
+    actions = np.random.default_rng(seed).integers(0, 9, size=steps).tolist()
+    step_total = 0.0
+    for action in actions:
+        start = time.perf_counter()
+        _, _, terminated, truncated, _ = env.step(action)
+        step_total += time.perf_counter() - start
+        if terminated or truncated:
+            env.reset()
+
+    phases = {name: {"us_per_step": totals[name] / steps * 1e6, "share": totals[name] / step_total} for name in PHASES}
+    # Difference of noisy timings: clamped, since the timer overhead can exceed what is left
+    other = max(step_total - sum(totals.values()), 0.0)
+    phases["other"] = {"us_per_step": other / steps * 1e6, "share": other / step_total}
+    phases["step_total"] = {"us_per_step": step_total / steps * 1e6, "share": 1.0}
+    for name, p in phases.items():
+        print(f"{name:<30} {p['us_per_step']:>9.2f} us/step {100 * p['share']:>6.1f}%")
+    return phases
+
+
+def compare(results, baseline, tolerance):
+    # Only throughput gates the check; phase timings are too noisy and are reported for context
+    regressions = []
+    for name, r in results["setups"].items():
+        base = baseline.get("setups", {}).get(name)
+        if base is None:
+            continue
+        ratio = r["steps_per_sec"] / base["steps_per_sec"]
+        status = "REGRESSION" if ratio < 1.0 - tolerance else "ok"
+        print(f"{name:<30} {base['steps_per_sec']:>12,.0f} -> {r['steps_per_sec']:>12,.0f} ({ratio:6.2f}x) {status}")
+        if status != "ok":
+            regressions.append(name)
+    return regressions
+
+
+def check_baseline(results, baseline_path, tolerance):
+    """Exit code of the regression gate: 0 passed, 1 slower than the baseline, 2 no baseline to compare with."""
+    if not os.path.exists(baseline_path):
+        print(f"\nBENCHMARK: NO BASELINE at {baseline_path}; create one on this machine with --save-baseline, "
+              "or pass --no-compare to only measure")
+        return 2
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    meta = baseline.get("meta", {})
+    if (meta.get("platform"), meta.get("cpu_count")) != (results["meta"]["platform"], results["meta"]["cpu_count"]):
+        print(f"\nWarning: the baseline was measured on {meta.get('platform')} with {meta.get('cpu_count')} CPUs")
+    print(f"\n== Comparison against {baseline_path} (tolerance {tolerance:.0%}) ==")
+    regressions = compare(results, baseline, tolerance)
+    if regressions:
+        print(f"BENCHMARK: FAILED ({', '.join(regressions)} slower than baseline)")
+        return 1
+    print("BENCHMARK: PASSED")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FightingGameEnv throughput and per-phase step cost.")
+    parser.add_argument("--steps", type=int, default=20_000, help="env steps per setup")
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4, 8], help="SubprocVecEnv worker counts")
+    parser.add_argument("--envs-per-worker", type=int, default=4, help="envs per process for SharedMemoryVecEnv")
+    parser.add_argument("--batched", type=int, nargs="*", default=[64, 256], help="BatchedFightingEnv sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per setup, best one is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed fractional slowdown vs. baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--no-compare", action="store_true", help="only measure; a missing baseline is not an error")
+    args = parser.parse_args()
+
+    print("== Throughput ==")
+    setups = run_setups(args.steps, args.workers, args.envs_per_worker, args.batched, args.seed, args.repeats)
+    print("\n== Per-phase cost (bare env) ==")
+    phases = time_phases(args.steps, args.seed)
+
+    results = {
+        "meta": {
+            "timestamp": time.time(),
+            "steps": args.steps,
+            "repeats": args.repeats,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "setups": setups,
+        "phases": phases,
+    }
+
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    if not args.save_baseline and not args.no_compare:
+        sys.exit(check_baseline(results, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
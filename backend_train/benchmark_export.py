@@ -0,0 +1,242 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+import export_model
+from envs.self_play import find_vecnormalize
+
+# Reference first: every other runtime is compared against the SB3 policy
+RUNTIMES = ("sb3", "torch", "onnx", "saved_model")
+# Python packages each runtime needs beyond the training stack
+RUNTIME_PACKAGES = {"onnx": "onnxruntime", "saved_model": "tensorflow"}
+
+DEFAULT_OUTPUT = "benchmarks/export_bench.json"
+DEFAULT_BASELINE = "benchmarks/export_baseline.json"
+
+
+def load_runtime(runtime, export_dir, model_path, stats_path, threads):
+    """
+    Return ``run(raw_obs) -> (logits, value)`` for one runtime, limited to ``threads`` intra-op
+    threads. Observations are raw env output; each runtime applies the normalization it would
+    get in deployment (VecNormalize for SB3, the folded graph or norm_stats otherwise).
+    """
+    import torch as th
+    from stable_baselines3 import PPO
+
+    with open(os.path.join(export_dir, "export_info.json")) as f:
+        folded = json.load(f)["normalization_folded"]
+    vec_normalize = export_model.load_vec_normalize(stats_path) if stats_path else None
+    normalize = lambda obs: vec_normalize.normalize_obs(obs).astype(np.float32) if vec_normalize is not None else obs
+    prepare = (lambda obs: obs) if folded else normalize
+
+    if runtime in ("sb3", "torch"):
+        th.set_num_threads(threads)
+        model = PPO.load(model_path, device="cpu")
+        model.policy.set_training_mode(False)
+        policy = model.policy
+        if runtime == "sb3":
+            def run(obs):
+                with th.no_grad():
+                    latent_pi, latent_vf = policy.mlp_extractor(policy.extract_features(th.as_tensor(normalize(obs))))
+                    return policy.action_net(latent_pi).numpy(), policy.value_net(latent_vf).numpy()
+            return run
+        # The module that was traced to ONNX, before any converter touched it
+        graph = export_model.FullOnnxModel(model, vec_normalize if folded else None).eval()
+        def run(obs):
+            with th.no_grad():
+                logits, value, _, _ = graph(th.as_tensor(prepare(obs)))
+                return logits.numpy(), value.numpy()
+        return run
+
+    if runtime == "onnx":
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        session = ort.InferenceSession(os.path.join(export_dir, "model.onnx"), opts, providers=["CPUExecutionProvider"])
+        return lambda obs: tuple(session.run(["logits", "value"], {"input": prepare(obs)}))
+
+    if runtime == "saved_model":
+        import tensorflow as tf
+        # Only settable before TensorFlow initializes, which is why every runtime gets its own process
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+        fn = tf.saved_model.load(os.path.join(export_dir, "saved_model")).signatures["serving_default"]
+        def run(obs):
+            out = fn(input=tf.constant(prepare(obs)))
+            return out["logits"].numpy(), out["value"].numpy()
+        return run
+
+    raise ValueError(f"Unknown runtime {runtime}")
+
+
+def missing(runtime, export_dir):
+    # Reason a runtime cannot run here, or None
+    package = RUNTIME_PACKAGES.get(runtime)
+    if package and importlib.util.find_spec(package) is None:
+        return f"{package} not installed"
+    artifact = {"onnx": "model.onnx", "saved_model": "saved_model"}.get(runtime)
+    if artifact and not os.path.exists(os.path.join(export_dir, artifact)):
+        return f"no {artifact} in {export_dir}"
+    return None
+
+
+def bench_runtime(runtime, export_dir, model_path, stats_path, threads, observations, batch_sizes, iters):
+    run = load_runtime(runtime, export_dir, model_path, stats_path, threads)
+    # Outputs on the whole observation set for the parity check, in chunks the graph handles at once
+    chunks = [run(observations[i:i + 256]) for i in range(0, len(observations), 256)]
+    logits = np.concatenate([c[0] for c in chunks])
+    value = np.concatenate([c[1] for c in chunks]).reshape(-1)
+
+    latency = {}
+    rng = np.random.default_rng(0)
+    for b in batch_sizes:
+        batches = [observations[rng.integers(0, len(observations), size=b)] for _ in range(iters)]
+        for batch in batches[:10]:
+            run(batch)
+        times = []
+        for batch in batches:
+            start = time.perf_counter()
+            run(batch)
+            times.append(time.perf_counter() - start)
+        times = np.array(times) * 1e3
+        latency[str(b)] = {"p50_ms": float(np.percentile(times, 50)), "p99_ms": float(np.percentile(times, 99))}
+    return logits, value, latency
+
+
+def parity(logits, value, ref_logits, ref_value):
+    return {
+        "max_logit_error": float(np.abs(logits - ref_logits).max()),
+        "argmax_agreement": float((logits.argmax(1) == ref_logits.argmax(1)).mean()),
+        "max_value_error": float(np.abs(value - ref_value).max()),
+    }
+
+
+def run_benchmark(export_dir, model_path=None, runtimes=RUNTIMES, threads=(1,), batch_sizes=(1, 8, 64, 256),
+                  iters=200, parity_obs=None, n_obs=4096):
+    """
+    Run every available runtime over the same observations and return
+    {runtime: {"skipped": reason} | {"parity": {...}, "threads": {n: {batch: {p50_ms, p99_ms}}}}}.
+    Each (runtime, thread count) runs in a fresh process so thread settings and warm caches
+    never carry over.
+    """
+    manifest_path = os.path.join(export_dir, export_model.MANIFEST)
+    manifest = {}
+    if model_path is None or os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    model_path = model_path or manifest["model"]
+    # The stats the export was made with (possibly --stats or none), not whatever sits next to the model
+    stats_path = manifest["stats"] if "stats" in manifest else find_vecnormalize(model_path)
+    from stable_baselines3 import PPO
+    from envs.fighting_env import FightingGameEnv
+    n_stack = PPO.load(model_path, device="cpu").observation_space.shape[0] // FightingGameEnv().observation_space.shape[0]
+    observations = export_model.parity_observations(parity_obs, n=n_obs, n_stack=n_stack)
+
+    results, reference = {}, None
+    for runtime in runtimes:
+        reason = missing(runtime, export_dir)
+        if reason:
+            results[runtime] = {"skipped": reason}
+            print(f"{runtime:<12} skipped ({reason})")
+            continue
+        results[runtime] = {"threads": {}}
+        for n in threads:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                logits, value, latency = pool.submit(bench_runtime, runtime, export_dir, model_path, stats_path, n,
+                                                     observations, batch_sizes, iters).result()
+            results[runtime]["threads"][str(n)] = latency
+            for b, l in latency.items():
+                print(f"{runtime:<12} threads={n:<3} batch={b:<5} p50 {l['p50_ms']:>8.3f} ms  p99 {l['p99_ms']:>8.3f} ms")
+        if reference is None:
+            reference = (logits, value)
+        results[runtime]["parity"] = parity(logits, value, *reference)
+        p = results[runtime]["parity"]
+        print(f"{runtime:<12} max logit error {p['max_logit_error']:.2e}  argmax agreement {p['argmax_agreement']:.4f}  "
+              f"max value error {p['max_value_error']:.2e}")
+    return results
+
+
+def check(results, baseline, max_logit_error, min_agreement, tolerance):
+    # Parity gates always; latency only against a baseline from the same box
+    failures = []
+    for runtime, r in results.items():
+        if "parity" not in r:
+            continue
+        p = r["parity"]
+        if p["max_logit_error"] > max_logit_error or p["argmax_agreement"] < min_agreement:
+            failures.append(f"{runtime} parity")
+        base = baseline.get("runtimes", {}).get(runtime, {}).get("threads", {}) if baseline else {}
+        for n, batches in r["threads"].items():
+            for b, l in batches.items():
+                base_l = base.get(n, {}).get(b)
+                if base_l is None:
+                    continue
+                ratio = l["p50_ms"] / base_l["p50_ms"]
+                status = "REGRESSION" if ratio > 1.0 + tolerance else "ok"
+                print(f"{runtime:<12} threads={n:<3} batch={b:<5} {base_l['p50_ms']:>8.3f} -> {l['p50_ms']:>8.3f} ms ({ratio:5.2f}x) {status}")
+                if status != "ok":
+                    failures.append(f"{runtime} threads={n} batch={b}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check exported models against the SB3 policy and time them on CPU.")
+    parser.add_argument("export_dir", help="one exported checkpoint, e.g. models/exports/neural_nemesis_pro")
+    parser.add_argument("--model", default=None, help="SB3 .zip (default: the one in the export manifest)")
+    parser.add_argument("--runtimes", nargs="*", default=list(RUNTIMES), choices=RUNTIMES)
+    parser.add_argument("--threads", type=int, nargs="*", default=[1, 2, 4])
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=[1, 8, 64, 256])
+    parser.add_argument("--iters", type=int, default=200, help="timed calls per batch size")
+    parser.add_argument("--parity-obs", default=None, help="recorded replay path or .npy file (default: sampled from the env)")
+    parser.add_argument("--max-logit-error", type=float, default=1e-3)
+    parser.add_argument("--min-agreement", type=float, default=0.999)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fractional p50 slowdown vs. baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    if "sb3" not in args.runtimes:
+        args.runtimes = ["sb3"] + args.runtimes
+    runtimes = run_benchmark(args.export_dir, args.model, args.runtimes, args.threads, args.batch_sizes, args.iters, args.parity_obs)
+    results = {
+        "meta": {
+            "timestamp": time.time(),
+            "export_dir": args.export_dir,
+            "iters": args.iters,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "runtimes": runtimes,
+    }
+
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n== Comparison against {args.baseline} (tolerance {args.tolerance:.0%}) ==")
+    failures = check(runtimes, baseline, args.max_logit_error, args.min_agreement, args.tolerance)
+    if failures:
+        print(f"EXPORT CHECK: FAILED ({', '.join(failures)})")
+        sys.exit(1)
+    print("EXPORT CHECK: PASSED")
+
+
+if __name__ == "__main__":
+    main()
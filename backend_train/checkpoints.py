@@ -0,0 +1,219 @@
+import copy
+import io
+import json
+import os
+import pickle
+import queue
+import threading
+
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecNormalize
+
+from envs.fused_vec_env import FusedVecEnv
+
+
+def mean_episode_reward(callback):
+    """Checkpoint score from training: mean return of the recent episodes SB3 logs as rollout/ep_rew_mean."""
+    episodes = callback.model.ep_info_buffer
+    return float(np.mean([ep["r"] for ep in episodes])) if episodes else None
+
+
+class EvalScore:
+    """
+    Default checkpoint score: mean return of ``episodes`` deterministic games against the scripted
+    bot, played with the model's current (frozen) normalization statistics. The eval env is seeded
+    the same way every time, so every checkpoint is scored on the same matches.
+
+    AsyncCheckpointCallback runs it on its writer thread (``background``) from the serialized
+    checkpoint, so training only pays for copying the statistics.
+    """
+
+    background = True
+
+    def __init__(self, episodes=32, envs=16, seed=0):
+        self.episodes = episodes
+        self.envs = envs
+        self.seed = seed
+
+    @staticmethod
+    def frozen_stats(model):
+        """A copy of the model's observation normalization that later training does not change, or None."""
+        vec_normalize = model.get_vec_normalize_env()
+        if vec_normalize is None:
+            return None
+        if isinstance(vec_normalize, FusedVecEnv):
+            vec_normalize = vec_normalize.to_vec_normalize()
+        return {"norm_obs": vec_normalize.norm_obs, "clip_obs": vec_normalize.clip_obs, "epsilon": vec_normalize.epsilon,
+                "obs_rms": copy.deepcopy(vec_normalize.obs_rms)}
+
+    def __call__(self, callback):
+        return self.score(callback.model, self.frozen_stats(callback.model))
+
+    def score(self, model, stats):
+        from evaluate_only import balanced_episodes, make_eval_env, run_episodes
+
+        decision_interval = getattr(model, "decision_interval", 1)
+        # The batched engine only plays one frame per decision
+        env = make_eval_env("batched" if decision_interval == 1 else "dummy", self.envs, 1, decision_interval=decision_interval)
+        env.seed(self.seed)
+        if stats is not None:
+            env = VecNormalize(env, training=False, norm_obs=stats["norm_obs"], norm_reward=False,
+                               clip_obs=stats["clip_obs"], epsilon=stats["epsilon"])
+            env.obs_rms = copy.deepcopy(stats["obs_rms"])
+        per_env, _ = run_episodes(model, env, self.episodes)
+        env.close()
+        return float(np.mean([e["reward"] for e in balanced_episodes(per_env)]))
+
+
+def _write_atomic(path, blob):
+    # A crash mid-write leaves a .tmp file behind, never a truncated checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """
+    Drop-in replacement for ``CheckpointCallback`` that never waits on the disk.
+
+    Every ``save_freq`` calls the model (policy, optimizer and the rest of what ``model.save``
+    stores) and the VecNormalize statistics are serialized into memory; a background thread writes
+    them with the same file names CheckpointCallback uses, so ``PPO.load``, ``find_vecnormalize``,
+    self-play and the exporter pick them up unchanged. Writes go through a queue of ``max_pending``
+    snapshots; only if the disk falls that far behind does training wait.
+
+    Retention keeps the ``keep_last`` most recent checkpoints plus the ``keep_best`` highest
+    scoring ones and deletes the rest. ``score_fn(callback)`` scores a checkpoint when it is taken
+    (``mean_episode_reward`` ranks by the training episodes, ``lambda cb: eval_callback.last_mean_reward``
+    reuses an EvalCallback). The default, EvalScore, plays 32 games per checkpoint; it runs on the
+    writer thread against the saved checkpoint, so it only holds training up if a snapshot is
+    taken while ``max_pending`` others are still being scored. The retained set is recorded in
+    ``<name_prefix>_checkpoints.json`` so a resumed run keeps managing the checkpoints of the previous one.
+    """
+
+    def __init__(self, save_freq, save_path, name_prefix="rl_model", save_vecnormalize=False, keep_last=5, keep_best=1,
+                 score_fn=EvalScore(), max_pending=2, verbose=0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.save_path = save_path
+        self.name_prefix = name_prefix
+        self.save_vecnormalize = save_vecnormalize
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.score_fn = score_fn
+        self.index_path = os.path.join(save_path, f"{name_prefix}_checkpoints.json")
+        self.queue = queue.Queue(maxsize=max_pending)
+        # The writer thread updates the retained set while the training thread may read it (best())
+        self.lock = threading.Lock()
+        self.thread = None
+        self.error = None
+
+    def _init_callback(self):
+        os.makedirs(self.save_path, exist_ok=True)
+        self.checkpoints = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.checkpoints = json.load(f)
+        self.thread = threading.Thread(target=self._writer, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def _paths(self, steps):
+        model_path = os.path.join(self.save_path, f"{self.name_prefix}_{steps}_steps.zip")
+        stats_path = os.path.join(self.save_path, f"{self.name_prefix}_vecnormalize_{steps}_steps.pkl")
+        return model_path, stats_path
+
+    def _on_step(self):
+        if self.error is not None:
+            raise RuntimeError("Background checkpoint write failed") from self.error
+        if self.n_calls % self.save_freq == 0:
+            self.snapshot()
+        return True
+
+    def snapshot(self):
+        # Serializing is the only part that runs on the training thread
+        buffer = io.BytesIO()
+        self.model.save(buffer)
+        stats = None
+        vec_normalize = self.model.get_vec_normalize_env()
+        if self.save_vecnormalize and vec_normalize is not None:
+            if isinstance(vec_normalize, FusedVecEnv):
+                vec_normalize = vec_normalize.to_vec_normalize()
+            stats = pickle.dumps(vec_normalize)
+        if getattr(self.score_fn, "background", False):
+            # Scored by the writer thread; only the statistics it needs are copied here
+            score = None
+            eval_stats = self.score_fn.frozen_stats(self.model)
+        else:
+            score = self.score_fn(self) if self.score_fn is not None else None
+            eval_stats = None
+        self.queue.put((self.num_timesteps, buffer.getvalue(), stats, score, eval_stats))
+
+    def _writer(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _write(self, steps, model_blob, stats_blob, score, eval_stats):
+        model_path, stats_path = self._paths(steps)
+        _write_atomic(model_path, model_blob)
+        if stats_blob is not None:
+            _write_atomic(stats_path, stats_blob)
+        if self.verbose >= 2:
+            print(f"Saving model checkpoint to {model_path}")
+        if getattr(self.score_fn, "background", False):
+            # A private copy of the checkpoint, so training can keep updating the live model
+            score = self.score_fn.score(PPO.load(io.BytesIO(model_blob), device="cpu"), eval_stats)
+
+        with self.lock:
+            self.checkpoints = [c for c in self.checkpoints if c["steps"] != steps]
+            self.checkpoints.append({"steps": steps, "score": score, "model": model_path,
+                                     "stats": stats_path if stats_blob is not None else None})
+            self._apply_retention()
+
+    def _apply_retention(self):
+        by_steps = sorted(self.checkpoints, key=lambda c: c["steps"])
+        keep = {c["steps"] for c in by_steps[-self.keep_last:]} if self.keep_last > 0 else set()
+        scored = sorted((c for c in self.checkpoints if c["score"] is not None), key=lambda c: c["score"], reverse=True)
+        keep |= {c["steps"] for c in scored[:self.keep_best]}
+        for c in self.checkpoints:
+            if c["steps"] not in keep:
+                for path in (c["model"], c["stats"]):
+                    if path and os.path.exists(path):
+                        os.remove(path)
+        self.checkpoints = [c for c in by_steps if c["steps"] in keep]
+        _write_atomic(self.index_path, json.dumps(self.checkpoints, indent=2).encode())
+
+    def best(self):
+        """Path of the highest scoring retained checkpoint, or None."""
+        with self.lock:
+            scored = [c for c in self.checkpoints if c["score"] is not None]
+        return max(scored, key=lambda c: c["score"])["model"] if scored else None
+
+    def flush(self):
+        # Block until every queued snapshot is on disk
+        self.queue.join()
+        if self.error is not None:
+            raise RuntimeError("Background checkpoint write failed") from self.error
+
+    def _on_training_end(self):
+        # Each learn() call starts its own writer
+        self.close()
+        if self.error is not None:
+            raise RuntimeError("Background checkpoint write failed") from self.error
+
+    def close(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
@@ -0,0 +1,350 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from envs.fighting_env import PLAYER_FIELDS, STATE_DTYPE, FightingGameRules
+from envs.frame_data import FrameData
+from envs.opponents import PERSONALITY_PROBS
+
+P1, P2 = 0, 1
+
+class BatchedFightingEnv(FightingGameRules, VecEnv):
+    """
+    Runs ``num_envs`` matches of ``FightingGameEnv`` in lock-step inside one process.
+
+    Every piece of match state lives in an array whose last axis is the match index
+    (player fields are shaped ``(2, num_envs)``, row 0 = P1, row 1 = P2), so one step
+    is a handful of array operations no matter how many matches are running.
+    Finished matches are reset automatically, SB3 style: the final observation is
+    stored in ``info["terminal_observation"]`` and the returned observation is the
+    first one of the next match.
+
+    Wrap it with ``VecMonitor`` for episode statistics instead of ``Monitor``.
+    """
+
+    render_mode = None
+
+    def __init__(self, num_envs, seed=None):
+        action_space = spaces.Discrete(9)
+        observation_space = spaces.Box(low=-2.0, high=2.0, shape=(18,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.rng = np.random.default_rng(seed)
+
+        n = num_envs
+        self.x = np.zeros((2, n))
+        self.y = np.zeros((2, n))
+        self.vx = np.zeros((2, n))
+        self.vy = np.zeros((2, n))
+        self.health = np.zeros((2, n))
+        self.stamina = np.zeros((2, n))
+        self.stun = np.zeros((2, n), dtype=np.int64)
+        self.attacking = np.zeros((2, n), dtype=np.int64)
+        self.attack_timer = np.zeros((2, n), dtype=np.int64)
+        self.has_hit = np.zeros((2, n), dtype=bool)
+        self.blocking = np.zeros((2, n), dtype=bool)
+        self.crouching = np.zeros((2, n), dtype=bool)
+
+        self.current_step = np.zeros(n, dtype=np.int64)
+        self.prev_dist = np.zeros(n)
+        self.p2_personality = np.zeros(n, dtype=np.int64)
+        self.p2_action_timer = np.zeros(n, dtype=np.int64)
+        self.p2_current_action = np.zeros(n, dtype=np.int64)
+        self.side = np.zeros(n, dtype=np.int64)
+
+        self.frame_data = FrameData(self)
+
+        self._actions = np.zeros((2, n), dtype=np.int64)
+        self._external_p2 = None
+        self._obs = np.zeros((n, 18), dtype=np.float32)
+        self._all = np.arange(n)
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_matches(self._all)
+        return self._get_obs().copy()
+
+    def step_async(self, actions):
+        # (n_envs, 2) actions carry P2's action too; negative entries leave P2 to the built-in bot
+        actions = np.asarray(actions)
+        if actions.ndim == 2:
+            self._actions[P1] = actions[:, 0]
+            self._external_p2 = actions[:, 1]
+        else:
+            self._actions[P1] = actions
+            self._external_p2 = None
+
+    def step_wait(self):
+        self._decide_p2()
+        self._apply_action(self._actions)
+        self._apply_physics()
+
+        rewards = self._resolve_combat()
+        self._update_stamina()
+
+        # Delta-Distance Reward: Reward for getting closer
+        curr_dist = np.abs(self.x[P1] - self.x[P2]) / self.WIDTH
+        rewards += (self.prev_dist - curr_dist) * 5.0
+        self.prev_dist = curr_dist
+
+        # Efficiency penalty
+        rewards -= 0.005
+
+        self.current_step += 1
+        is_win = self.health[P2] <= 0
+        is_loss = self.health[P1] <= 0
+        terminated = is_win | is_loss
+        rewards += np.where(is_win, 50.0, np.where(is_loss, -10.0, 0.0))
+        truncated = self.current_step >= self.MAX_STEPS
+        dones = terminated | truncated
+
+        obs = self._get_obs()
+        infos = [{} for _ in range(self.num_envs)]
+        done_idx = np.flatnonzero(dones)
+        if done_idx.size:
+            for i in done_idx:
+                infos[i] = {
+                    "is_win": bool(is_win[i]),
+                    "is_loss": bool(is_loss[i]),
+                    "p2_health": float(self.health[P2, i]),
+                    "p1_health": float(self.health[P1, i]),
+                    "p2_personality": int(self.p2_personality[i]),
+                    "side": int(self.side[i]),
+                    "TimeLimit.truncated": bool(truncated[i] and not terminated[i]),
+                    "terminal_observation": obs[i].copy(),
+                }
+            self._reset_matches(done_idx)
+            obs = self._get_obs()
+
+        return obs.copy(), rewards.astype(np.float32), dones, infos
+
+    def _reset_matches(self, idx):
+        k = len(idx)
+        # Bot Personality: 0: Aggressive, 1: Defensive, 2: Random, 3: Passive (Wait)
+        self.p2_personality[idx] = self.rng.choice([0, 1, 2, 3], size=k, p=PERSONALITY_PROBS)
+        self.p2_action_timer[idx] = 0
+        self.p2_current_action[idx] = 0
+        self.current_step[idx] = 0
+
+        # Randomize starting positions
+        side = self.side[idx] = self.rng.integers(0, 2, size=k)
+        self.x[P1, idx] = np.where(side == 0, 150, 650)
+        self.x[P2, idx] = np.where(side == 0, 650, 150)
+
+        self.y[:, idx] = self.GROUND_Y - self.PLAYER_HEIGHT
+        self.vx[:, idx] = 0
+        self.vy[:, idx] = 0
+        self.health[:, idx] = self.MAX_HEALTH
+        self.stamina[:, idx] = self.MAX_STAMINA
+        self.stun[:, idx] = 0
+        self.attacking[:, idx] = 0
+        self.attack_timer[:, idx] = 0
+        self.has_hit[:, idx] = False
+        self.blocking[:, idx] = False
+        self.crouching[:, idx] = False
+
+        self.prev_dist[idx] = np.abs(self.x[P1, idx] - self.x[P2, idx]) / self.WIDTH
+
+    def reset_matches(self, indices):
+        """Start new matches at ``indices`` (e.g. truncated by a wrapper's time limit). Returns their observations."""
+        idx = np.asarray(indices)
+        self._reset_matches(idx)
+        return self._get_obs()[idx].copy()
+
+    def get_state(self, indices=None):
+        """
+        ``FightingGameEnv.get_state`` records for the matches at ``indices`` (all by default).
+        All matches share one generator, so the ``rng`` fields are left empty.
+        """
+        idx = self._all if indices is None else np.asarray(indices)
+        states = np.zeros(len(idx), STATE_DTYPE)
+        for f, name in enumerate(PLAYER_FIELDS):
+            states["players"][:, :, f] = getattr(self, name)[:, idx].T
+        for name in ("current_step", "prev_dist", "side", "p2_personality", "p2_action_timer", "p2_current_action"):
+            states[name] = getattr(self, name)[idx]
+        states["p2_last_action"] = self._actions[P2, idx]
+        return states
+
+    def set_state(self, states, indices=None):
+        """
+        Write ``STATE_DTYPE`` records (from either engine) into the matches at ``indices``, one
+        array assignment per field; a single record is copied into all of them. The ``rng``
+        fields are ignored. Returns the observations of those matches.
+        """
+        idx = self._all if indices is None else np.asarray(indices)
+        states = np.broadcast_to(states, (len(idx),))
+        for f, name in enumerate(PLAYER_FIELDS):
+            getattr(self, name)[:, idx] = states["players"][:, :, f].T
+        for name in ("current_step", "prev_dist", "side", "p2_personality", "p2_action_timer", "p2_current_action"):
+            getattr(self, name)[idx] = states[name]
+        return self._get_obs()[idx].copy()
+
+    def _get_obs(self):
+        obs = self._obs
+        obs[:, 0] = (self.x[P2] - self.x[P1]) / self.WIDTH
+        obs[:, 1] = (self.y[P2] - self.y[P1]) / self.HEIGHT
+        obs[:, 2:4] = (self.health / self.MAX_HEALTH).T
+        obs[:, 4:6] = (self.stamina / self.MAX_STAMINA).T
+        obs[:, 6:10:2] = (self.vx / 10.0).T
+        obs[:, 7:11:2] = (self.vy / 15.0).T
+        obs[:, 10:18:4] = (self.stun > 0).T
+        obs[:, 11:18:4] = (self.attack_timer > 0).T
+        obs[:, 12:18:4] = self.blocking.T
+        obs[:, 13:18:4] = self.crouching.T
+        return obs
+
+    def _decide_p2(self):
+        decide = self.p2_action_timer <= 0
+        self.p2_action_timer[~decide] -= 1
+        idx = np.flatnonzero(decide)
+        if idx.size:
+            k = idx.size
+            p1_x, p2_x = self.x[P1, idx], self.x[P2, idx]
+            personality = self.p2_personality[idx]
+
+            aggressive = np.where(p2_x > p1_x + 70, 1, np.where(p2_x < p1_x - 70, 2, self.rng.integers(5, 9, size=k)))
+            defensive = np.where(p2_x < p1_x, 2, 1)
+            random = self.rng.integers(0, 9, size=k)
+            self.p2_current_action[idx] = np.choose(personality, [aggressive, defensive, random, np.zeros(k, dtype=np.int64)])
+            self.p2_action_timer[idx] = self.rng.integers(10, 30, size=k)
+        if self._external_p2 is None:
+            self._actions[P2] = self.p2_current_action
+        else:
+            self._actions[P2] = np.where(self._external_p2 >= 0, self._external_p2, self.p2_current_action)
+
+    def _apply_action(self, actions):
+        stunned = self.stun > 0
+        free = ~stunned & (self.attack_timer <= 0)
+
+        # Stunned and free players drop their guard; attacking players keep their stance
+        busy = ~stunned & ~free
+        self.blocking &= busy
+        self.crouching &= busy
+
+        self.vx[free & (actions == 1)] = -self.WALK_SPEED
+        self.vx[free & (actions == 2)] = self.WALK_SPEED
+        self.vx[free & (actions >= 4)] = 0
+
+        jump = free & (actions == 3) & (self.y >= self.GROUND_Y - self.PLAYER_HEIGHT)
+        self.vy[jump] = self.JUMP_FORCE
+
+        self.crouching |= free & (actions == 4)
+        self.blocking |= free & (actions == 5) & (self.stamina > 0)
+
+        fd = self.frame_data
+        attack_type = fd.attack_for_action[actions]
+        attack = free & (attack_type > 0)
+        atk = attack_type[attack]
+        self.attacking[attack] = atk
+        self.attack_timer[attack] = fd.duration[atk]
+        self.has_hit[attack] = False
+
+        active = self.attack_timer > 0
+        self.has_hit &= active
+        self.attacking[~active] = 0
+        np.maximum(self.attack_timer - 1, 0, out=self.attack_timer)
+        np.maximum(self.stun - 1, 0, out=self.stun)
+
+    def _apply_physics(self):
+        h = np.where(self.crouching, self.CROUCH_HEIGHT, self.PLAYER_HEIGHT)
+        self.x += self.vx
+        self.y += self.vy
+        self.vx *= self.DRAG
+        gy = self.GROUND_Y - h
+        airborne = self.y < gy
+        self.vy = np.where(airborne, self.vy + self.GRAVITY, 0.0)
+        self.y = np.where(airborne, self.y, gy)
+        np.clip(self.x, 0, self.WIDTH - self.PLAYER_WIDTH, out=self.x)
+
+    def _resolve_combat(self):
+        rewards = np.zeros(self.num_envs)
+        h_opp_prev, h_self_prev = self.health[P2].copy(), self.health[P1].copy()
+        h = np.where(self.crouching, self.CROUCH_HEIGHT, self.PLAYER_HEIGHT)
+
+        fd = self.frame_data
+        last_frame = fd.active.shape[1] - 1
+        for p in (P1, P2):
+            o = 1 - p
+            atk = self.attacking[p]
+            elapsed = np.clip(fd.duration[atk] - self.attack_timer[p], 0, last_frame)
+            live = ~self.has_hit[p] & fd.active[atk, elapsed]
+            if not live.any():
+                continue
+
+            facing_right = self.x[p] < self.x[o]
+            reach = fd.reach[atk]
+            rect_x = np.where(facing_right, self.x[p], self.x[p] - reach)
+            rect_w = self.PLAYER_WIDTH + reach
+            connects = live & (rect_x < self.x[o] + self.PLAYER_WIDTH) & (rect_x + rect_w > self.x[o]) & \
+                (self.y[p] < self.y[o] + h[o]) & (self.y[p] + h[p] > self.y[o])
+            if not connects.any():
+                continue
+
+            if p == P1:
+                rewards += 0.2 * connects # Increased incentive for proximity attacking
+
+            dmg = fd.damage[atk]
+            clean = connects & (~self.blocking[o] | (self.stamina[o] <= 0))
+            blocked = connects & ~clean
+
+            self.health[o] -= np.where(clean, dmg, 0.0)
+            self.stun[o] = np.where(clean, fd.stun[atk], self.stun[o])
+            self.attack_timer[o][clean] = 0
+            self.attacking[o][clean] = 0
+            self.has_hit[p] |= clean
+            direction = np.where(facing_right, 1.0, -1.0)
+            self.vx[o] = np.where(clean, direction * fd.knockback_victim[atk], self.vx[o])
+            self.vx[p] = np.where(clean, -direction * fd.knockback_attacker[atk], self.vx[p])
+
+            drain = np.where(blocked, dmg * self.BLOCK_STAMINA_DAMAGE_MULT, 0.0)
+            self.stamina[o] = np.maximum(0.0, self.stamina[o] - drain)
+            self.blocking[o] &= ~(blocked & (self.stamina[o] <= 0))
+
+        # Combat Reward Scaling (Aggressive 2:1)
+        dmg_dealt = np.maximum(0, h_opp_prev - self.health[P2])
+        dmg_taken = np.maximum(0, h_self_prev - self.health[P1])
+        rewards += 2.0 * dmg_dealt - 1.0 * dmg_taken
+        return rewards
+
+    def _update_stamina(self):
+        drain = self.blocking & (self.stamina > 0)
+        self.stamina = np.where(
+            drain,
+            np.maximum(0.0, self.stamina - self.BLOCK_STAMINA_DRAIN),
+            np.minimum(self.MAX_STAMINA, self.stamina + self.BLOCK_STAMINA_REGEN),
+        )
+        self.blocking &= self.stamina > 0
+
+    def close(self):
+        pass
+
+    def _indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+    def get_attr(self, attr_name, indices=None):
+        value = getattr(self, attr_name)
+        idx = self._indices(indices)
+        if isinstance(value, np.ndarray) and value.shape[-1:] == (self.num_envs,):
+            return [value[..., i] for i in idx]
+        return [value for _ in idx]
+
+    def set_attr(self, attr_name, value, indices=None):
+        current = getattr(self, attr_name, None)
+        if isinstance(current, np.ndarray) and current.shape[-1:] == (self.num_envs,):
+            current[..., self._indices(indices)] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        # Matches are not separate objects, so methods run once on the batch with the target indices
+        return getattr(self, method_name)(*method_args, indices=self._indices(indices), **method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._indices(indices)]
@@ -2,137 +2,261 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 
-class FightingGameEnv(gym.Env):
+from envs.frame_data import FrameData
+from envs.opponents import ScriptedOpponent
+
+# Player state fields: each row of FightingGameEnv.players is indexed by these
+X, Y, VX, VY, HEALTH, STAMINA, STUN, ATTACKING, ATTACK_TIMER, HAS_HIT, BLOCKING, CROUCHING = range(12)
+PLAYER_FIELDS = ("x", "y", "vx", "vy", "health", "stamina", "stun", "attacking", "attack_timer", "has_hit", "blocking", "crouching")
+# Python type of each field, so restored players behave exactly like simulated ones
+PLAYER_TYPES = (float,) * 6 + (int,) * 3 + (bool,) * 3
+
+# PCG64 state (gymnasium's default bit generator), 128-bit words split into (high, low)
+RNG_DTYPE = np.dtype([("state", "<u8", 2), ("inc", "<u8", 2), ("has_uint32", "u1"), ("uinteger", "<u4")])
+# Everything FightingGameEnv.step depends on, as one fixed-size record (see get_state / set_state)
+STATE_DTYPE = np.dtype([
+    ("players", "<f8", (2, len(PLAYER_FIELDS))),
+    ("current_step", "<i8"),
+    ("prev_dist", "<f8"),
+    ("side", "i1"),
+    ("p2_personality", "i1"),
+    ("p2_action_timer", "<i8"),
+    ("p2_current_action", "i1"),
+    ("p2_last_action", "i1"),
+    ("rng", RNG_DTYPE),         # env.np_random: side, personality and bot timers
+    ("action_rng", RNG_DTYPE),  # action_space.np_random: the random bot's actions
+])
+_MASK64 = (1 << 64) - 1
+
+
+def _pack_rng(bit_generator, out):
+    state = bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(f"Can only snapshot PCG64 generators, not {state['bit_generator']}")
+    for key in ("state", "inc"):
+        value = state["state"][key]
+        out[key] = (value >> 64, value & _MASK64)
+    out["has_uint32"] = state["has_uint32"]
+    out["uinteger"] = state["uinteger"]
+
+
+def _unpack_rng(record, bit_generator):
+    (state_hi, state_lo), (inc_hi, inc_lo) = record["state"].tolist(), record["inc"].tolist()
+    bit_generator.state = {"bit_generator": "PCG64",
+                           "state": {"state": state_hi << 64 | state_lo, "inc": inc_hi << 64 | inc_lo},
+                           "has_uint32": int(record["has_uint32"]), "uinteger": int(record["uinteger"])}
+
+
+def get_states(envs, out=None):
+    """States of several (possibly wrapped) ``FightingGameEnv``s as one ``STATE_DTYPE`` array."""
+    states = np.zeros(len(envs), STATE_DTYPE) if out is None else out
+    for env, state in zip(envs, states):
+        env.unwrapped.get_state(state)
+    return states
+
+
+def set_states(envs, states):
+    """
+    Restore ``states[i]`` into ``envs[i]``; a single state is copied into every env (e.g. to
+    branch one position into many lookahead envs). Returns the stacked observations.
+    """
+    states = np.broadcast_to(states, (len(envs),))
+    return np.stack([env.unwrapped.set_state(state) for env, state in zip(envs, states)])
+
+class FightingGameRules:
+    # Game constants
+    WIDTH = 800
+    HEIGHT = 600
+    GROUND_Y = 500
+    PLAYER_WIDTH = 100
+    PLAYER_HEIGHT = 250
+    CROUCH_HEIGHT = 100
+    WALK_SPEED = 5
+    JUMP_FORCE = -15
+    GRAVITY = 0.8
+
+    MAX_HEALTH = 100
+    MAX_STAMINA = 100
+    MAX_STEPS = 800 # Short episodes for faster feedback
+    BLOCK_STAMINA_DRAIN = 0.2
+    BLOCK_STAMINA_REGEN = 0.15
+    BLOCK_STAMINA_DAMAGE_MULT = 2.0
+
+    # Frame data
+    LIGHT_ATTACK_DUR = 22
+    HEAVY_ATTACK_DUR = 38
+    SPECIAL_ATTACK_DUR = 60
+
+    LIGHT_PHASES = [4, 6, 12]
+    HEAVY_PHASES = [10, 8, 20]
+    SPECIAL_PHASES = [15, 10, 35]
+
+    LIGHT_STUN = 18
+    HEAVY_STUN = 35
+    SPECIAL_STUN = 55
+
+    STUN_DURATION = 20
+    ATTACK_REACH = 90
+    KNOCKBACK_VICTIM = 10.0
+    KNOCKBACK_ATTACKER = 5.0
+    DRAG = 0.8
+
+    # Moves by attack type (the `attacking` value); 0 means not attacking.
+    # New moves only need a row here and an action in ATTACK_FOR_ACTION.
+    ATTACKS = (
+        None,
+        {"duration": LIGHT_ATTACK_DUR, "phases": LIGHT_PHASES, "reach": ATTACK_REACH, "damage": 3.0, "stun": LIGHT_STUN},
+        {"duration": HEAVY_ATTACK_DUR, "phases": HEAVY_PHASES, "reach": ATTACK_REACH + 20, "damage": 7.0, "stun": HEAVY_STUN},
+        {"duration": SPECIAL_ATTACK_DUR, "phases": SPECIAL_PHASES, "reach": ATTACK_REACH + 50, "damage": 12.0, "stun": SPECIAL_STUN},
+    )
+    # Attack type started by each action: 6: Light_Attack, 7: Heavy_Attack, 8: Special
+    ATTACK_FOR_ACTION = (0, 0, 0, 0, 0, 0, 1, 2, 3)
+
+
+class FightingGameEnv(FightingGameRules, gym.Env):
     metadata = {"render_modes": ["human"], "render_fps": 60}
+    FRAME_DATA = FrameData(FightingGameRules).tolist()
 
-    def __init__(self):
+    def __init__(self, opponent=None, decision_interval=1):
         super(FightingGameEnv, self).__init__()
 
+        # Action repeat: each step() plays its action for this many frames (the P2 bot still decides
+        # per frame) and returns the summed reward and the last frame's observation
+        self.decision_interval = decision_interval
+
+        # P2 controller (see envs.opponents); defaults to the built-in scripted bot
+        self.opponent = opponent if opponent is not None else ScriptedOpponent()
+
         # Action Space: 0: Idle, 1: Left, 2: Right, 3: Jump, 4: Crouch, 5: Block, 6: Light_Attack, 7: Heavy_Attack, 8: Special
         self.action_space = spaces.Discrete(9)
 
         # Observation Space (18 features)
         self.observation_space = spaces.Box(low=-2.0, high=2.0, shape=(18,), dtype=np.float32)
 
-        # Game constants
-        self.WIDTH = 800
-        self.HEIGHT = 600
-        self.GROUND_Y = 500
-        self.PLAYER_WIDTH = 100
-        self.PLAYER_HEIGHT = 250
-        self.CROUCH_HEIGHT = 100
-        self.WALK_SPEED = 5
-        self.JUMP_FORCE = -15
-        self.GRAVITY = 0.8
-        
-        self.MAX_HEALTH = 100
-        self.MAX_STAMINA = 100
-        self.MAX_STEPS = 800 # Short episodes for faster feedback
-        self.BLOCK_STAMINA_DRAIN = 0.2
-        self.BLOCK_STAMINA_REGEN = 0.15
-        self.BLOCK_STAMINA_DAMAGE_MULT = 2.0
-        
-        # Frame data
-        self.LIGHT_ATTACK_DUR = 22
-        self.HEAVY_ATTACK_DUR = 38
-        self.SPECIAL_ATTACK_DUR = 60
-        
-        self.LIGHT_PHASES = [4, 6, 12]
-        self.HEAVY_PHASES = [10, 8, 20]
-        self.SPECIAL_PHASES = [15, 10, 35]
-        
-        self.LIGHT_STUN = 18
-        self.HEAVY_STUN = 35
-        self.SPECIAL_STUN = 55
-
-        self.STUN_DURATION = 20
-        self.ATTACK_REACH = 90
-        self.KNOCKBACK_VICTIM = 10.0
-        self.KNOCKBACK_ATTACKER = 5.0
-        self.DRAG = 0.8
-        
+        # One row per player (P1, P2), indexed by the field constants above.
+        # Plain lists keep per-field reads and writes cheap; p1_x, p2_stun, ... are views onto them.
+        self.players = [[0] * len(PLAYER_FIELDS), [0] * len(PLAYER_FIELDS)]
+        self._obs = np.zeros(18, dtype=np.float32)
+
         self.reset()
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed, options=options)
         self.current_step = 0
         
-        # Bot Personality: 0: Aggressive, 1: Defensive, 2: Random, 3: Passive (Wait)
-        # 50% chance of Passive to encourage AI to initiate
-        self.p2_personality = self.np_random.choice([0, 1, 2, 3], p=[0.3, 0.1, 0.1, 0.5])
-        self.p2_action_timer = 0
-        self.p2_current_action = 0
+        self.opponent.reset(self)
         
-        # Randomize starting positions
-        side = self.np_random.choice([0, 1])
+        # Randomize starting positions (replays pin the recorded side through options)
+        if options and "side" in options: side = self.side = options["side"]
+        else: side = self.side = self.np_random.choice([0, 1])
         if side == 0:
-            self.p1_x, self.p2_x = 150, 650
+            p1_x, p2_x = 150, 650
         else:
-            self.p1_x, self.p2_x = 650, 150
-
-        self.p1_y = self.p2_y = self.GROUND_Y - self.PLAYER_HEIGHT
-        self.p1_vx = self.p1_vy = self.p2_vx = self.p2_vy = 0
-        self.p1_health = self.p2_health = self.MAX_HEALTH
-        self.p1_stamina = self.p2_stamina = self.MAX_STAMINA
-        self.p1_stun = self.p2_stun = 0
-        self.p1_attacking = self.p2_attacking = 0
-        self.p1_attack_timer = self.p2_attack_timer = 0
-        self.p1_has_hit = self.p2_has_hit = False
-        self.p1_blocking = self.p1_crouching = self.p2_blocking = self.p2_crouching = False
+            p1_x, p2_x = 650, 150
+
+        y = self.GROUND_Y - self.PLAYER_HEIGHT
+        self.players[0][:] = [p1_x, y, 0, 0, self.MAX_HEALTH, self.MAX_STAMINA, 0, 0, 0, False, False, False]
+        self.players[1][:] = [p2_x, y, 0, 0, self.MAX_HEALTH, self.MAX_STAMINA, 0, 0, 0, False, False, False]
         
-        self.prev_dist = abs(self.p1_x - self.p2_x) / self.WIDTH
+        self.prev_dist = abs(p1_x - p2_x) / self.WIDTH
+
+        # Bookmarked situations: continue from a get_state() snapshot instead of the usual start
+        if options and "state" in options: return self.set_state(options["state"]), {}
         
         return self._get_obs(), {}
 
+    def get_state(self, out=None):
+        """
+        Snapshot of the match, the bot and both RNGs as a ``STATE_DTYPE`` record, written into
+        ``out`` (e.g. a row of a preallocated state array) if given. Much cheaper than deepcopy;
+        opponents that keep state outside the env (self-play networks) are not included.
+        """
+        state = np.zeros((), STATE_DTYPE) if out is None else out
+        state["players"] = self.players
+        state["current_step"] = self.current_step
+        state["prev_dist"] = self.prev_dist
+        state["side"] = self.side
+        state["p2_personality"] = getattr(self, "p2_personality", -1)
+        state["p2_action_timer"] = getattr(self, "p2_action_timer", 0)
+        state["p2_current_action"] = getattr(self, "p2_current_action", 0)
+        state["p2_last_action"] = getattr(self, "p2_last_action", -1)
+        _pack_rng(self.np_random.bit_generator, state["rng"])
+        _pack_rng(self.action_space.np_random.bit_generator, state["action_rng"])
+        return state
+
+    def set_state(self, state):
+        """Restore a ``get_state`` snapshot; stepping on is bit-identical to the original. Returns the observation."""
+        for p, row in zip(self.players, state["players"].tolist()):
+            p[:] = [t(v) for t, v in zip(PLAYER_TYPES, row)]
+        self.current_step = int(state["current_step"])
+        self.prev_dist = float(state["prev_dist"])
+        self.side = int(state["side"])
+        self.p2_personality = int(state["p2_personality"])
+        self.p2_action_timer = int(state["p2_action_timer"])
+        self.p2_current_action = int(state["p2_current_action"])
+        self.p2_last_action = int(state["p2_last_action"])
+        _unpack_rng(state["rng"], self.np_random.bit_generator)
+        _unpack_rng(state["action_rng"], self.action_space.np_random.bit_generator)
+        return self._get_obs()
+
     def _get_obs(self):
-        dx = (self.p2_x - self.p1_x) / self.WIDTH
-        dy = (self.p2_y - self.p1_y) / self.HEIGHT
-        
-        obs = np.array([
-            dx, dy,
-            self.p1_health / self.MAX_HEALTH,
-            self.p2_health / self.MAX_HEALTH,
-            self.p1_stamina / self.MAX_STAMINA,
-            self.p2_stamina / self.MAX_STAMINA,
-            self.p1_vx / 10.0,
-            self.p1_vy / 15.0,
-            self.p2_vx / 10.0,
-            self.p2_vy / 15.0,
-            1.0 if self.p1_stun > 0 else 0.0,
-            1.0 if self.p1_attack_timer > 0 else 0.0,
-            1.0 if self.p1_blocking else 0.0,
-            1.0 if self.p1_crouching else 0.0,
-            1.0 if self.p2_stun > 0 else 0.0,
-            1.0 if self.p2_attack_timer > 0 else 0.0,
-            1.0 if self.p2_blocking else 0.0,
-            1.0 if self.p2_crouching else 0.0
-        ], dtype=np.float32)
-        return obs
+        p1, p2 = self.players
+        obs = self._obs
+        obs[0] = (p2[X] - p1[X]) / self.WIDTH
+        obs[1] = (p2[Y] - p1[Y]) / self.HEIGHT
+        obs[2] = p1[HEALTH] / self.MAX_HEALTH
+        obs[3] = p2[HEALTH] / self.MAX_HEALTH
+        obs[4] = p1[STAMINA] / self.MAX_STAMINA
+        obs[5] = p2[STAMINA] / self.MAX_STAMINA
+        obs[6] = p1[VX] / 10.0
+        obs[7] = p1[VY] / 15.0
+        obs[8] = p2[VX] / 10.0
+        obs[9] = p2[VY] / 15.0
+        obs[10] = p1[STUN] > 0
+        obs[11] = p1[ATTACK_TIMER] > 0
+        obs[12] = p1[BLOCKING]
+        obs[13] = p1[CROUCHING]
+        obs[14] = p2[STUN] > 0
+        obs[15] = p2[ATTACK_TIMER] > 0
+        obs[16] = p2[BLOCKING]
+        obs[17] = p2[CROUCHING]
+        # Callers (e.g. DummyVecEnv's terminal_observation) may hold on to the result across resets
+        return obs.copy()
 
     def step(self, action):
+        # A (p1_action, p2_action) pair drives P2 from outside (e.g. batched self-play);
+        # a negative P2 action falls back to the opponent policy
+        p2_action = -1
+        if isinstance(action, (tuple, list, np.ndarray)) and np.ndim(action) == 1:
+            action, p2_action = action
+        if self.decision_interval == 1:
+            return self._step_frame(action, p2_action)
+        total, p2_actions = 0.0, []
+        for _ in range(self.decision_interval):
+            obs, reward, terminated, truncated, info = self._step_frame(action, p2_action)
+            total += reward
+            p2_actions.append(self.p2_last_action)
+            if terminated or truncated:
+                break
+        # What P2 did on each frame, so replays can still be recorded frame by frame
+        info["frames"], info["p2_actions"] = len(p2_actions), p2_actions
+        return obs, total, terminated, truncated, info
+
+    def _step_frame(self, action, p2_action):
         self._apply_action(1, action)
-        
-        if self.p2_action_timer <= 0:
-            if self.p2_personality == 0: # Aggressive
-                if self.p2_x > self.p1_x + 70: self.p2_current_action = 1
-                elif self.p2_x < self.p1_x - 70: self.p2_current_action = 2
-                else: self.p2_current_action = self.np_random.choice([5, 6, 7, 8])
-            elif self.p2_personality == 1: # Defensive
-                self.p2_current_action = 2 if self.p2_x < self.p1_x else 1
-            elif self.p2_personality == 3: self.p2_current_action = 0
-            else: self.p2_current_action = self.action_space.sample()
-            self.p2_action_timer = self.np_random.integers(10, 30)
-        else: self.p2_action_timer -= 1
-            
-        self._apply_action(2, self.p2_current_action)
+        if p2_action < 0: p2_action = self._opponent_action()
+        # Kept so replay recorders see what P2 actually did this frame
+        self.p2_last_action = p2_action
+        self._apply_action(2, p2_action)
         self._apply_physics(1)
         self._apply_physics(2)
         
         reward = self._resolve_combat()
         self._update_stamina()
         
+        p1, p2 = self.players
         # Delta-Distance Reward: Reward for getting closer
-        curr_dist = abs(self.p1_x - self.p2_x) / self.WIDTH
+        curr_dist = abs(p1[X] - p2[X]) / self.WIDTH
         reward += (self.prev_dist - curr_dist) * 5.0 
         self.prev_dist = curr_dist
 
@@ -141,151 +265,119 @@ class FightingGameEnv(gym.Env):
 
         self.current_step += 1
         terminated = False
-        if self.p1_health <= 0 or self.p2_health <= 0:
+        if p1[HEALTH] <= 0 or p2[HEALTH] <= 0:
             terminated = True
-            if self.p2_health <= 0: reward += 50.0 
-            elif self.p1_health <= 0: reward -= 10.0 
+            if p2[HEALTH] <= 0: reward += 50.0 
+            elif p1[HEALTH] <= 0: reward -= 10.0 
         
         truncated = self.current_step >= self.MAX_STEPS
         info = {
-            "is_win": self.p2_health <= 0,
-            "is_loss": self.p1_health <= 0,
-            "p2_health": self.p2_health,
-            "p1_health": self.p1_health
+            "is_win": p2[HEALTH] <= 0,
+            "is_loss": p1[HEALTH] <= 0,
+            "p2_health": p2[HEALTH],
+            "p1_health": p1[HEALTH],
+            "p2_personality": self.p2_personality,
+            "side": self.side
         }
         return self._get_obs(), reward, terminated, truncated, info
 
+    def _opponent_action(self):
+        return self.opponent.act(self)
+
     def _apply_action(self, player_num, action):
-        if player_num == 1:
-            stun, atk, tmr = self.p1_stun, self.p1_attacking, self.p1_attack_timer
-            vx, vy, blk, crch = self.p1_vx, self.p1_vy, self.p1_blocking, self.p1_crouching
-            hit = self.p1_has_hit
-            stm = self.p1_stamina
-        else:
-            stun, atk, tmr = self.p2_stun, self.p2_attacking, self.p2_attack_timer
-            vx, vy, blk, crch = self.p2_vx, self.p2_vy, self.p2_blocking, self.p2_crouching
-            hit = self.p2_has_hit
-            stm = self.p2_stamina
+        p = self.players[player_num - 1]
 
-        if stun > 0: blk = crch = False
-        elif tmr > 0: pass 
+        if p[STUN] > 0: p[BLOCKING] = p[CROUCHING] = False
+        elif p[ATTACK_TIMER] > 0: pass 
         else:
-            blk = crch = False
-            if action == 1: vx = -self.WALK_SPEED
-            elif action == 2: vx = self.WALK_SPEED
+            p[BLOCKING] = p[CROUCHING] = False
+            if action == 1: p[VX] = -self.WALK_SPEED
+            elif action == 2: p[VX] = self.WALK_SPEED
             elif action == 3:
-                y = self.p1_y if player_num == 1 else self.p2_y
-                if y >= self.GROUND_Y - self.PLAYER_HEIGHT:
-                    if player_num == 1: self.p1_vy = self.JUMP_FORCE
-                    else: self.p2_vy = self.JUMP_FORCE
-            elif action == 4: vx = 0; crch = True
-            elif action == 5: vx = 0; blk = stm > 0
-            elif action == 6: atk = 1; tmr = self.LIGHT_ATTACK_DUR; vx = 0; hit = False
-            elif action == 7: atk = 2; tmr = self.HEAVY_ATTACK_DUR; vx = 0; hit = False
-            elif action == 8: atk = 3; tmr = self.SPECIAL_ATTACK_DUR; vx = 0; hit = False
-
-        if tmr <= 0:
-            hit = False
-
-        if player_num == 1:
-            self.p1_vx, self.p1_stun = vx, max(0, stun - 1)
-            self.p1_attacking = atk if tmr > 0 else 0
-            self.p1_attack_timer = max(0, tmr - 1)
-            self.p1_blocking, self.p1_crouching = blk, crch
-            self.p1_has_hit = hit
-        else:
-            self.p2_vx, self.p2_stun = vx, max(0, stun - 1)
-            self.p2_attacking = atk if tmr > 0 else 0
-            self.p2_attack_timer = max(0, tmr - 1)
-            self.p2_blocking, self.p2_crouching = blk, crch
-            self.p2_has_hit = hit
+                if p[Y] >= self.GROUND_Y - self.PLAYER_HEIGHT: p[VY] = self.JUMP_FORCE
+            elif action == 4: p[VX] = 0; p[CROUCHING] = True
+            elif action == 5: p[VX] = 0; p[BLOCKING] = p[STAMINA] > 0
+            else:
+                atk = self.FRAME_DATA.attack_for_action[action]
+                if atk: p[ATTACKING] = atk; p[ATTACK_TIMER] = self.FRAME_DATA.duration[atk]; p[VX] = 0; p[HAS_HIT] = False
 
-    def _update_stamina(self):
-        if self.p1_blocking and self.p1_stamina > 0:
-            self.p1_stamina = max(0.0, self.p1_stamina - self.BLOCK_STAMINA_DRAIN)
+        if p[ATTACK_TIMER] > 0:
+            p[ATTACK_TIMER] -= 1
         else:
-            self.p1_stamina = min(self.MAX_STAMINA, self.p1_stamina + self.BLOCK_STAMINA_REGEN)
-        if self.p1_stamina <= 0:
-            self.p1_blocking = False
+            p[ATTACKING] = 0
+            p[HAS_HIT] = False
+        if p[STUN] > 0:
+            p[STUN] -= 1
 
-        if self.p2_blocking and self.p2_stamina > 0:
-            self.p2_stamina = max(0.0, self.p2_stamina - self.BLOCK_STAMINA_DRAIN)
-        else:
-            self.p2_stamina = min(self.MAX_STAMINA, self.p2_stamina + self.BLOCK_STAMINA_REGEN)
-        if self.p2_stamina <= 0:
-            self.p2_blocking = False
+    def _update_stamina(self):
+        for p in self.players:
+            if p[BLOCKING] and p[STAMINA] > 0:
+                p[STAMINA] = max(0.0, p[STAMINA] - self.BLOCK_STAMINA_DRAIN)
+            else:
+                p[STAMINA] = min(self.MAX_STAMINA, p[STAMINA] + self.BLOCK_STAMINA_REGEN)
+            if p[STAMINA] <= 0:
+                p[BLOCKING] = False
 
     def _apply_block_stamina(self, player_num, blocked_damage):
-        drain = blocked_damage * self.BLOCK_STAMINA_DAMAGE_MULT
-        if player_num == 1:
-            self.p1_stamina = max(0.0, self.p1_stamina - drain)
-            if self.p1_stamina <= 0:
-                self.p1_blocking = False
-        else:
-            self.p2_stamina = max(0.0, self.p2_stamina - drain)
-            if self.p2_stamina <= 0:
-                self.p2_blocking = False
+        p = self.players[player_num - 1]
+        p[STAMINA] = max(0.0, p[STAMINA] - blocked_damage * self.BLOCK_STAMINA_DAMAGE_MULT)
+        if p[STAMINA] <= 0:
+            p[BLOCKING] = False
 
     def _apply_physics(self, player_num):
-        if player_num == 1:
-            h = self.CROUCH_HEIGHT if self.p1_crouching else self.PLAYER_HEIGHT
-            self.p1_x += self.p1_vx; self.p1_y += self.p1_vy; self.p1_vx *= self.DRAG
-            gy = self.GROUND_Y - h
-            if self.p1_y < gy: self.p1_vy += self.GRAVITY
-            else: self.p1_y, self.p1_vy = gy, 0
-            self.p1_x = max(0, min(self.WIDTH - self.PLAYER_WIDTH, self.p1_x))
-        else:
-            h = self.CROUCH_HEIGHT if self.p2_crouching else self.PLAYER_HEIGHT
-            self.p2_x += self.p2_vx; self.p2_y += self.p2_vy; self.p2_vx *= self.DRAG
-            gy = self.GROUND_Y - h
-            if self.p2_y < gy: self.p2_vy += self.GRAVITY
-            else: self.p2_y, self.p2_vy = gy, 0
-            self.p2_x = max(0, min(self.WIDTH - self.PLAYER_WIDTH, self.p2_x))
+        p = self.players[player_num - 1]
+        h = self.CROUCH_HEIGHT if p[CROUCHING] else self.PLAYER_HEIGHT
+        x = p[X] + p[VX]; y = p[Y] + p[VY]; p[VX] *= self.DRAG
+        gy = self.GROUND_Y - h
+        if y < gy: p[VY] += self.GRAVITY
+        else: y, p[VY] = gy, 0
+        p[X] = max(0, min(self.WIDTH - self.PLAYER_WIDTH, x))
+        p[Y] = y
 
     def _resolve_combat(self):
         reward = 0
-        h_opp_prev, h_self_prev = self.p2_health, self.p1_health
-        p1_h = self.CROUCH_HEIGHT if self.p1_crouching else self.PLAYER_HEIGHT
-        p2_h = self.CROUCH_HEIGHT if self.p2_crouching else self.PLAYER_HEIGHT
-        p1_rect = [self.p1_x, self.p1_y, self.PLAYER_WIDTH, p1_h]
-        p2_rect = [self.p2_x, self.p2_y, self.PLAYER_WIDTH, p2_h]
-        
-        def check_collision(r1, r2):
-            return r1[0] < r2[0] + r2[2] and r1[0] + r1[2] > r2[0] and \
-                   r1[1] < r2[1] + r2[3] and r1[1] + r1[3] > r2[1]
-
-        for p in [1, 2]:
-            atk = self.p1_attacking if p == 1 else self.p2_attacking
-            tmr = self.p1_attack_timer if p == 1 else self.p2_attack_timer
-            hit = self.p1_has_hit if p == 1 else self.p2_has_hit
-            if atk > 0 and not hit:
-                if atk == 1: ph, dur = self.LIGHT_PHASES, self.LIGHT_ATTACK_DUR
-                elif atk == 2: ph, dur = self.HEAVY_PHASES, self.HEAVY_ATTACK_DUR
-                else: ph, dur = self.SPECIAL_PHASES, self.SPECIAL_ATTACK_DUR
-                elapsed = dur - tmr
-                if elapsed >= ph[0] and elapsed < (ph[0] + ph[1]):
-                    reach = self.ATTACK_REACH + (20 if atk == 2 else 50 if atk == 3 else 0)
-                    rect = (p1_rect if p == 1 else p2_rect).copy()
-                    if (p == 1 and self.p1_x < self.p2_x) or (p == 2 and self.p2_x < self.p1_x): rect[2] += reach
-                    else: rect[0] -= reach; rect[2] += reach
-                    if check_collision(rect, p2_rect if p == 1 else p1_rect):
-                        if p == 1: reward += 0.2 # Increased incentive for proximity attacking
-                        target_blocking = (self.p2_blocking if p == 1 else self.p1_blocking)
-                        target_stamina = (self.p2_stamina if p == 1 else self.p1_stamina)
-                        if not target_blocking or target_stamina <= 0:
-                            dmg = 3.0 if atk == 1 else 7.0 if atk == 2 else 12.0
-                            stun = self.LIGHT_STUN if atk == 1 else self.HEAVY_STUN if atk == 2 else self.SPECIAL_STUN
-                            if p == 1: self.p2_health -= dmg; self.p2_stun = stun; self.p2_attack_timer = self.p2_attacking = 0; self.p1_has_hit = True
-                            else: self.p1_health -= dmg; self.p1_stun = stun; self.p1_attack_timer = self.p1_attacking = 0; self.p2_has_hit = True
-                            dir = 1 if (p == 1 and self.p1_x < self.p2_x) or (p == 2 and self.p2_x < self.p1_x) else -1
-                            if p == 1: self.p2_vx, self.p1_vx = dir * self.KNOCKBACK_VICTIM, -dir * self.KNOCKBACK_ATTACKER
-                            else: self.p1_vx, self.p2_vx = dir * self.KNOCKBACK_VICTIM, -dir * self.KNOCKBACK_ATTACKER
-                        else:
-                            dmg = 3.0 if atk == 1 else 7.0 if atk == 2 else 12.0
-                            self._apply_block_stamina(2 if p == 1 else 1, dmg)
+        p1, p2 = self.players
+        h_opp_prev, h_self_prev = p2[HEALTH], p1[HEALTH]
+        heights = (self.CROUCH_HEIGHT if p1[CROUCHING] else self.PLAYER_HEIGHT,
+                   self.CROUCH_HEIGHT if p2[CROUCHING] else self.PLAYER_HEIGHT)
+
+        fd = self.FRAME_DATA
+        for a in (0, 1):
+            att, tgt = self.players[a], self.players[1 - a]
+            atk = att[ATTACKING]
+            if atk > 0 and not att[HAS_HIT] and fd.active[atk][fd.duration[atk] - att[ATTACK_TIMER]]:
+                reach = fd.reach[atk]
+                # Hitbox is the attacker's body extended by reach towards the opponent
+                facing_right = att[X] < tgt[X]
+                hit_x = att[X] if facing_right else att[X] - reach
+                if hit_x < tgt[X] + self.PLAYER_WIDTH and hit_x + self.PLAYER_WIDTH + reach > tgt[X] and \
+                   att[Y] < tgt[Y] + heights[1 - a] and att[Y] + heights[a] > tgt[Y]:
+                    if a == 0: reward += 0.2 # Increased incentive for proximity attacking
+                    dmg = fd.damage[atk]
+                    if not tgt[BLOCKING] or tgt[STAMINA] <= 0:
+                        tgt[HEALTH] -= dmg; tgt[STUN] = fd.stun[atk]; tgt[ATTACK_TIMER] = tgt[ATTACKING] = 0; att[HAS_HIT] = True
+                        dir = 1 if facing_right else -1
+                        tgt[VX], att[VX] = dir * fd.knockback_victim[atk], -dir * fd.knockback_attacker[atk]
+                    else:
+                        self._apply_block_stamina(2 - a, dmg)
 
         # Combat Reward Scaling (Aggressive 2:1)
-        dmg_dealt, dmg_taken = max(0, h_opp_prev - self.p2_health), max(0, h_self_prev - self.p1_health)
+        dmg_dealt, dmg_taken = max(0, h_opp_prev - p2[HEALTH]), max(0, h_self_prev - p1[HEALTH])
         reward += 2.0 * dmg_dealt - 1.0 * dmg_taken
             
         return reward
+
+
+def _player_field(player, field):
+    def fget(self):
+        return self.players[player][field]
+
+    def fset(self, value):
+        self.players[player][field] = value
+
+    return property(fget, fset)
+
+# Named accessors (p1_x, p2_stun, ...) kept for tests and debugging scripts
+for _field, _name in enumerate(PLAYER_FIELDS):
+    setattr(FightingGameEnv, f"p1_{_name}", _player_field(0, _field))
+    setattr(FightingGameEnv, f"p2_{_name}", _player_field(1, _field))
@@ -0,0 +1,42 @@
+import numpy as np
+
+class FrameData:
+    """
+    Move properties from ``rules.ATTACKS`` as lookup tables.
+
+    Per-move tables are indexed by attack type (the ``attacking`` value, 0 = not attacking);
+    ``active`` is additionally indexed by elapsed frame (``duration - attack_timer``), so a
+    combat check is ``active[atk, elapsed]`` for both the scalar and the batched engine.
+    """
+
+    def __init__(self, rules):
+        moves = rules.ATTACKS
+        n = len(moves)
+        self.duration = np.zeros(n, dtype=np.int64)
+        self.reach = np.zeros(n)
+        self.damage = np.zeros(n)
+        self.stun = np.zeros(n, dtype=np.int64)
+        self.knockback_victim = np.zeros(n)
+        self.knockback_attacker = np.zeros(n)
+        self.active = np.zeros((n, max(m["duration"] for m in moves if m) + 1), dtype=bool)
+
+        for atk, move in enumerate(moves):
+            if move is None:
+                continue
+            startup, active = move["phases"][0], move["phases"][1]
+            self.duration[atk] = move["duration"]
+            self.reach[atk] = move["reach"]
+            self.damage[atk] = move["damage"]
+            self.stun[atk] = move["stun"]
+            self.knockback_victim[atk] = move.get("knockback_victim", rules.KNOCKBACK_VICTIM)
+            self.knockback_attacker[atk] = move.get("knockback_attacker", rules.KNOCKBACK_ATTACKER)
+            self.active[atk, startup:startup + active] = True
+
+        # Attack type started by each action (0 for non-attack actions)
+        self.attack_for_action = np.array(rules.ATTACK_FOR_ACTION, dtype=np.int64)
+
+    def tolist(self):
+        # Same tables as nested Python lists, which are faster to index one value at a time
+        tables = FrameData.__new__(FrameData)
+        tables.__dict__ = {name: table.tolist() for name, table in self.__dict__.items()}
+        return tables
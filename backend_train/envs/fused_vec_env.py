@@ -0,0 +1,165 @@
+import pickle
+import time
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.running_mean_std import RunningMeanStd
+from stable_baselines3.common.vec_env import VecNormalize
+
+
+def update_rms(rms, batch):
+    """
+    ``RunningMeanStd.update`` with the moments computed by the same ufunc reductions ``np.mean``
+    and ``np.var`` use (identical results), minus their per-call Python overhead.
+    """
+    n = batch.shape[0]
+    mean = np.add.reduce(batch, axis=0, keepdims=True)
+    mean /= n
+    x = batch - mean
+    np.multiply(x, x, out=x)
+    var = np.add.reduce(x, axis=0)
+    var /= n
+    rms.update_from_moments(mean[0], var, n)
+
+
+class FusedVecEnv(VecNormalize):
+    """
+    ``VecMonitor`` + ``VecFrameStack`` + ``VecNormalize`` (and optionally ``TimeLimit``) in one
+    wrapper around a vec env of bare ``FightingGameEnv``s (no ``TimeLimit`` / ``Monitor``).
+
+    Frames live in a mirrored ring buffer: each frame is written to slot ``h`` and ``h + n_stack``
+    of a ``(num_envs, 2 * n_stack, features)`` array, so the last ``n_stack`` frames are always
+    the contiguous window ``h + 1 .. h + n_stack`` and stacking never shifts memory. Statistics
+    are updated with exactly the arrays ``VecFrameStack`` would hand ``VecNormalize``, so
+    observations, rewards and ``obs_rms`` / ``ret_rms`` match the wrapper stack numerically.
+
+    It is a ``VecNormalize``: ``CheckpointCallback(save_vecnormalize=True)``, ``get_original_reward``
+    and the export scripts work unchanged, and ``save`` writes a plain ``VecNormalize`` over the
+    stacked observations that ``VecNormalize.load(path, VecFrameStack(...))`` can read.
+    """
+
+    def __init__(self, venv, n_stack=4, max_episode_steps=None, training=True, norm_obs=True, norm_reward=True,
+                 clip_obs=10.0, clip_reward=10.0, gamma=0.99, epsilon=1e-8):
+        super().__init__(venv, training=training, norm_obs=norm_obs, norm_reward=norm_reward, clip_obs=clip_obs,
+                         clip_reward=clip_reward, gamma=gamma, epsilon=epsilon)
+        space = venv.observation_space
+        self.observation_space = spaces.Box(np.repeat(space.low, n_stack, axis=-1), np.repeat(space.high, n_stack, axis=-1),
+                                            dtype=space.dtype)
+        self.obs_rms = RunningMeanStd(shape=self.observation_space.shape)
+        # Everything VecNormalize itself pickles; the fused state below is never saved
+        self._vec_normalize_keys = set(self.__dict__)
+
+        self.n_stack = n_stack
+        self.n_features = space.shape[-1]
+        self.max_episode_steps = max_episode_steps
+        self.frames = np.zeros((self.num_envs, 2 * n_stack, self.n_features), dtype=space.dtype)
+        self._scratch = np.zeros((self.num_envs, n_stack * self.n_features))
+        self.head = n_stack - 1
+        self.episode_returns = np.zeros(self.num_envs)
+        self.episode_lengths = np.zeros(self.num_envs, dtype=np.int64)
+        self.t_start = time.time()
+
+    def _window(self):
+        # View of the stacked observations, oldest frame first, like VecFrameStack
+        return self.frames[:, self.head + 1:self.head + 1 + self.n_stack].reshape(self.num_envs, -1)
+
+    def _push(self, obs, done_idx):
+        self.head = (self.head + 1) % self.n_stack
+        self.frames[done_idx] = 0
+        self.frames[:, self.head] = obs
+        self.frames[:, self.head + self.n_stack] = obs
+
+    def _normalize(self, obs):
+        # VecNormalize.normalize_obs without its defensive deepcopy; the result is a new array
+        return self._normalize_obs(obs, self.obs_rms).astype(np.float32) if self.norm_obs else obs.copy()
+
+    def _normalize_window(self, window):
+        # Same float64 operations as VecNormalize._normalize_obs, done in place in a scratch buffer
+        if not self.norm_obs:
+            return window.copy()
+        x = np.subtract(window, self.obs_rms.mean, out=self._scratch)
+        np.divide(x, np.sqrt(self.obs_rms.var + self.epsilon), out=x)
+        np.clip(x, -self.clip_obs, self.clip_obs, out=x)
+        return x.astype(np.float32)
+
+    def _truncate(self, obs, dones, infos):
+        # Episodes that hit max_episode_steps end here, TimeLimit style, even if the env would go on
+        idx = np.flatnonzero((self.episode_lengths >= self.max_episode_steps) & ~dones)
+        if idx.size == 0:
+            return
+        reset_matches = getattr(self.venv, "reset_matches", None)
+        if reset_matches is not None:
+            # BatchedFightingEnv: matches are rows of one batch, not envs with their own reset()
+            reset_obs = reset_matches(idx)
+        else:
+            reset_obs = [reset[0] for reset in self.venv.env_method("reset", indices=idx.tolist())]
+        for i, new_obs in zip(idx, reset_obs):
+            infos[i]["TimeLimit.truncated"] = True
+            infos[i]["terminal_observation"] = obs[i].copy()
+            obs[i] = new_obs
+        dones[idx] = True
+
+    def reset(self):
+        obs = self.venv.reset()
+        self.frames[:] = 0
+        self.head = self.n_stack - 1
+        self._push(obs, slice(0, 0))
+        self.returns = np.zeros(self.num_envs)
+        self.episode_returns[:] = 0
+        self.episode_lengths[:] = 0
+        window = self._window()
+        if self.training and self.norm_obs:
+            update_rms(self.obs_rms, window)
+        return self._normalize_window(window)
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self.old_reward = rewards
+        self.episode_returns += rewards
+        self.episode_lengths += 1
+        if self.max_episode_steps is not None:
+            self._truncate(obs, dones, infos)
+
+        done_idx = np.flatnonzero(dones)
+        previous = self._window()
+        terminals = {}
+        for i in done_idx:
+            if "terminal_observation" in infos[i]:
+                terminals[i] = np.concatenate((previous[i, self.n_features:], infos[i]["terminal_observation"]))
+            infos[i]["episode"] = {"r": round(float(self.episode_returns[i]), 6), "l": int(self.episode_lengths[i]),
+                                   "t": round(time.time() - self.t_start, 6)}
+        self.episode_returns[done_idx] = 0
+        self.episode_lengths[done_idx] = 0
+
+        self._push(obs, done_idx)
+        window = self._window()
+        if self.training and self.norm_obs:
+            update_rms(self.obs_rms, window)
+        obs = self._normalize_window(window)
+        if self.training:
+            self._update_reward(rewards)
+        rewards = self.normalize_reward(rewards)
+        for i, terminal in terminals.items():
+            infos[i]["terminal_observation"] = self._normalize(terminal)
+        self.returns[dones] = 0
+        return obs, rewards, dones, infos
+
+    def _update_reward(self, reward):
+        self.returns = self.returns * self.gamma + reward
+        update_rms(self.ret_rms, self.returns)
+
+    def get_original_obs(self):
+        return self._window().copy()
+
+    def to_vec_normalize(self):
+        """Plain, unattached ``VecNormalize`` with this wrapper's statistics and settings."""
+        vec_normalize = VecNormalize.__new__(VecNormalize)
+        state = self.__getstate__()
+        vec_normalize.__dict__.update({key: state[key] for key in self._vec_normalize_keys if key in state})
+        # Dropped again by VecNormalize.__getstate__, as for any unattached VecNormalize
+        vec_normalize.venv, vec_normalize.class_attributes, vec_normalize.returns = None, {}, None
+        return vec_normalize
+
+    def save(self, save_path):
+        with open(save_path, "wb") as f:
+            pickle.dump(self.to_vec_normalize(), f)
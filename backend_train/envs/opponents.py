@@ -0,0 +1,63 @@
+import numpy as np
+
+# Observation layout swaps between the players' points of view: dx and dy change sign,
+# every (p1, p2) feature pair is exchanged.
+MIRROR_INDEX = np.array([0, 1, 3, 2, 5, 4, 8, 9, 6, 7, 14, 15, 16, 17, 10, 11, 12, 13])
+MIRROR_SIGN = np.ones(18, dtype=np.float32)
+MIRROR_SIGN[:2] = -1.0
+
+# Bot Personality: 0: Aggressive, 1: Defensive, 2: Random, 3: Passive (Wait)
+PERSONALITIES = ("aggressive", "defensive", "random", "passive")
+# 50% chance of Passive to encourage AI to initiate
+PERSONALITY_PROBS = [0.3, 0.1, 0.1, 0.5]
+
+
+def mirror_obs(obs):
+    """P2's view of one or more 18-feature P1 observations."""
+    return obs[..., MIRROR_INDEX] * MIRROR_SIGN
+
+
+class OpponentPolicy:
+    """
+    Decides P2's action inside ``FightingGameEnv.step``.
+
+    ``reset`` is called once per episode (it may draw from ``env.np_random``), ``act`` once per
+    frame. Opponents whose decisions come from outside the env (frozen networks evaluated in
+    batch) are fed through ``step((p1_action, p2_action))`` instead, see ``envs.self_play``.
+    """
+
+    def reset(self, env):
+        pass
+
+    def act(self, env):
+        raise NotImplementedError
+
+
+class ScriptedOpponent(OpponentPolicy):
+    """The built-in bot. ``personality=None`` draws one of PERSONALITIES per episode."""
+
+    def __init__(self, personality=None):
+        self.personality = personality
+
+    def reset(self, env):
+        if self.personality is None:
+            env.p2_personality = env.np_random.choice([0, 1, 2, 3], p=PERSONALITY_PROBS)
+        else:
+            env.p2_personality = self.personality
+        env.p2_action_timer = 0
+        env.p2_current_action = 0
+
+    def act(self, env):
+        if env.p2_action_timer <= 0:
+            p1_x, p2_x = env.p1_x, env.p2_x
+            if env.p2_personality == 0: # Aggressive
+                if p2_x > p1_x + 70: env.p2_current_action = 1
+                elif p2_x < p1_x - 70: env.p2_current_action = 2
+                else: env.p2_current_action = env.np_random.choice([5, 6, 7, 8])
+            elif env.p2_personality == 1: # Defensive
+                env.p2_current_action = 2 if p2_x < p1_x else 1
+            elif env.p2_personality == 3: env.p2_current_action = 0
+            else: env.p2_current_action = env.action_space.sample()
+            env.p2_action_timer = env.np_random.integers(10, 30)
+        else: env.p2_action_timer -= 1
+        return env.p2_current_action
@@ -0,0 +1,218 @@
+import hashlib
+import os
+
+import gymnasium as gym
+import numpy as np
+
+from envs.fighting_env import FightingGameEnv
+
+# Replays are two append-only files next to each other:
+#   <path>.frames  one byte per frame, p1_action | p2_action << 4
+#   <path>.index   MAGIC followed by one INDEX_DTYPE record per finished episode
+# The simulation is deterministic given the reset seed, the starting side and both players'
+# actions, so that is all we store; the bot's own RNG never needs to be reproduced.
+MAGIC = b"NNRPLAY1"
+# seek() bookmarks the state every KEYFRAME_INTERVAL frames of the episode it last visited
+KEYFRAME_INTERVAL = 100
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),      # first byte of the episode in the frames file
+    ("length", "<u4"),      # number of frames
+    ("seed", "<u8"),        # seed passed to reset()
+    ("personality", "i1"),  # P2 bot personality, -1 if P2 was not the scripted bot
+    ("side", "i1"),         # starting side, see FightingGameEnv.reset
+    ("outcome", "i1"),      # 1 win, -1 loss, 0 time out
+    ("checksum", "<u8"),    # state_checksum() of the final frame
+])
+
+
+def state_checksum(env):
+    """64-bit digest of both players' state, used to check bit-exact re-simulation."""
+    state = np.array(env.players, dtype=np.float64)
+    return int.from_bytes(hashlib.blake2b(state.tobytes(), digest_size=8).digest(), "little")
+
+
+class RecordReplay(gym.Wrapper):
+    """
+    Records every episode of a ``FightingGameEnv`` into a replay file.
+
+    Wrap the bare env (inside ``TimeLimit`` / ``Monitor``) and give each process its own
+    ``path``; files are only appended to, so readers can keep them memory-mapped while
+    training writes more. Resets without a seed get one drawn from ``seed`` so that every
+    recorded episode can be re-simulated.
+    """
+
+    def __init__(self, env, path, seed=None):
+        super().__init__(env)
+        self.path = path
+        self.rng = np.random.default_rng(seed)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        index_path = path + ".index"
+        if os.path.exists(index_path) and os.path.getsize(index_path) > 0:
+            with open(index_path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{index_path} is not a replay index")
+            self.index_file = open(index_path, "ab")
+        else:
+            self.index_file = open(index_path, "wb")
+            self.index_file.write(MAGIC)
+        self.frames_file = open(path + ".frames", "ab")
+        self.offset = self.frames_file.tell()
+        self.frames = bytearray()
+        self.episode = None
+
+    def reset(self, seed=None, options=None):
+        if self.frames:
+            self._write_episode(0)
+        if seed is None:
+            seed = int(self.rng.integers(2**63))
+        obs, info = self.env.reset(seed=seed, options=options)
+        env = self.unwrapped
+        self.episode = (seed, getattr(env, "p2_personality", -1), env.side)
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        p1_action = action[0] if np.ndim(action) == 1 else action
+        # Action repeat plays several frames per step; replays always store single frames
+        for p2_action in info.get("p2_actions", (self.unwrapped.p2_last_action,)):
+            self.frames.append(int(p1_action) | int(p2_action) << 4)
+        if terminated or truncated:
+            self._write_episode(1 if info["is_win"] else -1 if info["is_loss"] else 0)
+        return obs, reward, terminated, truncated, info
+
+    def _write_episode(self, outcome):
+        seed, personality, side = self.episode
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record[0] = (self.offset, len(self.frames), seed, personality, side, outcome, state_checksum(self.unwrapped))
+        self.frames_file.write(self.frames)
+        # The two files are buffered separately: push the frames out before the record that
+        # points at them, so a reader never sees an index record past the end of the frames file
+        self.frames_file.flush()
+        self.index_file.write(record.tobytes())
+        self.offset += len(self.frames)
+        self.frames = bytearray()
+
+    def flush(self):
+        self.frames_file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        if not self.index_file.closed:
+            if self.frames:
+                self._write_episode(0)
+            self.flush()
+            self.frames_file.close()
+            self.index_file.close()
+        super().close()
+
+
+class ReplayPlayer:
+    """
+    Memory-mapped reader for replay files written by ``RecordReplay``.
+
+    ``index`` is a structured array of ``INDEX_DTYPE`` records; ``actions(i)`` returns episode
+    ``i`` as an (n, 2) array of (p1, p2) actions, ``simulate(i, frame)`` re-runs it up to
+    ``frame`` (``seek`` does the same from bookmarked states) and ``observations`` collects what
+    the policy saw. Call ``reload`` to see episodes
+    appended since opening.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.env = FightingGameEnv()
+        self.keyframes = (None, [])
+        self.reload()
+
+    def reload(self):
+        index_path, frames_path = self.path + ".index", self.path + ".frames"
+        with open(index_path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{index_path} is not a replay index")
+        # Ignore a partially written trailing record
+        n = (os.path.getsize(index_path) - len(MAGIC)) // INDEX_DTYPE.itemsize
+        frames_size = os.path.getsize(frames_path)
+        empty = n == 0 or frames_size == 0
+        self.index = np.zeros(0, INDEX_DTYPE) if empty else np.memmap(index_path, INDEX_DTYPE, "r", len(MAGIC), (n,))
+        self.frames = np.zeros(0, np.uint8) if empty else np.memmap(frames_path, np.uint8, "r")
+        # and records whose frames have not reached the file yet (a writer killed mid-episode,
+        # or one from before frames were flushed ahead of the index); episodes are appended in order
+        ends = self.index["offset"] + self.index["length"]
+        self.index = self.index[:int(np.searchsorted(ends, frames_size, side="right"))]
+
+    def __len__(self):
+        return len(self.index)
+
+    def actions(self, i):
+        record = self.index[i]
+        packed = self.frames[record["offset"]:record["offset"] + record["length"]]
+        return np.stack([packed & 0x0F, packed >> 4], axis=1)
+
+    def _start(self, record):
+        obs, _ = self.env.reset(seed=int(record["seed"]), options={"side": int(record["side"])})
+        self.env.p2_personality = int(record["personality"])
+        return obs
+
+    def simulate(self, i, frame=None, callback=None):
+        """
+        Re-simulate episode ``i`` for ``frame`` frames (the whole episode by default) and return
+        the env in that state. ``callback(env, frame, obs, reward, info)`` runs after each frame.
+        """
+        record = self.index[i]
+        env = self.env
+        self._start(record)
+        n = int(record["length"]) if frame is None else min(frame, int(record["length"]))
+        # P2 is driven from the recorded actions, the bot never runs
+        for t, pair in enumerate(self.actions(i)[:n].tolist()):
+            obs, reward, _, _, info = env.step(pair)
+            if callback is not None:
+                callback(env, t + 1, obs, reward, info)
+        return env
+
+    def seek(self, i, frame):
+        """
+        Same as ``simulate(i, frame)``, but from the nearest keyframe: the first seek into an
+        episode re-simulates it once and bookmarks its state every ``KEYFRAME_INTERVAL`` frames,
+        later seeks into it step at most that many frames.
+        """
+        env = self.env
+        actions = self.actions(i).tolist()
+        if self.keyframes[0] != i:
+            self._start(self.index[i])
+            keyframes = [env.get_state()]
+            for t, pair in enumerate(actions[:-1], 1):
+                env.step(pair)
+                if t % KEYFRAME_INTERVAL == 0:
+                    keyframes.append(env.get_state())
+            self.keyframes = (i, keyframes)
+        frame = min(frame, len(actions))
+        k = min(frame // KEYFRAME_INTERVAL, len(self.keyframes[1]) - 1)
+        env.set_state(self.keyframes[1][k])
+        for pair in actions[k * KEYFRAME_INTERVAL:frame]:
+            env.step(pair)
+        return env
+
+    def observations(self, indices=None, n_stack=1, stride=1):
+        """
+        Re-simulate episodes and return the P1 observations of every ``stride``-th frame as a
+        float32 array, stacked the way VecFrameStack stacks them (zeros before the first frame).
+        """
+        indices = range(len(self)) if indices is None else indices
+        rows = []
+        for i in indices:
+            obs = self._start(self.index[i])
+            stack = np.zeros((n_stack, len(obs)), np.float32)
+            stack[-1] = obs
+            rows.append(stack.ravel())
+            # The final observation is never acted on, so it is left out
+            for t, pair in enumerate(self.actions(i)[:-1].tolist(), 1):
+                stack = np.roll(stack, -1, axis=0)
+                stack[-1] = self.env.step(pair)[0]
+                if t % stride == 0:
+                    rows.append(stack.ravel())
+        return np.stack(rows) if rows else np.zeros((0, n_stack * self.env.observation_space.shape[0]), np.float32)
+
+    def verify(self, indices=None):
+        """Re-simulate episodes and return the indices whose final state differs from the recording."""
+        indices = range(len(self)) if indices is None else indices
+        return [i for i in indices if state_checksum(self.simulate(i)) != int(self.index[i]["checksum"])]
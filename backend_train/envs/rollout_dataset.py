@@ -0,0 +1,241 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+# A dataset is a directory of chunks, each a set of preallocated .npy files of CHUNK_SIZE rows
+# (one row per env per step, in step order), plus manifest.json listing the chunks and how many
+# rows of each are filled. Unfilled rows of the last chunk are never written, so they cost no disk
+# on filesystems with sparse files.
+MANIFEST = "manifest.json"
+CHUNK_SIZE = 1 << 20
+# Bits of the "flags" field
+WIN, LOSS, TRUNCATED = 1, 2, 4
+
+
+def _write_manifest(directory, manifest):
+    tmp = os.path.join(directory, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+
+class VecRecordRollouts(VecEnvWrapper):
+    """
+    Streams every transition of a vec env into a ``RolloutDataset`` directory.
+
+    Wrap the vec env of bare frames (below ``VecFrameStack`` / ``VecNormalize``) to record raw
+    observations and rewards: per row ``obs``, the P1 ``actions`` taken on it, ``rewards``,
+    ``dones``, ``flags`` (WIN / LOSS / TRUNCATED) and the ``env`` index. Steps are copied into an
+    in-memory block of ``block_steps`` steps; full blocks are handed to a background thread that
+    writes them into memory-mapped chunks, so training only waits if the disk falls
+    ``max_pending`` blocks behind. Recording into an existing dataset appends new chunks.
+    """
+
+    def __init__(self, venv, directory, chunk_size=CHUNK_SIZE, block_steps=256, max_pending=4):
+        super().__init__(venv)
+        self.directory = directory
+        self.block_steps = block_steps
+        os.makedirs(directory, exist_ok=True)
+
+        n = self.num_envs
+        obs_space = venv.observation_space
+        action_dtype = np.min_scalar_type(venv.action_space.n - 1) if isinstance(venv.action_space, spaces.Discrete) \
+            else venv.action_space.dtype
+        self.fields = {
+            "obs": (obs_space.dtype, obs_space.shape),
+            "actions": (action_dtype, venv.action_space.shape),
+            "rewards": (np.float32, ()),
+            "dones": (np.bool_, ()),
+            "flags": (np.uint8, ()),
+            "env": (np.min_scalar_type(n - 1), ()),
+        }
+        manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+            if self.manifest["fields"] != self._field_specs():
+                raise ValueError(f"{directory} holds a dataset with different fields")
+        else:
+            self.manifest = {"chunk_size": chunk_size, "fields": self._field_specs(), "chunks": []}
+        self.chunk_size = self.manifest["chunk_size"]
+
+        self.block = self._new_block()
+        self.t = 0
+        self.env_index = np.arange(n)
+        self.last_obs = None
+        self.chunk = None
+        self.filled = 0
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._writer, name="rollout-writer", daemon=True)
+        self.thread.start()
+
+    def _field_specs(self):
+        return {name: [np.dtype(dtype).str, list(shape)] for name, (dtype, shape) in self.fields.items()}
+
+    def _new_block(self):
+        return {name: np.zeros((self.block_steps, self.num_envs, *shape), dtype)
+                for name, (dtype, shape) in self.fields.items()}
+
+    def reset(self):
+        self.last_obs = self.venv.reset()
+        return self.last_obs
+
+    def step_async(self, actions):
+        actions = np.asarray(actions)
+        # Self-play (p1, p2) pairs: P1's action is the one taken on the recorded observation
+        self.block["actions"][self.t] = actions[:, 0] if actions.ndim > 1 and self.fields["actions"][1] == () else actions
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        if self.error is not None:
+            raise RuntimeError("Background rollout write failed") from self.error
+        obs, rewards, dones, infos = self.venv.step_wait()
+        block, t = self.block, self.t
+        block["obs"][t] = self.last_obs
+        block["rewards"][t] = rewards
+        block["dones"][t] = dones
+        block["env"][t] = self.env_index
+        flags = block["flags"][t]
+        flags[:] = 0
+        for i in np.flatnonzero(dones):
+            info = infos[i]
+            flags[i] = WIN * bool(info.get("is_win")) | LOSS * bool(info.get("is_loss")) | \
+                TRUNCATED * bool(info.get("TimeLimit.truncated"))
+        self.last_obs = obs
+        self.t += 1
+        if self.t == self.block_steps:
+            self._submit()
+        return obs, rewards, dones, infos
+
+    def _submit(self):
+        if self.t:
+            # Rows in (step, env) order; the writer owns the block from here on
+            self.queue.put(({name: a[:self.t].reshape(-1, *a.shape[2:]) for name, a in self.block.items()}, self.t * self.num_envs))
+            self.block = self._new_block()
+            self.t = 0
+
+    def _writer(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    self._close_chunk()
+                    return
+                self._write(*item)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _open_chunk(self):
+        name = f"chunk_{len(self.manifest['chunks']):05d}"
+        os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+        self.chunk_name = name
+        self.chunk = {field: np.lib.format.open_memmap(os.path.join(self.directory, name, f"{field}.npy"), mode="w+",
+                                                       dtype=dtype, shape=(self.chunk_size, *shape))
+                      for field, (dtype, shape) in self.fields.items()}
+        self.filled = 0
+
+    def _write(self, block, rows):
+        offset = 0
+        while offset < rows:
+            if self.chunk is None:
+                self._open_chunk()
+            k = min(rows - offset, self.chunk_size - self.filled)
+            for field, array in self.chunk.items():
+                array[self.filled:self.filled + k] = block[field][offset:offset + k]
+            self.filled += k
+            offset += k
+            if self.filled == self.chunk_size:
+                self._close_chunk()
+
+    def _close_chunk(self):
+        if self.chunk is None:
+            return
+        for array in self.chunk.values():
+            array.flush()
+        self.chunk = None
+        if self.filled:
+            self.manifest["chunks"].append({"name": self.chunk_name, "length": self.filled})
+            _write_manifest(self.directory, self.manifest)
+
+    def flush(self):
+        """Write the current partial block (it ends up in the current chunk, which stays open)."""
+        self._submit()
+        self.queue.join()
+        if self.error is not None:
+            raise RuntimeError("Background rollout write failed") from self.error
+
+    def close(self):
+        if self.thread.is_alive():
+            self._submit()
+            self.queue.put(None)
+            self.thread.join()
+        self.venv.close()
+        if self.error is not None:
+            raise RuntimeError("Background rollout write failed") from self.error
+
+
+class RolloutDataset:
+    """
+    Memory-mapped reader for ``VecRecordRollouts`` directories.
+
+    ``dataset[field]`` loads one field completely; ``minibatches`` streams shuffled minibatches
+    without loading the dataset: chunks are visited in random order and shuffled within, so reads
+    stay inside one mapped chunk at a time. Call ``reload`` to see chunks completed since opening.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.reload()
+
+    def reload(self):
+        with open(os.path.join(self.directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.fields = list(self.manifest["fields"])
+        self.chunks = [{field: np.load(os.path.join(self.directory, chunk["name"], f"{field}.npy"), mmap_mode="r")[:chunk["length"]]
+                        for field in self.fields} for chunk in self.manifest["chunks"]]
+        self.offsets = np.cumsum([0] + [chunk["length"] for chunk in self.manifest["chunks"]])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def __getitem__(self, field):
+        return np.concatenate([chunk[field] for chunk in self.chunks])
+
+    def minibatches(self, batch_size, fields=None, shuffle=True, seed=None, drop_last=False):
+        """
+        Yield dicts of ``fields`` (all by default) for ``batch_size`` rows, plus their dataset row
+        numbers as ``"index"``. Every row is visited once per pass.
+        """
+        fields = fields or self.fields
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.chunks)) if shuffle else range(len(self.chunks))
+        pending = []
+        for c in order:
+            chunk, n = self.chunks[c], self.offsets[c + 1] - self.offsets[c]
+            rows = rng.permutation(n) if shuffle else np.arange(n)
+            for start in range(0, n, batch_size):
+                # Sorted rows read the memory map front to back
+                idx = np.sort(rows[start:start + batch_size])
+                batch = {field: chunk[field][idx] for field in fields}
+                batch["index"] = idx + self.offsets[c]
+                if len(idx) == batch_size:
+                    yield batch
+                    continue
+                # A chunk's last partial batch is merged with the next chunk's
+                pending.append(batch)
+                if sum(len(b["index"]) for b in pending) >= batch_size:
+                    merged = {key: np.concatenate([b[key] for b in pending]) for key in pending[0]}
+                    yield {key: value[:batch_size] for key, value in merged.items()}
+                    pending = [{key: value[batch_size:] for key, value in merged.items()}]
+        if pending and not drop_last:
+            merged = {key: np.concatenate([b[key] for b in pending]) for key in pending[0]}
+            if len(merged["index"]):
+                yield merged
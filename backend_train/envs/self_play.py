@@ -0,0 +1,181 @@
+import glob
+import os
+import pickle
+import re
+
+import numpy as np
+import torch as th
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+from envs.opponents import mirror_obs
+from model_hash import saved_attribute
+
+
+def find_vecnormalize(model_path):
+    """
+    The VecNormalize stats a model was trained with, or None. Checkpoints only match their own
+    ``<prefix>_vecnormalize_<N>_steps.pkl``; other models the stats file named by their saved
+    ``vec_normalize_file`` attribute (see train_fast.py). Never falls back to another run's stats:
+    train.py models were trained without normalization.
+    """
+    base = model_path[:-4] if model_path.endswith(".zip") else model_path
+    folder, name = os.path.split(base)
+    match = re.match(r"(.*)_(\d+)_steps$", name)
+    if match:
+        path = os.path.join(folder, f"{match.group(1)}_vecnormalize_{match.group(2)}_steps.pkl")
+    else:
+        own = saved_attribute(base, "vec_normalize_file") if os.path.exists(base + ".zip") else None
+        path = os.path.join(folder, own) if own else None
+    return path if path and os.path.exists(path) else None
+
+
+class FrozenPolicy:
+    """A PPO snapshot kept on CPU for batched, gradient-free action selection."""
+
+    def __init__(self, model_path, stats_path=None, device="cpu"):
+        from stable_baselines3 import PPO
+
+        self.path = model_path
+        self.policy = PPO.load(model_path, device=device).policy
+        self.policy.set_training_mode(False)
+        self.obs_rms = None
+        if stats_path is not None:
+            with open(stats_path, "rb") as f:
+                vec_normalize = pickle.load(f)
+            if vec_normalize.norm_obs:
+                self.obs_rms = vec_normalize.obs_rms
+                self.clip_obs = vec_normalize.clip_obs
+                self.epsilon = vec_normalize.epsilon
+
+    def normalize(self, obs):
+        if self.obs_rms is None:
+            return obs
+        return np.clip((obs - self.obs_rms.mean) / np.sqrt(self.obs_rms.var + self.epsilon), -self.clip_obs, self.clip_obs)
+
+    def act(self, stacked_obs, deterministic=False):
+        obs = th.as_tensor(self.normalize(stacked_obs), dtype=th.float32, device=self.policy.device)
+        with th.no_grad():
+            actions = self.policy.get_distribution(obs).get_actions(deterministic=deterministic)
+        return actions.cpu().numpy()
+
+
+class SnapshotPool:
+    """
+    Frozen policies loaded once and sampled per episode.
+
+    ``from_dir`` tracks the newest ``max_size`` checkpoints matching ``pattern``; ``refresh``
+    picks up checkpoints written since, loading only the new ones. Snapshots act once per env
+    step, so only checkpoints trained with the env's ``decision_interval`` are used.
+    """
+
+    def __init__(self, model_paths=(), directory=None, pattern="*.zip", max_size=8, device="cpu", decision_interval=1):
+        self.directory = directory
+        self.pattern = pattern
+        self.max_size = max_size
+        self.device = device
+        self.decision_interval = decision_interval
+        self.policies = []
+        mismatched = [path for path in model_paths if not self._matches(path)]
+        if mismatched:
+            raise ValueError(f"{mismatched} were not trained with decision_interval={decision_interval}")
+        self._load(list(model_paths))
+
+    @classmethod
+    def from_dir(cls, directory="models", pattern="ppo_fast_checkpoint_*_steps.zip", max_size=8, device="cpu", decision_interval=1):
+        pool = cls(directory=directory, pattern=pattern, max_size=max_size, device=device, decision_interval=decision_interval)
+        pool.refresh()
+        return pool
+
+    def _load(self, paths):
+        cached = {p.path: p for p in self.policies}
+        self.policies = [cached.get(path) or FrozenPolicy(path, find_vecnormalize(path), self.device) for path in paths]
+
+    def refresh(self):
+        if self.directory is None:
+            return
+        paths = sorted(glob.glob(os.path.join(self.directory, self.pattern)), key=os.path.getmtime)
+        self._load([path for path in paths if self._matches(path)][-self.max_size:])
+
+    def _matches(self, path):
+        return saved_attribute(path, "decision_interval", 1) == self.decision_interval
+
+    def __len__(self):
+        return len(self.policies)
+
+
+class VecSelfPlay(VecEnvWrapper):
+    """
+    Lets frozen PPO snapshots play P2 in every env of ``venv``.
+
+    Wrap the raw ``FightingGameEnv`` vec env (before ``VecFrameStack``). Each episode an env
+    gets either the built-in scripted bot (with probability ``scripted_prob``) or a snapshot
+    from ``pool``. Per step, all envs facing the same snapshot are evaluated in one forward
+    pass on their mirrored, frame-stacked observations, and the resulting actions reach the
+    envs as ``(p1_action, p2_action)`` pairs (-1 = use the built-in bot).
+    """
+
+    SCRIPTED = -1
+
+    def __init__(self, venv, pool, scripted_prob=0.5, n_stack=4, deterministic=False, refresh_interval=100, seed=None):
+        super().__init__(venv)
+        self.pool = pool
+        self.scripted_prob = scripted_prob
+        self.n_stack = n_stack
+        self.deterministic = deterministic
+        self.refresh_interval = refresh_interval
+        self.rng = np.random.default_rng(seed)
+
+        self.n_features = venv.observation_space.shape[0]
+        self.p2_stack = np.zeros((self.num_envs, n_stack * self.n_features), dtype=np.float32)
+        # FrozenPolicy per env, None = scripted bot. Held by reference so a pool refresh
+        # never swaps the opponent in the middle of a match.
+        self.opponents = [None] * self.num_envs
+        self.episodes_since_refresh = 0
+
+    def _assign(self, idx):
+        for i in idx:
+            if len(self.pool) == 0 or self.rng.random() < self.scripted_prob:
+                self.opponents[i] = None
+            else:
+                self.opponents[i] = self.pool.policies[self.rng.integers(len(self.pool))]
+
+    def _push(self, obs, reset_idx=None):
+        # Same shifting / reset rule as VecFrameStack, on P2's side of the observation
+        self.p2_stack = np.roll(self.p2_stack, shift=-self.n_features, axis=-1)
+        if reset_idx is not None:
+            self.p2_stack[reset_idx] = 0
+        self.p2_stack[:, -self.n_features:] = mirror_obs(obs)
+
+    def reset(self):
+        obs = self.venv.reset()
+        self.p2_stack[:] = 0
+        self._push(obs)
+        self._assign(range(self.num_envs))
+        return obs
+
+    def step_async(self, actions):
+        groups = {}
+        for i, opponent in enumerate(self.opponents):
+            if opponent is not None:
+                groups.setdefault(id(opponent), (opponent, []))[1].append(i)
+
+        p2_actions = np.full(self.num_envs, self.SCRIPTED, dtype=np.int64)
+        for opponent, idx in groups.values():
+            p2_actions[idx] = opponent.act(self.p2_stack[idx], self.deterministic)
+        self.venv.step_async(np.stack([np.asarray(actions), p2_actions], axis=1))
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        done_idx = np.flatnonzero(dones)
+        for i in done_idx:
+            opponent = self.opponents[i]
+            infos[i]["opponent"] = "scripted" if opponent is None else opponent.path
+        self._push(obs, done_idx)
+
+        if done_idx.size:
+            self.episodes_since_refresh += done_idx.size
+            if self.refresh_interval and self.episodes_since_refresh >= self.refresh_interval:
+                self.episodes_since_refresh = 0
+                self.pool.refresh()
+            self._assign(done_idx)
+        return obs, rewards, dones, infos
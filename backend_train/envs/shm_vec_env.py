@@ -0,0 +1,235 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import CloudpickleWrapper, VecEnv
+from stable_baselines3.common.vec_env.patch_gym import _patch_env
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: attaching registers the segment with the resource tracker again,
+        # which is harmless since workers share the parent's tracker and it keeps a set of names
+        return shared_memory.SharedMemory(name=name)
+
+
+def _views(segments, layout):
+    return {key: np.ndarray(shape, dtype=dtype, buffer=segments[key].buf) for key, (shape, dtype) in layout.items()}
+
+
+def _worker(remote, parent_remote, env_fn_wrappers, start):
+    # Import here to avoid a circular import
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    envs = [_patch_env(fn()) for fn in env_fn_wrappers.var]
+    segments, buf = {}, {}
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                actions, obs_buf, term_buf = buf["actions"], buf["obs"], buf["terminal_obs"]
+                rewards, dones = buf["rewards"], buf["dones"]
+                done_infos = []
+                for i, env in enumerate(envs, start):
+                    observation, reward, terminated, truncated, info = env.step(actions[i])
+                    done = terminated or truncated
+                    rewards[i] = reward
+                    dones[i] = done
+                    if done:
+                        # save final observation where the parent can get it, then reset
+                        info["TimeLimit.truncated"] = truncated and not terminated
+                        term_buf[i] = observation
+                        observation, _ = env.reset()
+                        done_infos.append((i, info))
+                    obs_buf[i] = observation
+                # Only finished episodes carry an info dict back through the pipe
+                remote.send(done_infos)
+            elif cmd == "reset":
+                seeds, options = data
+                reset_infos = []
+                for i, env in enumerate(envs):
+                    maybe_options = {"options": options[i]} if options[i] else {}
+                    observation, reset_info = env.reset(seed=seeds[i], **maybe_options)
+                    buf["obs"][start + i] = observation
+                    reset_infos.append(reset_info)
+                remote.send(reset_infos)
+            elif cmd == "attach":
+                names, layout = data
+                segments = {key: _attach(name) for key, name in names.items()}
+                buf = _views(segments, layout)
+                remote.send(None)
+            elif cmd == "close":
+                for env in envs:
+                    env.close()
+                buf.clear()
+                for shm in segments.values():
+                    shm.close()
+                remote.close()
+                break
+            elif cmd == "get_spaces":
+                remote.send((envs[0].observation_space, envs[0].action_space))
+            elif cmd == "env_method":
+                local, name, args, kwargs = data
+                remote.send([envs[i].get_wrapper_attr(name)(*args, **kwargs) for i in local])
+            elif cmd == "get_attr":
+                local, name = data
+                remote.send([envs[i].get_wrapper_attr(name) for i in local])
+            elif cmd == "set_attr":
+                local, name, value = data
+                for i in local:
+                    setattr(envs[i], name, value)
+                remote.send(None)
+            elif cmd == "is_wrapped":
+                local, wrapper_class = data
+                remote.send([is_wrapped(envs[i], wrapper_class) for i in local])
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+        except EOFError:
+            break
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    Worker-pool vectorized env: each process steps a block of ``envs_per_worker`` envs.
+
+    Actions, observations, rewards and done flags live in ``multiprocessing.shared_memory``
+    segments that both sides view as numpy arrays, so a step only sends a command tuple down
+    each pipe and gets back the info dicts of episodes that just finished (usually none).
+    Per-step info dicts of unfinished episodes are therefore not forwarded.
+
+    :param env_fns: a list of functions that return environments to vectorize
+    :param envs_per_worker: number of envs stepped sequentially by each worker process
+    :param start_method: method used to start the subprocesses, see ``SubprocVecEnv``
+    :param action_shape: per-env action shape if it differs from the action space,
+        e.g. ``(2,)`` for the (p1, p2) action pairs sent by ``VecSelfPlay``
+    """
+
+    def __init__(self, env_fns, envs_per_worker=1, start_method=None, action_shape=None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        if start_method is None:
+            forkserver_available = "forkserver" in mp.get_all_start_methods()
+            start_method = "forkserver" if forkserver_available else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.starts = list(range(0, n_envs, envs_per_worker))
+        n_workers = len(self.starts)
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_workers)])
+        self.processes = []
+        for work_remote, remote, start in zip(self.work_remotes, self.remotes, self.starts):
+            block = env_fns[start:start + envs_per_worker]
+            args = (work_remote, remote, CloudpickleWrapper(block), start)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+        super().__init__(n_envs, observation_space, action_space)
+
+        obs_shape = (n_envs, *observation_space.shape)
+        layout = {
+            "obs": (obs_shape, observation_space.dtype),
+            "terminal_obs": (obs_shape, observation_space.dtype),
+            "actions": ((n_envs, *(action_space.shape if action_shape is None else action_shape)), action_space.dtype),
+            "rewards": ((n_envs,), np.float32),
+            "dones": ((n_envs,), np.bool_),
+        }
+        self._segments = {
+            key: shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+            for key, (shape, dtype) in layout.items()
+        }
+        self._buf = _views(self._segments, layout)
+        names = {key: shm.name for key, shm in self._segments.items()}
+        for remote in self.remotes:
+            remote.send(("attach", (names, layout)))
+        for remote in self.remotes:
+            remote.recv()
+
+    def _blocks(self, items):
+        return [items[start:start + self._block_size(w)] for w, start in enumerate(self.starts)]
+
+    def _block_size(self, worker):
+        end = self.starts[worker + 1] if worker + 1 < len(self.starts) else self.num_envs
+        return end - self.starts[worker]
+
+    def step_async(self, actions):
+        self._buf["actions"][:] = actions
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def _recv_steps(self):
+        # One list of (env index, info) per worker, in worker order
+        return [remote.recv() for remote in self.remotes]
+
+    def step_wait(self):
+        infos = [{} for _ in range(self.num_envs)]
+        for done_infos in self._recv_steps():
+            for i, info in done_infos:
+                info["terminal_observation"] = self._buf["terminal_obs"][i].copy()
+                infos[i] = info
+        self.waiting = False
+        return self._buf["obs"].copy(), self._buf["rewards"].copy(), self._buf["dones"].copy(), infos
+
+    def reset(self):
+        for remote, seeds, options in zip(self.remotes, self._blocks(self._seeds), self._blocks(self._options)):
+            remote.send(("reset", (seeds, options)))
+        self.reset_infos = [info for remote in self.remotes for info in remote.recv()]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._buf["obs"].copy()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self._buf.clear()
+        for shm in self._segments.values():
+            shm.close()
+            shm.unlink()
+        self.closed = True
+
+    def _route(self, indices):
+        # Group global env indices by the worker owning them, as (remote, local indices)
+        routes = {}
+        for i in self._get_indices(indices):
+            worker = np.searchsorted(self.starts, i, side="right") - 1
+            routes.setdefault(worker, []).append(i - self.starts[worker])
+        return [(self.remotes[w], local) for w, local in routes.items()]
+
+    def _call(self, cmd, indices, *data):
+        routes = self._route(indices)
+        for remote, local in routes:
+            remote.send((cmd, (local, *data)))
+        return [result for remote, _ in routes for result in remote.recv()]
+
+    def get_attr(self, attr_name, indices=None):
+        return self._call("get_attr", indices, attr_name)
+
+    def set_attr(self, attr_name, value, indices=None):
+        routes = self._route(indices)
+        for remote, local in routes:
+            remote.send(("set_attr", (local, attr_name, value)))
+        for remote, _ in routes:
+            remote.recv()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self._call("env_method", indices, method_name, method_args, method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return self._call("is_wrapped", indices, wrapper_class)
@@ -1,29 +1,185 @@
-import gymnasium as gym
+import argparse
+import json
+import math
+import os
+import time
+from functools import partial
+from statistics import NormalDist
+
+import numpy as np
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecNormalize
-from stable_baselines3.common.evaluation import evaluate_policy
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecMonitor, VecNormalize
 from stable_baselines3.common.monitor import Monitor
 from gymnasium.wrappers import TimeLimit
 from envs.fighting_env import FightingGameEnv
-import os
+from envs.batched_fighting_env import BatchedFightingEnv
+from envs.shm_vec_env import SharedMemoryVecEnv
+from envs.opponents import PERSONALITIES
+from envs.rollout_dataset import VecRecordRollouts
+from fast_inference import TracedPolicy
+from model_hash import saved_attribute
+
+WIN_RATE_THRESHOLD = 0.8
+
+def make_env(decision_interval=1):
+    env = FightingGameEnv(decision_interval=decision_interval)
+    env = TimeLimit(env, max_episode_steps=2000)
+    env = Monitor(env)
+    return env
+
+def make_eval_env(vec_env_type, num_envs, envs_per_worker, record=None, decision_interval=1):
+    # Same observation pipeline as training, spread over processes or the batched engine
+    env_fn = partial(make_env, decision_interval)
+    if vec_env_type == "batched":
+        if decision_interval > 1:
+            raise ValueError("Models trained with decision_interval > 1 need --vec-env shared_memory or dummy")
+        env = VecMonitor(BatchedFightingEnv(num_envs))
+    elif vec_env_type == "shared_memory":
+        env = SharedMemoryVecEnv([env_fn for _ in range(num_envs)], envs_per_worker=envs_per_worker)
+    else:
+        env = DummyVecEnv([env_fn for _ in range(num_envs)])
+    if record:
+        # Raw frames, before stacking and normalization
+        env = VecRecordRollouts(env, record)
+    return VecFrameStack(env, n_stack=4)
+
+def find_file(*candidates):
+    for p in candidates:
+        if os.path.exists(p):
+            return p
+    return None
+
+def wilson_interval(wins, n, z=1.96):
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+def summarize(episodes, z=1.96):
+    wins = sum(e["is_win"] for e in episodes)
+    low, high = wilson_interval(wins, len(episodes), z)
+    return {
+        "episodes": len(episodes),
+        "wins": wins,
+        "win_rate": wins / len(episodes) if episodes else 0.0,
+        "ci_low": low,
+        "ci_high": high,
+        "mean_reward": float(np.mean([e["reward"] for e in episodes])) if episodes else 0.0,
+        "mean_length": float(np.mean([e["length"] for e in episodes])) if episodes else 0.0,
+    }
+
+def balanced_episodes(per_env):
+    # Use the first k episodes of every env: counting episodes in completion order would
+    # over-sample short matches (quick wins or losses) whenever we stop early.
+    rounds = min(len(episodes) for episodes in per_env)
+    return [e for episodes in per_env for e in episodes[:rounds]]
+
+def early_stopper(threshold, confidence, min_episodes, max_episodes):
+    """
+    ``should_stop`` for run_episodes: stop once the win rate is confidently above or below
+    ``threshold``. Checking after every episode would inflate the false-stop rate far beyond
+    ``1 - confidence``, so it only looks at ``min_episodes`` and every doubling of it below
+    ``max_episodes``, with the error budget split evenly over those looks (Bonferroni).
+    """
+    looks = []
+    n = max(min_episodes, 1)
+    while n < max_episodes:
+        looks.append(n)
+        n *= 2
+    if not looks:
+        return lambda per_env: False
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / (2 * len(looks)))
+    state = {"next": 0}
+
+    def should_stop(per_env):
+        count = min(len(episodes) for episodes in per_env) * len(per_env)
+        if state["next"] >= len(looks) or count < looks[state["next"]]:
+            return False
+        # One test per look, even if a batch of episodes crossed several of them
+        while state["next"] < len(looks) and looks[state["next"]] <= count:
+            state["next"] += 1
+        episodes = balanced_episodes(per_env)
+        low, high = wilson_interval(sum(e["is_win"] for e in episodes), len(episodes), z)
+        return low >= threshold or high < threshold
+
+    should_stop.looks = looks
+    return should_stop
+
+def run_episodes(model, env, episodes, should_stop=None):
+    """
+    Play ``episodes // num_envs`` episodes (at least one) on every env with the deterministic
+    policy, one batched policy call per step for all envs. Returns the episodes per env and
+    whether ``should_stop(per_env)``, checked whenever an episode ends, cut the run short.
+    """
+    n = env.num_envs
+    per_env = [[] for _ in range(n)]
+    target_rounds = max(episodes // n, 1)
+    episode_rewards = np.zeros(n)
+    episode_lengths = np.zeros(n, dtype=np.int64)
+
+    obs = env.reset()
+    while min(len(episodes) for episodes in per_env) < target_rounds:
+        actions, _ = model.predict(obs, deterministic=True)
+        obs, rewards, dones, infos = env.step(actions)
+        # VecNormalize returns original rewards separately
+        episode_rewards += env.get_original_reward() if isinstance(env, VecNormalize) else rewards
+        episode_lengths += 1
+
+        for i in np.flatnonzero(dones):
+            per_env[i].append({
+                "is_win": bool(infos[i].get("is_win", False)),
+                "p2_personality": int(infos[i].get("p2_personality", -1)),
+                "side": int(infos[i].get("side", -1)),
+                "reward": float(episode_rewards[i]),
+                "length": int(episode_lengths[i]),
+            })
+            episode_rewards[i] = 0
+            episode_lengths[i] = 0
+
+        if dones.any() and should_stop is not None and should_stop(per_env):
+            return per_env, True
+    return per_env, False
 
 def evaluate():
-    # 1. Setup the exact same environment pipeline used in training
-    def make_env():
-        env = FightingGameEnv()
-        env = TimeLimit(env, max_episode_steps=2000)
-        env = Monitor(env)
-        return env
-    
-    env = DummyVecEnv([make_env])
-    env = VecFrameStack(env, n_stack=4)
-    
+    parser = argparse.ArgumentParser(description="Evaluate the trained model against the scripted P2 bot.")
+    parser.add_argument("--episodes", type=int, default=2000, help="maximum number of episodes")
+    parser.add_argument("--envs", type=int, default=64, help="parallel environments")
+    parser.add_argument("--envs-per-worker", type=int, default=8, help="envs per process for shared_memory")
+    parser.add_argument("--vec-env", choices=["shared_memory", "batched", "dummy"], default="shared_memory")
+    parser.add_argument("--confidence", type=float, default=0.99, help="confidence level of the reported intervals")
+    parser.add_argument("--min-episodes", type=int, default=200,
+                        help="first early stopping check; later ones at every doubling below --episodes")
+    parser.add_argument("--no-early-stop", action="store_true", help="always play --episodes episodes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", default=None, help="directory to stream the evaluation transitions into")
+    parser.add_argument("--traced", action="store_true", help="run the policy as a frozen TorchScript graph")
+    parser.add_argument("--output", default="models/eval_results.json")
+    args = parser.parse_args()
+    # Two-sided normal quantile for the requested confidence level
+    z = NormalDist().inv_cdf(0.5 + args.confidence / 2)
+
+    # 1. Find the trained model
+    possible_paths = [
+        "models/neural_nemesis_pro.zip",
+        "backend_train/models/neural_nemesis_pro.zip",
+        os.path.join(os.path.dirname(__file__), "models/neural_nemesis_pro.zip")
+    ]
+    model_path = find_file(*possible_paths)
+    if not model_path:
+        print(f"Error: Model not found. Checked: {possible_paths}")
+        return
+
+    # 2. Setup the exact same environment pipeline used in training, at the model's decision cadence
+    decision_interval = saved_attribute(model_path, "decision_interval", 1)
+    env = make_eval_env(args.vec_env, args.envs, args.envs_per_worker, args.record, decision_interval)
+    env.seed(args.seed)
+
     # Load normalization stats
-    stats_path = "models/vec_normalize.pkl"
-    if not os.path.exists(stats_path):
-        stats_path = os.path.join(os.path.dirname(__file__), "models/vec_normalize.pkl")
-    
-    if os.path.exists(stats_path):
+    stats_path = find_file("models/vec_normalize.pkl", os.path.join(os.path.dirname(__file__), "models/vec_normalize.pkl"))
+    if stats_path:
         print(f"Loading normalization stats from {stats_path}...")
         env = VecNormalize.load(stats_path, env)
         # Disable training mode for normalization
@@ -32,70 +188,58 @@ def evaluate():
         env.norm_reward = False
     else:
         print("Warning: Normalization stats not found. Evaluation might be inaccurate.")
-    
-    # 2. Load the trained model
-    # ... (rest of the logic remains similar)
-    possible_paths = [
-        "models/neural_nemesis_pro.zip",
-        "backend_train/models/neural_nemesis_pro.zip",
-        os.path.join(os.path.dirname(__file__), "models/neural_nemesis_pro.zip")
-    ]
-    
-    model_path = None
-    for p in possible_paths:
-        if os.path.exists(p):
-            model_path = p
-            break
-            
-    if not model_path:
-        print(f"Error: Model not found. Checked: {possible_paths}")
-        return
 
     print(f"Loading model from {model_path}...")
-    model = PPO.load(model_path, env=env)
-    
+    model = PPO.load(model_path, env=env, device="cpu")
+    if args.traced:
+        # Same actions as model.predict, without SB3's per-call overhead
+        model = TracedPolicy(model.policy, batch_size=env.num_envs)
+        print(f"Traced the policy ({model.threads} inference threads)")
+
     # 3. Run evaluation
-    print("Evaluating for 20 episodes...")
-    wins = 0
-    total_reward = 0
-    
-    for i in range(20):
-        obs = env.reset()
-        done = False
-        episode_reward = 0
-        while not done:
-            action, _ = model.predict(obs, deterministic=True)
-            obs, reward, done_vec, info = env.step(action)
-            
-            # VecNormalize returns original rewards in info
-            unnormalized_reward = env.get_original_reward()[0]
-            episode_reward += unnormalized_reward
-            done = done_vec[0]
-            
-            # Use get_attr for robust debugging across wrappers
-            if i == 0:
-                # Note: after reset, step is 0. But env.step() returns the state AFTER the step.
-                # So we can see the progress.
-                pass
-            
-            # Check for win via info dict (VecEnv returns a list of info dicts)
-            if done:
-                if info[0].get("is_win", False):
-                    wins += 1
-        
-        total_reward += episode_reward
-        print(f"Episode {i+1}: Reward = {episode_reward:.2f}")
-
-    win_rate = (wins / 20) * 100
-    mean_reward = total_reward / 20
-    
+    print(f"Evaluating up to {args.episodes} episodes on {env.num_envs} parallel envs...")
+
+    confident = early_stopper(WIN_RATE_THRESHOLD, args.confidence, args.min_episodes, args.episodes)
+    start = time.perf_counter()
+    per_env, stopped = run_episodes(model, env, args.episodes, None if args.no_early_stop else confident)
+    decision = "early_stop" if stopped else None
+    env.close()
+    elapsed = time.perf_counter() - start
+
+    episodes = balanced_episodes(per_env)
+    results = {
+        "model": model_path,
+        "confidence": args.confidence,
+        "threshold": WIN_RATE_THRESHOLD,
+        "stopped": decision or "max_episodes",
+        "seconds": elapsed,
+        "overall": summarize(episodes, z),
+        "by_personality": {
+            name: summarize([e for e in episodes if e["p2_personality"] == k], z) for k, name in enumerate(PERSONALITIES)
+        },
+        "by_side": {
+            name: summarize([e for e in episodes if e["side"] == k], z) for k, name in enumerate(("left", "right"))
+        },
+    }
+    overall = results["overall"]
+    results["passed"] = overall["ci_low"] >= WIN_RATE_THRESHOLD if decision else overall["win_rate"] >= WIN_RATE_THRESHOLD
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
     print("\n" + "="*30)
-    print(f"EVALUATION RESULTS")
-    print(f"Win Rate: {win_rate:.1f}%")
-    print(f"Mean Reward: {mean_reward:.2f}")
+    print(f"EVALUATION RESULTS ({overall['episodes']} episodes in {elapsed:.1f}s, {results['stopped']})")
+    print(f"Win Rate: {100 * overall['win_rate']:.1f}% [{100 * overall['ci_low']:.1f}%, {100 * overall['ci_high']:.1f}%]")
+    print(f"Mean Reward: {overall['mean_reward']:.2f}")
+    for group in ("by_personality", "by_side"):
+        for name, r in results[group].items():
+            if r["episodes"]:
+                print(f"  {name:<12} {100 * r['win_rate']:5.1f}% [{100 * r['ci_low']:.1f}%, {100 * r['ci_high']:.1f}%] over {r['episodes']}")
     print("="*30)
-    
-    if win_rate >= 80:
+    print(f"Results written to {args.output}")
+
+    if results["passed"]:
         print("VERIFICATION: PASSED (>80% Win Rate)")
     else:
         print("VERIFICATION: FAILED (<80% Win Rate)")
@@ -1,127 +1,469 @@
 import torch as th
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecNormalize
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack
+from concurrent.futures import ProcessPoolExecutor
 from envs.fighting_env import FightingGameEnv
+from envs.replay import ReplayPlayer
+from envs.self_play import find_vecnormalize
+from model_hash import content_hash, file_hash, saved_attribute, weights_hash
+import argparse
+import copy
+import glob
 import os
+import pickle
+import shutil
 import subprocess
+import sys
 import json
 import numpy as np
 
-def export_model(model_path, onnx_path):
-    # Load the model
-    def make_env():
-        return FightingGameEnv()
-    
-    env = DummyVecEnv([make_env])
-    env = VecFrameStack(env, n_stack=4)
-    
-    # Load model
+# Bump when the exporter itself changes what it writes, so cached artifacts are rebuilt
+EXPORT_VERSION = 4
+# Converter settings that end up in the artifact; part of the cache key
+# quantize: extra weight-quantized tfjs variants to write next to the float32 one
+EXPORT_SETTINGS = {"opset": 12, "tfjs_format": "tfjs_graph_model", "fold_normalization": True, "quantize": []}
+MANIFEST = "export_manifest.json"
+# --stats value that exports a model without normalization on purpose
+NO_STATS = "none"
+QUANTIZATION_REPORT = "quantization_report.json"
+# tfjs weight quantization: mode -> (tensorflowjs_converter flag, bytes per weight)
+QUANTIZE_MODES = {"float16": ("--quantize_float16", 2), "uint8": ("--quantize_uint8", 1)}
+# Graph outputs, all with a dynamic leading batch axis. The browser runs the frozen backbone
+# through latent_pi / latent_vf and trains its own copy of the heads (heads.json).
+OUTPUT_NAMES = ["logits", "value", "latent_pi", "latent_vf"]
+
+def _first_linear(net, head):
+    # First layer that sees the observation features (the head itself for an empty net_arch)
+    return next((layer for layer in net if isinstance(layer, th.nn.Linear)), head)
+
+def fold_normalization(policy, vec_normalize):
+    """
+    Copy of ``policy`` that takes raw observations.
+
+    VecNormalize computes clip((obs - mean) / std, -clip, clip). The division is folded into
+    the first linear layer of the actor and the critic, so the graph only needs
+    clip(obs - mean, -clip * std, clip * std) in front of them. Subtracting the mean before
+    scaling keeps float32 error small even for features with near-zero variance; the mean is
+    split into a float32 value and its float32 remainder so the subtraction stays as precise as
+    VecNormalize's float64 one. Returns the folded policy and the (center, center_lo, low, high)
+    tensors.
+    """
+    policy = copy.deepcopy(policy)
+    obs_rms = vec_normalize.obs_rms
+    std = np.sqrt(obs_rms.var + vec_normalize.epsilon)
+    extractor = policy.mlp_extractor
+    with th.no_grad():
+        for net, head in ((extractor.policy_net, policy.action_net), (extractor.value_net, policy.value_net)):
+            layer = _first_linear(net, head)
+            layer.weight.copy_((layer.weight.double() / th.as_tensor(std)).float())
+    bounds = vec_normalize.clip_obs * std
+    center = obs_rms.mean.astype(np.float32)
+    center_lo = obs_rms.mean - center
+    as_tensor = lambda x: th.as_tensor(x, dtype=th.float32)
+    return policy, (as_tensor(center), as_tensor(center_lo), as_tensor(-bounds), as_tensor(bounds))
+
+class FullOnnxModel(th.nn.Module):
+    def __init__(self, model, vec_normalize=None):
+        super().__init__()
+        self.policy = model.policy
+        self.folded = vec_normalize is not None and vec_normalize.norm_obs
+        if self.folded:
+            # Raw observations in, VecNormalize's preprocessing happens inside the graph
+            self.policy, (center, center_lo, low, high) = fold_normalization(model.policy, vec_normalize)
+            self.register_buffer("center", center)
+            self.register_buffer("center_lo", center_lo)
+            self.register_buffer("low", low)
+            self.register_buffer("high", high)
+
+    def forward(self, obs):
+        # obs shape: (batch, n_stack * features)
+        if self.folded:
+            obs = th.maximum(th.minimum(obs - self.center - self.center_lo, self.high), self.low)
+        features = self.policy.features_extractor(obs)
+        latent_pi, latent_vf = self.policy.mlp_extractor(features)
+
+        # Action distribution logits
+        logits = self.policy.action_net(latent_pi)
+
+        # Value estimate
+        value = self.policy.value_net(latent_vf)
+
+        return logits, value, latent_pi, latent_vf
+
+def export_heads(model, output_json):
+    # Linear heads as [in, out] matrices, ready for latent.matMul(weight).add(bias) in TFJS
+    heads = {}
+    for name, layer in (("actor", model.policy.action_net), ("critic", model.policy.value_net)):
+        heads[name] = {
+            "weight": layer.weight.detach().cpu().numpy().T.tolist(),
+            "bias": layer.bias.detach().cpu().numpy().tolist(),
+        }
+    os.makedirs(os.path.dirname(output_json), exist_ok=True)
+    with open(output_json, "w") as f:
+        json.dump(heads, f)
+    print(f"Policy heads exported to {output_json}")
+
+def load_vec_normalize(stats_path):
+    # The pickled VecNormalize carries its stats without the env it wrapped
+    with open(stats_path, "rb") as f:
+        return pickle.load(f)
+
+def check_folding(model, onnx_model, vec_normalize, n=4096, seed=0, atol=1e-4):
+    """
+    Compare the folded graph on raw observations with the SB3 policy on VecNormalize output.
+    Samples reach well past the clip range so the clipped region is covered too.
+    """
+    rng = np.random.default_rng(seed)
+    obs_rms = vec_normalize.obs_rms
+    std = np.sqrt(obs_rms.var + vec_normalize.epsilon)
+    raw = obs_rms.mean + std * rng.uniform(-1.5, 1.5, size=(n, len(std))) * vec_normalize.clip_obs
+    raw = raw.astype(np.float32)
+    normalized = th.as_tensor(vec_normalize.normalize_obs(raw), dtype=th.float32)
+    with th.no_grad():
+        logits, value, _, _ = onnx_model(th.as_tensor(raw))
+        ref_logits = model.policy.action_net(model.policy.mlp_extractor.forward_actor(model.policy.extract_features(normalized)))
+        ref_value = model.policy.predict_values(normalized)
+    report = {
+        "samples": n,
+        "max_logit_error": float((logits - ref_logits).abs().max()),
+        "max_value_error": float((value - ref_value).abs().max()),
+        "argmax_agreement": float((logits.argmax(1) == ref_logits.argmax(1)).float().mean()),
+    }
+    if report["max_logit_error"] > atol or report["max_value_error"] > atol:
+        raise ValueError(f"Folded normalization does not match the SB3 policy: {report}")
+    return report
+
+def export_model(model_path, onnx_path, opset=12, heads_json=None, stats_path=None):
+    # The policy alone is enough to trace the graph, no env needed
     print(f"Loading model from {model_path}...")
-    model = PPO.load(model_path, env=env)
-    
-    class FullOnnxModel(th.nn.Module):
-        def __init__(self, model):
-            super().__init__()
-            self.policy = model.policy
-        
-        def forward(self, obs):
-            # obs shape: (batch, n_stack * features)
-            features = self.policy.features_extractor(obs)
-            latent_pi, latent_vf = self.policy.mlp_extractor(features)
-            
-            # Action distribution logits
-            logits = self.policy.action_net(latent_pi)
-            
-            # Value estimate
-            value = self.policy.value_net(latent_vf)
-            
-            return logits, value
-
-    onnx_model = FullOnnxModel(model)
+    model = PPO.load(model_path, device="cpu")
+    model.policy.set_training_mode(False)
+
+    # With stats, VecNormalize's preprocessing is folded into the graph and checked against SB3
+    vec_normalize = load_vec_normalize(stats_path) if stats_path else None
+    onnx_model = FullOnnxModel(model, vec_normalize)
     onnx_model.to("cpu")
     onnx_model.eval()
-    
-    # Input shape: (1, features * n_stack)
-    obs_dim = env.observation_space.shape[0]
-    dummy_input = th.randn(1, obs_dim).to("cpu")
-    
+    parity = None
+    if onnx_model.folded:
+        parity = check_folding(model, onnx_model, vec_normalize)
+        print(f"Folded normalization parity: {parity}")
+
+    # Input shape: (batch, features * n_stack); traced with 2 rows so batch never gets folded to 1
+    obs_dim = model.observation_space.shape[0]
+    dummy_input = th.randn(2, obs_dim).to("cpu")
+
     th.onnx.export(
         onnx_model,
         (dummy_input,),
         onnx_path,
         verbose=False,
         input_names=["input"],
-        output_names=["logits", "value"],
-        opset_version=12
+        output_names=OUTPUT_NAMES,
+        dynamic_axes={name: {0: "batch"} for name in ["input"] + OUTPUT_NAMES},
+        opset_version=opset
     )
     print(f"Model exported to {onnx_path}")
+    if heads_json:
+        export_heads(model, heads_json)
+    return parity
 
-def export_stats(stats_path, output_json):
-    def make_env():
-        return FightingGameEnv()
-    
-    venv = DummyVecEnv([make_env])
-    venv = VecFrameStack(venv, n_stack=4)
-    
-    print(f"Loading normalization stats from {stats_path}...")
-    vn = VecNormalize.load(stats_path, venv)
-    
+def norm_stats(vec_normalize):
+    # norm_stats.json contents, from a VecNormalize or a FusedVecEnv
     # In SB3, obs_rms is a RunningMeanStd object for non-dict spaces
     # We can access mean and var directly
-    obs_rms = vn.obs_rms
-    
-    stats = {
+    obs_rms = vec_normalize.obs_rms
+    return {
         "mean": obs_rms.mean.tolist(),
         "variance": obs_rms.var.tolist(),
-        "epsilon": float(1e-8) # Default epsilon used in RunningMeanStd
+        "epsilon": float(vec_normalize.epsilon)
     }
-    
+
+def export_stats(stats_path, output_json):
+    print(f"Loading normalization stats from {stats_path}...")
+    stats = norm_stats(load_vec_normalize(stats_path))
+
     os.makedirs(os.path.dirname(output_json), exist_ok=True)
     with open(output_json, "w") as f:
         json.dump(stats, f)
     print(f"Normalization stats exported to {output_json}")
 
-def convert_to_tfjs(onnx_path, output_dir):
-    # 1. Convert ONNX to SavedModel using onnx2tf
-    # We'll use a temp directory for the saved_model
-    saved_model_path = "models/saved_model"
+def quantize_tensor(data, mode):
+    """What ``mode`` weight quantization in tensorflowjs_converter does to one float32 tensor, dequantized."""
+    if mode == "float16":
+        return data.astype(np.float16).astype(np.float32)
+    # Affine uint8 per tensor, with the range widened to include 0 and nudged so 0 is exact
+    lo, hi = min(float(data.min()), 0.0), max(float(data.max()), 0.0)
+    if lo == hi:
+        return data.copy()
+    scale = (hi - lo) / 255
+    lo = -round(-lo / scale) * scale
+    hi = lo + 255 * scale
+    return (np.round((np.clip(data, lo, hi) - lo) / scale) * scale + lo).astype(np.float32)
+
+def quantized_copy(module, mode):
+    # Every float tensor of the graph becomes a constant in model.json and is quantized alike
+    module = copy.deepcopy(module)
+    with th.no_grad():
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            if tensor.dtype == th.float32:
+                tensor.copy_(th.as_tensor(quantize_tensor(tensor.numpy(), mode)))
+    return module
+
+def sample_observations(n=4096, n_stack=4, seed=0):
+    # Random P1 inputs against the scripted bots, for when no replays were recorded
+    env = VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=n_stack)
+    env.seed(seed)
+    env.action_space.seed(seed)
+    obs = env.reset()
+    rows = []
+    for _ in range(n):
+        rows.append(obs[0])
+        obs = env.step(np.array([env.action_space.sample()]))[0]
+    env.close()
+    return np.stack(rows).astype(np.float32)
+
+def parity_observations(source=None, n=4096, n_stack=4, seed=0):
+    """
+    Raw (unnormalized) stacked observations for the parity report: a replay recorded with
+    RecordReplay (path without extension), a .npy array, or sampled from the env when None.
+    """
+    if source is None:
+        return sample_observations(n, n_stack, seed)
+    if source.endswith(".npy"):
+        obs = np.load(source).astype(np.float32)
+    else:
+        player = ReplayPlayer(source)
+        obs = player.observations(n_stack=n_stack, stride=max(1, int(player.index["length"].sum()) // n))
+    return obs[np.random.default_rng(seed).permutation(len(obs))[:n]]
+
+def quantization_report(model_path, stats_path=None, fold=True, parity_obs=None, modes=("float32",) + tuple(QUANTIZE_MODES)):
+    """
+    Compare weight-quantized versions of the exported graph with the PyTorch policy on the
+    observations from ``parity_obs`` (see parity_observations). Quantization is emulated on a
+    torch copy of the graph, so the report needs neither TensorFlow nor the converters. The
+    browser acts on the argmax, so action agreement is the number to watch; float32 is the baseline.
+
+    uint8 quantizes each tensor over its own range. Folding scales the first layer's columns by
+    1/std, so near-constant features blow up that range; expect uint8 to need ``fold=False``.
+    """
+    model = PPO.load(model_path, device="cpu")
+    model.policy.set_training_mode(False)
+    n_stack = model.observation_space.shape[0] // FightingGameEnv().observation_space.shape[0]
+    observations = parity_observations(parity_obs, n_stack=n_stack)
+    vec_normalize = load_vec_normalize(stats_path) if stats_path else None
+    normalized = vec_normalize.normalize_obs(observations) if vec_normalize is not None else observations
+    normalized = th.as_tensor(normalized, dtype=th.float32)
+    graph = FullOnnxModel(model, vec_normalize if fold else None).eval()
+    graph_input = th.as_tensor(observations) if graph.folded else normalized
+
+    with th.no_grad():
+        ref_probs = model.policy.get_distribution(normalized).distribution.probs
+        ref_value = model.policy.predict_values(normalized)
+        report = {"observations": len(observations), "normalization_folded": graph.folded}
+        for mode in modes:
+            quantized = graph if mode == "float32" else quantized_copy(graph, mode)
+            logits, value, _, _ = quantized(graph_input)
+            probs = th.softmax(logits, -1)
+            bytes_per_weight = 4 if mode == "float32" else QUANTIZE_MODES[mode][1]
+            report[mode] = {
+                "weight_bytes": sum(t.numel() for t in graph.state_dict().values()) * bytes_per_weight,
+                "action_agreement": float((probs.argmax(1) == ref_probs.argmax(1)).float().mean()),
+                "mean_policy_tv": float(0.5 * (probs - ref_probs).abs().sum(1).mean()),
+                "value_mae": float((value - ref_value).abs().mean()),
+                "value_max_error": float((value - ref_value).abs().max()),
+            }
+    return report
+
+def print_quantization_report(report):
+    print(f"{'weights':<9} {'bytes':>9} {'agreement':>10} {'policy TV':>10} {'value MAE':>10} {'value max':>10}")
+    for mode in ("float32",) + tuple(QUANTIZE_MODES):
+        if mode in report:
+            r = report[mode]
+            print(f"{mode:<9} {r['weight_bytes']:>9} {r['action_agreement']:>10.4f} {r['mean_policy_tv']:>10.5f} "
+                  f"{r['value_mae']:>10.5f} {r['value_max_error']:>10.5f}")
+
+def onnx_to_saved_model(onnx_path, saved_model_path):
+    # Parallel exports each need their own saved_model_path
     print(f"Converting ONNX to SavedModel: {onnx_path} -> {saved_model_path}")
-    
-    # Run onnx2tf
+
+    # Run onnx2tf; -osd keeps the ONNX input/output names as the serving signature,
+    # which tensorflowjs_converter carries over into model.json
     subprocess.run([
         "onnx2tf",
         "-i", onnx_path,
         "-o", saved_model_path,
+        "-osd",
     ], check=True)
-    
-    # 2. Convert SavedModel to TFJS
+
+def saved_model_to_tfjs(saved_model_path, output_dir, tfjs_format="tfjs_graph_model", metadata=None, quantize=None):
     print(f"Converting SavedModel to TFJS: {saved_model_path} -> {output_dir}")
     os.makedirs(output_dir, exist_ok=True)
-    
+
+    # metadata: {key: json path}, embedded in model.json as userDefinedMetadata
+    metadata_args = [f"--metadata={','.join(f'{key}:{path}' for key, path in metadata.items())}"] if metadata else []
+    quantize_args = [QUANTIZE_MODES[quantize][0]] if quantize else []
     subprocess.run([
         "tensorflowjs_converter",
         "--input_format=tf_saved_model",
-        "--output_format=tfjs_graph_model",
+        f"--output_format={tfjs_format}",
+        *metadata_args,
+        *quantize_args,
         saved_model_path,
         output_dir
     ], check=True)
     print("Conversion to TFJS complete.")
 
+def convert_to_tfjs(onnx_path, output_dir, saved_model_path="models/saved_model", tfjs_format="tfjs_graph_model", metadata=None):
+    # 1. Convert ONNX to SavedModel using onnx2tf
+    onnx_to_saved_model(onnx_path, saved_model_path)
+    # 2. Convert SavedModel to TFJS
+    saved_model_to_tfjs(saved_model_path, output_dir, tfjs_format, metadata)
+
+def tfjs_dir(out_dir, variant="float32"):
+    # float32 lives in tfjs/, quantized variants in tfjs_<mode>/
+    return os.path.join(out_dir, "tfjs" if variant == "float32" else f"tfjs_{variant}")
+
+def find_checkpoints(models_dir):
+    # Everything CheckpointCallback wrote, plus the final model of each training script
+    paths = glob.glob(os.path.join(models_dir, "*_steps.zip")) + glob.glob(os.path.join(models_dir, "neural_nemesis_pro.zip"))
+    return sorted(paths, key=os.path.getmtime)
+
+def export_key(model_path, stats_path, settings):
+    return content_hash(EXPORT_VERSION, weights_hash(model_path), file_hash(stats_path) if stats_path else None, settings,
+                        saved_attribute(model_path, "decision_interval", 1))
+
+def export_checkpoint(model_path, out_root, settings=EXPORT_SETTINGS, force=False, parity_obs=None, stats_path=None):
+    """
+    Export one checkpoint to ``out_root/<name>/`` (model.onnx, saved_model/, tfjs/ and a
+    tfjs_<mode>/ per quantized variant) along with ``quantization_report.json``, which compares
+    every quantization mode with the PyTorch policy on ``parity_obs`` (see parity_observations).
+
+    ``export_manifest.json`` records the hash of the weights, the normalization stats and the
+    settings; if it matches, the slow converters are skipped. Returns (name, "cached"/"exported").
+    Normalization stats are ``stats_path`` if given, else the checkpoint's own (find_vecnormalize);
+    without either, or with ``stats_path=NO_STATS``, the policy is exported as is.
+    """
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    out_dir = os.path.join(out_root, name)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    if stats_path == NO_STATS:
+        stats_path = None
+    else:
+        stats_path = stats_path or find_vecnormalize(model_path)
+        if stats_path is None:
+            print(f"{name}: no VecNormalize stats of its own, exporting without normalization")
+    key = export_key(model_path, stats_path, settings)
+
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f).get("key") == key and os.path.exists(os.path.join(out_dir, "tfjs", "model.json")):
+                return name, "cached"
+
+    # Rebuild from scratch so stale files from an older export never mix in
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    onnx_path = os.path.join(out_dir, "model.onnx")
+    saved_model_path = os.path.join(out_dir, "saved_model")
+    fold = settings["fold_normalization"] and stats_path is not None
+    parity = export_model(model_path, onnx_path, opset=settings["opset"], heads_json=os.path.join(tfjs_dir(out_dir), "heads.json"),
+                          stats_path=stats_path if fold else None)
+    if stats_path and not fold:
+        export_stats(stats_path, os.path.join(tfjs_dir(out_dir), "norm_stats.json"))
+    # Read by ai_worker.js from model.json: folded graphs take raw observations, "stats" ones
+    # norm_stats.json, "none" ones raw observations too; the policy decides every
+    # decision_interval frames (the action repeat it was trained with)
+    export_info = {"normalization": "folded" if fold else "stats" if stats_path else "none", "normalization_folded": fold,
+                   "decision_interval": saved_attribute(model_path, "decision_interval", 1)}
+    export_info_path = os.path.join(out_dir, "export_info.json")
+    with open(export_info_path, "w") as f:
+        json.dump(export_info, f)
+    convert_to_tfjs(onnx_path, tfjs_dir(out_dir), saved_model_path, settings["tfjs_format"], {"export_info": export_info_path})
+    # The SavedModel is shared; only the weight encoding differs per variant
+    for mode in settings["quantize"]:
+        saved_model_to_tfjs(saved_model_path, tfjs_dir(out_dir, mode), settings["tfjs_format"], {"export_info": export_info_path}, mode)
+        for file in os.listdir(tfjs_dir(out_dir)):
+            if file.endswith(".json") and file != "model.json":
+                shutil.copy2(os.path.join(tfjs_dir(out_dir), file), tfjs_dir(out_dir, mode))
+
+    report = quantization_report(model_path, stats_path, fold, parity_obs)
+    print_quantization_report(report)
+    with open(os.path.join(out_dir, QUANTIZATION_REPORT), "w") as f:
+        json.dump(report, f, indent=2)
+
+    # Written last: an interrupted export leaves no manifest and is redone next time
+    with open(manifest_path, "w") as f:
+        json.dump({"key": key, "model": model_path, "stats": stats_path, "settings": settings, "folding_parity": parity}, f, indent=2)
+    return name, "exported"
+
+def export_all(model_paths, out_root, workers=None, force=False, settings=EXPORT_SETTINGS, parity_obs=None, stats_path=None):
+    # Each export shells out to onnx2tf / tensorflowjs_converter, so processes rather than threads
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(export_checkpoint, path, out_root, settings, force, parity_obs, stats_path) for path in model_paths]
+        results = []
+        for path, future in zip(model_paths, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Export of {path} failed: {e}")
+                results.append((os.path.splitext(os.path.basename(path))[0], "failed"))
+    return results
+
+def publish(out_root, name, tfjs_output, variant="float32"):
+    # Ship one exported checkpoint to the browser, replacing whatever was published before
+    src = tfjs_dir(os.path.join(out_root, name), variant)
+    os.makedirs(tfjs_output, exist_ok=True)
+    shipped = set(os.listdir(src))
+    for file in os.listdir(tfjs_output):
+        # e.g. a norm_stats.json the new export does not use
+        if file not in shipped and os.path.isfile(os.path.join(tfjs_output, file)):
+            os.remove(os.path.join(tfjs_output, file))
+    for file in shipped:
+        shutil.copy2(os.path.join(src, file), os.path.join(tfjs_output, file))
+    print(f"Published {name} to {tfjs_output}")
+
 if __name__ == "__main__":
     # Ensure we are in the backend_train directory or handle paths
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    model_file = os.path.join(base_dir, "models/neural_nemesis_pro")
-    stats_file = os.path.join(base_dir, "models/vec_normalize.pkl")
-    onnx_file = os.path.join(base_dir, "models/model.onnx")
-    
+    models_dir = os.path.join(base_dir, "models")
     tfjs_output = os.path.abspath(os.path.join(base_dir, "../frontend_web/public/assets/model/"))
-    stats_output = os.path.join(tfjs_output, "norm_stats.json")
-    
-    if os.path.exists(model_file + ".zip"):
-        export_model(model_file, onnx_file)
-        if os.path.exists(stats_file):
-            export_stats(stats_file, stats_output)
-        convert_to_tfjs(onnx_file, tfjs_output)
+
+    parser = argparse.ArgumentParser(description="Export SB3 checkpoints to ONNX and TFJS.")
+    parser.add_argument("--all", action="store_true", help="export every checkpoint in models/")
+    parser.add_argument("--models", nargs="*", default=[], help="checkpoint .zip files to export")
+    parser.add_argument("--out-dir", default=os.path.join(models_dir, "exports"))
+    parser.add_argument("--workers", type=int, default=None, help="parallel exports (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="ignore cached artifacts")
+    parser.add_argument("--publish", default=None, help="exported checkpoint to copy to the frontend (default: neural_nemesis_pro)")
+    parser.add_argument("--quantize", nargs="*", default=[], choices=list(QUANTIZE_MODES), help="also write weight-quantized variants")
+    parser.add_argument("--publish-variant", default="float32", choices=["float32"] + list(QUANTIZE_MODES),
+                        help="which weights to publish; pick from quantization_report.json")
+    parser.add_argument("--stats", default=None,
+                        help=f"VecNormalize stats to export with, or '{NO_STATS}' for a model trained without "
+                             "(default: each checkpoint's own)")
+    parser.add_argument("--no-fold", action="store_true", help="ship norm_stats.json instead of folding it into the graph")
+    parser.add_argument("--parity-obs", default=None,
+                        help="observations for the quantization report: a recorded replay path or a .npy file (default: sampled from the env)")
+    args = parser.parse_args()
+    settings = dict(EXPORT_SETTINGS, quantize=sorted(args.quantize), fold_normalization=not args.no_fold)
+
+    if args.all or args.models:
+        paths = find_checkpoints(models_dir) if args.all else args.models
+        results = export_all(paths, args.out_dir, args.workers, args.force, settings, args.parity_obs, args.stats)
+        for name, status in results:
+            print(f"{name:<45} {status}")
+        if args.publish:
+            publish(args.out_dir, args.publish, tfjs_output, args.publish_variant)
     else:
-        print(f"Error: Model not found at {model_file}.zip")
+        model_file = os.path.join(models_dir, "neural_nemesis_pro.zip")
+        if os.path.exists(model_file):
+            if args.stats is None and find_vecnormalize(model_file) is None:
+                # Without them the browser would get raw observations the policy never saw in training
+                print(f"Error: {model_file} does not record its VecNormalize stats; pass them with "
+                      f"--stats models/vec_normalize.pkl, or --stats {NO_STATS} if it was trained without")
+                sys.exit(1)
+            name, status = export_checkpoint(model_file, args.out_dir, settings, args.force, args.parity_obs, args.stats)
+            print(f"{name}: {status}")
+            publish(args.out_dir, args.publish or name, tfjs_output, args.publish_variant)
+        else:
+            print(f"Error: Model not found at {model_file}")
@@ -0,0 +1,128 @@
+import os
+import time
+import warnings
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3 import PPO
+
+
+class FusedPolicyNet(th.nn.Module):
+    """
+    Features extractor, ``mlp_extractor`` and action/value nets of an ``ActorCriticPolicy``
+    with a categorical action head, as one module returning ``(actions, values, log_probs)``
+    like ``policy.forward`` (sampling the same distribution SB3's ``Categorical`` does).
+    """
+
+    def __init__(self, policy, deterministic=False):
+        super().__init__()
+        self.share_features_extractor = policy.share_features_extractor
+        if self.share_features_extractor:
+            self.features_extractor = policy.features_extractor
+        else:
+            self.pi_features_extractor = policy.pi_features_extractor
+            self.vf_features_extractor = policy.vf_features_extractor
+        self.mlp_extractor = policy.mlp_extractor
+        self.action_net = policy.action_net
+        self.value_net = policy.value_net
+        self.deterministic = deterministic
+
+    def forward(self, obs):
+        if self.share_features_extractor:
+            latent_pi, latent_vf = self.mlp_extractor(self.features_extractor(obs))
+        else:
+            latent_pi = self.mlp_extractor.forward_actor(self.pi_features_extractor(obs))
+            latent_vf = self.mlp_extractor.forward_critic(self.vf_features_extractor(obs))
+        log_probs = th.log_softmax(self.action_net(latent_pi), dim=-1)
+        if self.deterministic:
+            actions = log_probs.argmax(dim=-1)
+        else:
+            actions = th.multinomial(log_probs.exp(), 1).squeeze(-1)
+        return actions, self.value_net(latent_vf), log_probs.gather(-1, actions.unsqueeze(-1)).squeeze(-1)
+
+
+def fastest_thread_count(fn, example, candidates=None, iters=50):
+    """Intra-op thread count with the lowest latency for ``fn(example)`` on this machine."""
+    candidates = candidates or sorted({1, 2, 4, os.cpu_count() or 1})
+    previous, timings = th.get_num_threads(), {}
+    try:
+        for threads in candidates:
+            th.set_num_threads(threads)
+            fn(example)
+            start = time.perf_counter()
+            for _ in range(iters):
+                fn(example)
+            timings[threads] = time.perf_counter() - start
+    finally:
+        th.set_num_threads(previous)
+    return min(timings, key=timings.get)
+
+
+class TracedPolicy:
+    """
+    Frozen TorchScript copy of a policy for inference.
+
+    The weights are baked into the graph, so build a new one after every weight update.
+    ``predict`` has the signature of ``model.predict`` (evaluation scripts can use either) and
+    ``forward`` the one of ``policy.forward`` on tensors. Calls run under ``inference_mode``
+    with ``threads`` intra-op threads (default: the fastest of a quick measurement).
+    """
+
+    def __init__(self, policy, batch_size=1, threads=None):
+        if not isinstance(policy.action_space, spaces.Discrete):
+            raise ValueError("TracedPolicy only supports Discrete action spaces")
+        self.policy = policy
+        self.device = policy.device
+        example = th.zeros((batch_size, *policy.observation_space.shape), dtype=th.float32, device=self.device)
+        self.nets = {}
+        was_training = policy.training
+        policy.set_training_mode(False)
+        try:
+            for deterministic in (False, True):
+                # torch marks jit as deprecated in favour of torch.compile, which does not help a model this small
+                with th.no_grad(), warnings.catch_warnings():
+                    warnings.simplefilter("ignore", FutureWarning)
+                    traced = th.jit.trace(FusedPolicyNet(policy, deterministic).eval(), example, check_trace=False)
+                    self.nets[deterministic] = th.jit.freeze(traced)
+        finally:
+            policy.set_training_mode(was_training)
+        self.threads = threads or fastest_thread_count(self.nets[False], example)
+
+    def forward(self, obs, deterministic=False):
+        previous = th.get_num_threads()
+        th.set_num_threads(self.threads)
+        try:
+            with th.inference_mode():
+                return self.nets[deterministic](obs.float())
+        finally:
+            th.set_num_threads(previous)
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=False):
+        obs = th.as_tensor(np.asarray(observation, dtype=np.float32), device=self.device)
+        vectorized = obs.dim() > len(self.policy.observation_space.shape)
+        actions = self.forward(obs if vectorized else obs.unsqueeze(0), deterministic)[0].cpu().numpy()
+        return (actions if vectorized else actions[0]), state
+
+
+class TracedPPO(PPO):
+    """
+    PPO whose rollouts go through a ``TracedPolicy``, rebuilt at the start of every rollout
+    (i.e. once per ``train()``). Training, saving and loading are plain PPO; the saved zip
+    loads with ``PPO.load``.
+    """
+
+    def __init__(self, *args, inference_threads=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inference_threads = inference_threads
+
+    def collect_rollouts(self, env, callback, rollout_buffer, n_rollout_steps):
+        traced = TracedPolicy(self.policy, batch_size=env.num_envs, threads=self.inference_threads)
+        # The measurement only needs to run once per machine
+        self.inference_threads = traced.threads
+        # nn.Module.__call__ looks forward up on the instance first
+        self.policy.forward = traced.forward
+        try:
+            return super().collect_rollouts(env, callback, rollout_buffer, n_rollout_steps)
+        finally:
+            del self.policy.forward
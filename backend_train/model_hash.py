@@ -0,0 +1,50 @@
+import hashlib
+import io
+import json
+import zipfile
+
+import torch as th
+
+
+def weights_hash(model_path):
+    """
+    Digest of the policy weights in an SB3 ``.zip``.
+
+    Hashes tensor names, dtypes, shapes and contents rather than the zip bytes, which change
+    with every save (timestamps, optimizer state, system info) even when the weights do not.
+    """
+    if not model_path.endswith(".zip"):
+        model_path += ".zip"
+    with zipfile.ZipFile(model_path) as archive:
+        state_dict = th.load(io.BytesIO(archive.read("policy.pth")), map_location="cpu", weights_only=True)
+    h = hashlib.sha256()
+    for name in sorted(state_dict):
+        tensor = state_dict[name].contiguous()
+        h.update(f"{name}:{tensor.dtype}:{tuple(tensor.shape)}".encode())
+        h.update(tensor.numpy().tobytes())
+    return h.hexdigest()
+
+
+def saved_attribute(model_path, name, default=None):
+    """Plain (JSON) attribute saved with an SB3 ``.zip``, e.g. ``decision_interval``, without loading the model."""
+    if not model_path.endswith(".zip"):
+        model_path += ".zip"
+    with zipfile.ZipFile(model_path) as archive:
+        return json.loads(archive.read("data")).get(name, default)
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def content_hash(*parts):
+    """Combined digest of strings (e.g. the hashes above) and JSON-serializable settings; None parts count too."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True).encode())
+        h.update(b"\0")
+    return h.hexdigest()
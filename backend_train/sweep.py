@@ -0,0 +1,184 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+# Search space entries: {"choice": [...]}, {"uniform": [low, high]} or {"log_uniform": [low, high]}
+# "num_envs" sizes the trial's BatchedFightingEnv (the num_cpu * envs_per_worker of train_fast.py);
+# every other key goes to PPO as is.
+DEFAULT_CONFIG = "sweeps/ppo_fast.json"
+
+
+def sample_params(space, rng):
+    params = {}
+    for name, spec in space.items():
+        (kind, values), = spec.items()
+        if kind == "choice":
+            params[name] = values[int(rng.integers(len(values)))]
+        elif kind == "uniform":
+            params[name] = float(rng.uniform(*values))
+        elif kind == "log_uniform":
+            params[name] = float(math.exp(rng.uniform(math.log(values[0]), math.log(values[1]))))
+        else:
+            raise ValueError(f"Unknown search space type {kind!r} for {name}")
+    return params
+
+
+def rung_budgets(min_steps, max_steps, eta):
+    # Training steps each surviving trial has reached after every rung
+    budgets = [min_steps]
+    while budgets[-1] * eta <= max_steps:
+        budgets.append(budgets[-1] * eta)
+    return budgets
+
+
+def make_trial_env(num_envs, seed, stats_path=None):
+    # The batched engine keeps a trial to one process, so the pool decides the parallelism
+    from stable_baselines3.common.vec_env import VecFrameStack, VecNormalize
+    from train_fast import make_vec_env
+
+    env = VecFrameStack(make_vec_env("batched", num_envs, seed=seed), n_stack=4)
+    if stats_path and os.path.exists(stats_path):
+        return VecNormalize.load(stats_path, env)
+    return VecNormalize(env, norm_obs=True, norm_reward=True, clip_obs=10.)
+
+
+def run_trial(trial_dir, params, fixed, steps, eval_episodes, seed, eval_seed):
+    """
+    Train one trial up to ``steps`` total steps (resuming its saved model if there is one),
+    then evaluate the win rate against the scripted bots on the matches ``eval_seed`` deals.
+    Runs in a pool process.
+    """
+    import torch as th
+    from stable_baselines3 import PPO
+    from stable_baselines3.common.vec_env import VecNormalize
+    from evaluate_only import balanced_episodes, make_eval_env, run_episodes, summarize
+
+    # One trial per core: more torch threads would only fight the other trials
+    th.set_num_threads(1)
+    start = time.perf_counter()
+    model_path = os.path.join(trial_dir, "model.zip")
+    stats_path = os.path.join(trial_dir, "vec_normalize.pkl")
+    kwargs = dict(fixed, **params)
+    num_envs = kwargs.pop("num_envs", 8)
+    env = make_trial_env(num_envs, seed, stats_path)
+    if os.path.exists(model_path):
+        model = PPO.load(model_path, env=env, device="cpu")
+    else:
+        kwargs.setdefault("policy_kwargs", dict(activation_fn=th.nn.ReLU))
+        model = PPO("MlpPolicy", env, device="cpu", seed=seed, **kwargs)
+    if model.num_timesteps < steps:
+        model.learn(steps - model.num_timesteps, reset_num_timesteps=False)
+        model.save(model_path)
+        env.save(stats_path)
+    env.close()
+    train_time = time.perf_counter() - start
+
+    eval_env = VecNormalize.load(stats_path, make_eval_env("batched", min(eval_episodes, 64), 1))
+    eval_env.training = False
+    eval_env.norm_reward = False
+    eval_env.seed(eval_seed)
+    per_env, _ = run_episodes(model, eval_env, eval_episodes)
+    eval_env.close()
+    result = summarize(balanced_episodes(per_env))
+    return {"steps": int(model.num_timesteps), "eval_seed": eval_seed, "train_seconds": train_time,
+            "eval_seconds": time.perf_counter() - start - train_time, **result}
+
+
+def run_sweep(config, out_dir, workers=None):
+    """
+    Successive halving: every trial trains for ``min_steps`` and is evaluated, the best
+    1/eta by win rate (mean reward breaks ties) train on to eta times the steps, and so on up
+    to ``max_steps``. Returns one row per (trial, rung).
+    """
+    rng = np.random.default_rng(config.get("seed", 0))
+    budget = config["budget"]
+    eta = budget.get("eta", 3)
+    budgets = rung_budgets(budget["min_steps"], budget["max_steps"], eta)
+    eval_episodes = config.get("eval_episodes", 128)
+    trials = {f"trial_{i:03d}": sample_params(config["space"], rng) for i in range(config["trials"])}
+    # Every trial of a rung plays the same matches, so win rates are compared on equal terms
+    eval_seeds = [int(seed) for seed in rng.integers(2**31, size=len(budgets))]
+    for name in trials:
+        os.makedirs(os.path.join(out_dir, name), exist_ok=True)
+        with open(os.path.join(out_dir, name, "params.json"), "w") as f:
+            json.dump(trials[name], f, indent=2)
+
+    workers = workers or os.cpu_count()
+    rows, alive = [], list(trials)
+    print(f"Sweep: {len(trials)} trials, rungs at {budgets} steps, {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+        for rung, steps in enumerate(budgets):
+            futures = {name: pool.submit(run_trial, os.path.join(out_dir, name), trials[name], config.get("fixed", {}),
+                                         steps, eval_episodes, config.get("seed", 0) + int(name[-3:]), eval_seeds[rung])
+                       for name in alive}
+            results = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"{name} failed at rung {rung}: {e}")
+            ranked = sorted(results, key=lambda n: (results[n]["win_rate"], results[n]["mean_reward"]), reverse=True)
+            last = rung == len(budgets) - 1
+            promoted = set(ranked[:max(1, len(ranked) // eta)]) if not last else set()
+            for name in ranked:
+                status = "final" if last else ("promoted" if name in promoted else "pruned")
+                rows.append({"trial": name, "rung": rung, "status": status, **results[name], **trials[name]})
+                r = results[name]
+                print(f"rung {rung} {name} {r['steps']:>9} steps  win {100 * r['win_rate']:5.1f}% "
+                      f"[{100 * r['ci_low']:.1f}%, {100 * r['ci_high']:.1f}%]  reward {r['mean_reward']:8.2f}  {status}")
+            alive = [name for name in ranked if name in promoted]
+            if not alive:
+                break
+    return rows
+
+
+def write_table(rows, out_dir):
+    # Every (trial, rung) row, best final result first
+    rows = sorted(rows, key=lambda r: (-r["rung"], -r["win_rate"], -r["mean_reward"]))
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with open(os.path.join(out_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(out_dir, "results.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PPO hyperparameter sweep with successive halving on win rate.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="JSON file with trials, budget, fixed and space")
+    parser.add_argument("--out-dir", default=None, help="default: models/sweeps/<config name>")
+    parser.add_argument("--workers", type=int, default=None, help="parallel trials (default: CPU count)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    out_dir = args.out_dir or os.path.join("models", "sweeps", os.path.splitext(os.path.basename(args.config))[0])
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    rows = write_table(run_sweep(config, out_dir, args.workers), out_dir)
+    if not rows:
+        print("Every trial failed, see the errors above", file=sys.stderr)
+        sys.exit(1)
+    total_steps = sum(max(r["steps"] for r in rows if r["trial"] == t) for t in {r["trial"] for r in rows})
+    full_steps = config["trials"] * config["budget"]["max_steps"]
+    best = rows[0]
+    params = {k: best[k] for k in config["space"]}
+    print(f"\nBest: {best['trial']} win {100 * best['win_rate']:.1f}% at {best['steps']} steps with {params}")
+    print(f"{total_steps:,} training steps instead of {full_steps:,} ({full_steps / max(total_steps, 1):.1f}x less) "
+          f"in {time.perf_counter() - start:.0f}s")
+    print(f"Results written to {os.path.join(out_dir, 'results.csv')}")
+
+
+if __name__ == "__main__":
+    main()
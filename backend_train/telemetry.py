@@ -0,0 +1,205 @@
+import os
+import resource
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import SubprocVecEnv
+
+from envs.shm_vec_env import SharedMemoryVecEnv
+
+
+def rss_bytes(pid="self"):
+    """Resident set size of a process, from /proc where available."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        if pid != "self":
+            return 0
+        # Peak instead of current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def stack_obs(obs, space):
+    # Same batching as SubprocVecEnv.step_wait, without importing SB3's private helper
+    if isinstance(space, spaces.Dict):
+        return {key: np.stack([o[key] for o in obs]) for key in space.spaces}
+    if isinstance(space, spaces.Tuple):
+        return tuple(np.stack([o[i] for o in obs]) for i in range(len(space.spaces)))
+    return np.stack(obs)
+
+
+class WorkerTiming:
+    """
+    Per-worker step latency for process-based vec envs.
+
+    Results are collected in arrival order, so each worker's latency is the time from sending
+    the step until its own reply, not until the replies queued in front of it. The stall is the
+    gap between the first and the last reply: time the fastest worker sits idle per step.
+    """
+
+    def _init_timing(self):
+        self._sent = 0.0
+        self.reset_timings()
+
+    def reset_timings(self):
+        n = len(self.remotes)
+        self.timing_steps = 0
+        self.latency_sum = np.zeros(n)
+        self.latency_max = np.zeros(n)
+        self.stall_sum = 0.0
+        self.wait_sum = 0.0
+
+    def _recv_timed(self):
+        start = time.perf_counter()
+        pending = {remote: w for w, remote in enumerate(self.remotes)}
+        results = [None] * len(self.remotes)
+        latency = np.zeros(len(self.remotes))
+        while pending:
+            for remote in wait(list(pending)):
+                w = pending.pop(remote)
+                results[w] = remote.recv()
+                latency[w] = time.perf_counter() - self._sent
+        self.timing_steps += 1
+        self.latency_sum += latency
+        np.maximum(self.latency_max, latency, out=self.latency_max)
+        self.stall_sum += latency.max() - latency.min()
+        self.wait_sum += time.perf_counter() - start
+        return results
+
+    def pop_timings(self):
+        steps = max(self.timing_steps, 1)
+        timings = {
+            "steps": self.timing_steps,
+            "latency_mean": self.latency_sum / steps,
+            "latency_max": self.latency_max.copy(),
+            "stall_mean": self.stall_sum / steps,
+            "wait_mean": self.wait_sum / steps,
+            "pids": [p.pid for p in self.processes],
+        }
+        self.reset_timings()
+        return timings
+
+
+class TimedSubprocVecEnv(WorkerTiming, SubprocVecEnv):
+    def __init__(self, env_fns, start_method=None):
+        super().__init__(env_fns, start_method)
+        self._init_timing()
+
+    def step_async(self, actions):
+        super().step_async(actions)
+        self._sent = time.perf_counter()
+
+    def step_wait(self):
+        results = self._recv_timed()
+        self.waiting = False
+        obs, rews, dones, infos, self.reset_infos = zip(*results)
+        return stack_obs(obs, self.observation_space), np.stack(rews), np.stack(dones), infos
+
+
+class TimedSharedMemoryVecEnv(WorkerTiming, SharedMemoryVecEnv):
+    def __init__(self, env_fns, envs_per_worker=1, start_method=None, action_shape=None):
+        super().__init__(env_fns, envs_per_worker, start_method, action_shape)
+        self._init_timing()
+
+    def step_async(self, actions):
+        super().step_async(actions)
+        self._sent = time.perf_counter()
+
+    def _recv_steps(self):
+        return self._recv_timed()
+
+
+class TelemetryCallback(BaseCallback):
+    """
+    Logs where wall-clock time goes to the run's tensorboard logdir, once per rollout.
+
+    * ``telemetry/env_steps_per_sec`` during collection and ``telemetry/steps_per_sec``
+      including the gradient update that followed the previous rollout
+    * ``telemetry/rollout_time`` vs. ``telemetry/train_time`` and the rollout fraction
+    * ``telemetry/policy_forward_ms`` per batched forward pass and its share of the rollout
+      (not logged when the policy runs elsewhere, e.g. in AsyncPPO's actor processes)
+    * ``telemetry/worker_*`` step latency and stall time when the vec env is a
+      ``TimedSubprocVecEnv`` or ``TimedSharedMemoryVecEnv``
+    * ``telemetry/rss_mb`` of the learner and ``telemetry/workers_rss_mb`` summed over workers
+    """
+
+    def __init__(self, per_worker=True, verbose=0):
+        super().__init__(verbose)
+        self.per_worker = per_worker
+        self.hooks = []
+        self.rollout_start = self.rollout_end = None
+        self.forward_time = 0.0
+        self.forward_calls = 0
+
+    def _init_callback(self):
+        policy = self.model.policy
+
+        def before(module, args):
+            self._forward_start = time.perf_counter()
+
+        def after(module, args, output):
+            self.forward_time += time.perf_counter() - self._forward_start
+            self.forward_calls += 1
+
+        # forward() only runs during collection; PPO updates go through evaluate_actions()
+        self.hooks = [policy.register_forward_pre_hook(before), policy.register_forward_hook(after)]
+
+    def _timed_env(self):
+        env = self.training_env
+        while not isinstance(env, WorkerTiming) and hasattr(env, "venv"):
+            env = env.venv
+        return env if isinstance(env, WorkerTiming) else None
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        # Time since the previous rollout ended is the PPO update (plus logging)
+        self.train_time = 0.0 if self.rollout_end is None else now - self.rollout_end
+        if self.rollout_end is not None:
+            self.logger.record("telemetry/train_time", self.train_time)
+        self.rollout_start = now
+        self.rollout_start_steps = self.num_timesteps
+        self.forward_time = 0.0
+        self.forward_calls = 0
+        env = self._timed_env()
+        if env is not None:
+            env.reset_timings()
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        self.rollout_end = time.perf_counter()
+        rollout_time = self.rollout_end - self.rollout_start
+        steps = self.num_timesteps - self.rollout_start_steps
+        log = self.logger.record
+        log("telemetry/rollout_time", rollout_time)
+        log("telemetry/env_steps_per_sec", steps / rollout_time)
+        log("telemetry/steps_per_sec", steps / (rollout_time + self.train_time))
+        log("telemetry/rollout_fraction", rollout_time / (rollout_time + self.train_time))
+        if self.forward_calls:
+            log("telemetry/policy_forward_ms", 1000 * self.forward_time / self.forward_calls)
+            log("telemetry/policy_forward_fraction", self.forward_time / rollout_time)
+        log("telemetry/rss_mb", rss_bytes() / 2**20)
+
+        env = self._timed_env()
+        if env is not None:
+            t = env.pop_timings()
+            log("telemetry/worker_latency_ms", 1000 * t["latency_mean"].mean())
+            log("telemetry/worker_latency_max_ms", 1000 * t["latency_max"].max())
+            log("telemetry/worker_stall_ms", 1000 * t["stall_mean"])
+            # Share of the rollout the learner spent blocked on workers
+            log("telemetry/worker_wait_fraction", t["wait_mean"] * t["steps"] / rollout_time)
+            log("telemetry/workers_rss_mb", sum(rss_bytes(pid) for pid in t["pids"]) / 2**20)
+            if self.per_worker:
+                for w, latency in enumerate(t["latency_mean"]):
+                    log(f"telemetry/worker_{w}_latency_ms", 1000 * latency)
+
+    def _on_training_end(self):
+        for hook in self.hooks:
+            hook.remove()
+        self.hooks = []
@@ -0,0 +1,57 @@
+from envs.fighting_env import FightingGameEnv
+from envs.replay import RecordReplay, ReplayPlayer, state_checksum
+from model_hash import saved_attribute
+from stable_baselines3 import PPO
+import numpy as np
+
+def test_decision_interval_matches_repeated_frames():
+    k = 4
+    repeat, frames = FightingGameEnv(decision_interval=k), FightingGameEnv()
+    assert np.array_equal(repeat.reset(seed=5)[0], frames.reset(seed=5)[0])
+    rng = np.random.default_rng(0)
+    steps = total_frames = 0
+    done = False
+    while not done:
+        action = int(rng.integers(0, 9))
+        obs, reward, terminated, truncated, info = repeat.step(action)
+        expected = 0.0
+        for _ in range(info["frames"]):
+            frame_obs, frame_reward, frame_terminated, frame_truncated, _ = frames.step(action)
+            expected += frame_reward
+        assert np.array_equal(obs, frame_obs) and np.isclose(reward, expected)
+        assert (terminated, truncated) == (frame_terminated, frame_truncated)
+        assert state_checksum(repeat) == state_checksum(frames)
+        done = terminated or truncated
+        steps += 1
+        total_frames += info["frames"]
+        assert info["frames"] == k or done
+    # Episodes still end after MAX_STEPS frames, in a quarter of the steps
+    assert total_frames == repeat.current_step and steps == -(-total_frames // k)
+    print("Action repeat matches frame-by-frame play!")
+
+def test_action_repeat_replays_and_metadata(tmp_path):
+    path = str(tmp_path / "worker_0")
+    env = RecordReplay(FightingGameEnv(decision_interval=3), path, seed=1)
+    rng = np.random.default_rng(0)
+    env.reset()
+    done = False
+    while not done:
+        _, _, terminated, truncated, _ = env.step(int(rng.integers(0, 9)))
+        done = terminated or truncated
+    env.close()
+    # Replays hold every frame, with the bot's per-frame actions, and play back without repeat
+    player = ReplayPlayer(path)
+    assert player.index[0]["length"] == env.unwrapped.current_step and player.verify() == []
+
+    model = PPO("MlpPolicy", FightingGameEnv(decision_interval=3), device="cpu", n_steps=64, batch_size=64)
+    model.decision_interval = 3
+    model.save(tmp_path / "model")
+    assert saved_attribute(str(tmp_path / "model"), "decision_interval", 1) == 3
+    assert saved_attribute(str(tmp_path / "model.zip"), "missing", 1) == 1
+    print("Action repeat replays re-simulate and the interval is saved with the model!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_decision_interval_matches_repeated_frames()
+    with tempfile.TemporaryDirectory() as d:
+        test_action_repeat_replays_and_metadata(pathlib.Path(d))
@@ -0,0 +1,43 @@
+import json
+import os
+import tempfile
+
+from autotune import candidate_layouts, tuned_layout
+
+
+def test_candidate_layouts():
+    # Only splits of the same env count, so PPO's rollout size never changes
+    layouts = candidate_layouts("shared_memory", 12, cpu_count=6)
+    assert layouts == [(1, 12), (2, 6), (3, 4), (4, 3), (6, 2)]
+    assert candidate_layouts("shared_memory", 10, cpu_count=64)[-1] == (10, 1)
+    # One env per process for SubprocVecEnv
+    assert candidate_layouts("subproc", 10, cpu_count=6) == [(10, 1)]
+    print(f"{len(layouts)} shared memory layouts of 12 envs on 6 CPUs")
+
+
+def test_tuned_layout_cached():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "autotune.json")
+        # Nothing to choose: the configured layout is kept and nothing is measured
+        assert tuned_layout("subproc", default=(4, 1), cache_path=cache_path) == (4, 1)
+        assert tuned_layout("batched", default=(3, 5), cache_path=cache_path) == (3, 5)
+        assert not os.path.exists(cache_path)
+
+        layout = tuned_layout("shared_memory", default=(2, 1), cache_path=cache_path, seconds=0.2)
+        with open(cache_path) as f:
+            cache = json.load(f)
+        (entry,) = cache.values()
+        assert tuple(layout) == (entry["results"][0]["num_cpu"], entry["results"][0]["envs_per_worker"])
+        assert layout[0] * layout[1] == 2
+        assert all(r["steps_per_sec"] > 0 for r in entry["results"])
+
+        # Same host and layouts: the saved choice is reused without measuring again
+        mtime = os.path.getmtime(cache_path)
+        assert tuned_layout("async", default=(2, 1), cache_path=cache_path, seconds=0.2) == layout
+        assert os.path.getmtime(cache_path) == mtime
+        print(f"Tuned layout: {layout}")
+
+
+if __name__ == "__main__":
+    test_candidate_layouts()
+    test_tuned_layout_cached()
@@ -0,0 +1,36 @@
+from benchmark_env import PHASES, check_baseline, compare, time_phases
+import json
+
+def results(**sps):
+    return {"meta": {"platform": "test", "cpu_count": 1}, "setups": {name: {"steps_per_sec": v} for name, v in sps.items()}}
+
+def test_compare_flags_regressions():
+    baseline = results(bare=1000.0, batched_64=50_000.0, gone=10.0)
+    # 10% slower is within tolerance, 20% is not; setups missing on either side are skipped
+    current = results(bare=900.0, batched_64=40_000.0, new=5.0)
+    assert compare(current, baseline, tolerance=0.15) == ["batched_64"]
+    assert compare(current, baseline, tolerance=0.25) == []
+    print("Benchmark comparison OK!")
+
+def test_missing_baseline_fails_the_gate(tmp_path):
+    path = tmp_path / "env_baseline.json"
+    assert check_baseline(results(bare=1000.0), str(path), 0.15) == 2
+    path.write_text(json.dumps(results(bare=1000.0)))
+    assert check_baseline(results(bare=1000.0), str(path), 0.15) == 0
+    assert check_baseline(results(bare=500.0), str(path), 0.15) == 1
+    print("Missing baselines fail the gate!")
+
+def test_time_phases_breakdown():
+    phases = time_phases(500, seed=0)
+    assert set(phases) == set(PHASES) | {"other", "step_total"}
+    assert all(p["us_per_step"] >= 0 and p["share"] >= 0 for p in phases.values())
+    # The phases are part of the step; "other" is the rest
+    assert sum(phases[name]["us_per_step"] for name in PHASES) <= phases["step_total"]["us_per_step"] * 1.05
+    print("Phase breakdown OK!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_compare_flags_regressions()
+    with tempfile.TemporaryDirectory() as d:
+        test_missing_baseline_fails_the_gate(pathlib.Path(d))
+    test_time_phases_breakdown()
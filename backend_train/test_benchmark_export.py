@@ -0,0 +1,42 @@
+from envs.fighting_env import FightingGameEnv
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecNormalize
+import benchmark_export
+import export_model
+import importlib.util
+import json
+import numpy as np
+
+def test_export_benchmark_checks_parity_and_skips_missing_runtimes(tmp_path):
+    models = tmp_path / "models"
+    env = VecNormalize(VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    observations = export_model.sample_observations(512)
+    env.obs_rms.mean, env.obs_rms.var = observations.mean(0).astype(np.float64), observations.var(0).astype(np.float64)
+    model = PPO("MlpPolicy", env, n_steps=64, device="cpu", seed=0)
+    model.save(models / "ppo_fast_checkpoint_64_steps")
+    # Exported with --stats: the benchmark has to take them from the manifest, not from next to the model
+    env.save(str(models / "vec_normalize.pkl"))
+
+    # An export that only got as far as the folded torch graph: no model.onnx, no saved_model
+    export_dir = tmp_path / "exports" / "ppo_fast_checkpoint_64_steps"
+    export_dir.mkdir(parents=True)
+    (export_dir / "export_info.json").write_text(json.dumps({"normalization_folded": True}))
+    (export_dir / export_model.MANIFEST).write_text(json.dumps({"model": str(models / "ppo_fast_checkpoint_64_steps.zip"),
+                                                                     "stats": str(models / "vec_normalize.pkl")}))
+
+    results = benchmark_export.run_benchmark(str(export_dir), runtimes=("sb3", "torch", "onnx", "saved_model"),
+                                             batch_sizes=(1, 8), iters=20, n_obs=256)
+    assert results["sb3"]["parity"]["max_logit_error"] == 0.0
+    assert results["torch"]["parity"]["max_logit_error"] < 1e-4
+    assert results["torch"]["parity"]["argmax_agreement"] == 1.0
+    assert set(results["torch"]["threads"]["1"]) == {"1", "8"}
+    assert "skipped" in results["saved_model"]
+    if importlib.util.find_spec("onnxruntime") is None:
+        assert results["onnx"] == {"skipped": "onnxruntime not installed"}
+    assert benchmark_export.check(results, None, 1e-3, 0.999, 0.25) == []
+    print("Export benchmark checks parity and skips missing runtimes!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_export_benchmark_checks_parity_and_skips_missing_runtimes(pathlib.Path(d))
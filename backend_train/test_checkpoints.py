@@ -0,0 +1,80 @@
+from checkpoints import AsyncCheckpointCallback, EvalScore
+from envs.fighting_env import FightingGameEnv
+from envs.self_play import find_vecnormalize
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecNormalize
+import json
+import numpy as np
+import os
+import torch as th
+from types import SimpleNamespace
+
+def test_async_checkpoints_keep_last_and_best(tmp_path):
+    env = VecNormalize(VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    model = PPO("MlpPolicy", env, n_steps=32, batch_size=32, n_epochs=1, device="cpu", seed=0)
+    # Checkpoint at 64, 128, ..., 512 steps; the one at 192 scores best
+    scores = iter([1.0, 2.0, 9.0, 3.0, 4.0, 5.0, 6.0, 7.0])
+    (tmp_path / "sync").mkdir()
+    def score(cb):
+        # A synchronous save at the same moment, to compare the background write against
+        if cb.num_timesteps == 448: cb.model.save(tmp_path / "sync" / "model")
+        return next(scores)
+    callback = AsyncCheckpointCallback(64, str(tmp_path), "ppo_fast_checkpoint", save_vecnormalize=True,
+                                       keep_last=2, keep_best=1, score_fn=score)
+    model.learn(512, callback=callback)
+
+    kept = sorted(f for f in os.listdir(tmp_path) if f.endswith(".zip"))
+    assert kept == ["ppo_fast_checkpoint_192_steps.zip", "ppo_fast_checkpoint_448_steps.zip", "ppo_fast_checkpoint_512_steps.zip"]
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
+    assert callback.best().endswith("ppo_fast_checkpoint_192_steps.zip")
+    with open(tmp_path / "ppo_fast_checkpoint_checkpoints.json") as f:
+        assert [c["steps"] for c in json.load(f)] == [192, 448, 512]
+
+    # Background writes load like model.save() output, optimizer state included
+    path = str(tmp_path / "ppo_fast_checkpoint_448_steps.zip")
+    loaded, sync = PPO.load(path, device="cpu"), PPO.load(tmp_path / "sync" / "model", device="cpu")
+    assert loaded.num_timesteps == sync.num_timesteps == 448
+    for a, b in zip(loaded.policy.state_dict().values(), sync.policy.state_dict().values()):
+        assert th.equal(a, b)
+    for a, b in zip(loaded.policy.optimizer.state_dict()["state"].values(), sync.policy.optimizer.state_dict()["state"].values()):
+        assert th.equal(a["exp_avg"], b["exp_avg"])
+    # No env steps follow the last checkpoint, so its stats are the final ones
+    last = find_vecnormalize(str(tmp_path / "ppo_fast_checkpoint_512_steps.zip"))
+    stats = VecNormalize.load(last, VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    assert np.array_equal(stats.obs_rms.mean, env.obs_rms.mean)
+
+    # A resumed run keeps managing the earlier checkpoints
+    callback = AsyncCheckpointCallback(64, str(tmp_path), "ppo_fast_checkpoint", save_vecnormalize=True,
+                                       keep_last=2, keep_best=1, score_fn=lambda cb: 0.0)
+    model.learn(128, callback=callback, reset_num_timesteps=False)
+    kept = sorted(f for f in os.listdir(tmp_path) if f.endswith(".zip"))
+    assert kept == ["ppo_fast_checkpoint_192_steps.zip", "ppo_fast_checkpoint_576_steps.zip", "ppo_fast_checkpoint_640_steps.zip"]
+    print("Async checkpoints keep the last and best snapshots!")
+
+def test_eval_score_is_repeatable(tmp_path):
+    env = VecNormalize(VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    model = PPO("MlpPolicy", env, n_steps=32, batch_size=32, n_epochs=1, device="cpu", seed=0)
+    model.learn(64)
+    # Score functions only look at callback.model
+    callback = SimpleNamespace(model=model)
+    score = EvalScore(episodes=4, envs=4)
+    # Same matches and frozen stats every time: the same policy always gets the same score
+    mean = env.obs_rms.mean.copy()
+    first = score(callback)
+    assert np.isfinite(first) and score(callback) == first
+    assert np.array_equal(env.obs_rms.mean, mean)
+
+    # The callback scores on its writer thread, from the saved checkpoint and the stats of the moment
+    callback = AsyncCheckpointCallback(64, str(tmp_path), "ppo_fast_checkpoint", score_fn=score)
+    model.learn(64, callback=callback, reset_num_timesteps=False)
+    with open(tmp_path / "ppo_fast_checkpoint_checkpoints.json") as f:
+        [checkpoint] = json.load(f)
+    assert checkpoint["score"] == score.score(PPO.load(checkpoint["model"], device="cpu"), EvalScore.frozen_stats(model))
+    print(f"Eval score: {first:.2f}")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_async_checkpoints_keep_last_and_best(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_eval_score_is_repeatable(pathlib.Path(d))
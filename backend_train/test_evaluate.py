@@ -0,0 +1,62 @@
+from evaluate_only import balanced_episodes, early_stopper, make_eval_env, run_episodes, summarize, wilson_interval
+from stable_baselines3 import PPO
+import numpy as np
+
+def episode(win):
+    return {"is_win": win, "p2_personality": 0, "side": 0, "reward": 1.0 if win else -1.0, "length": 10}
+
+def test_wilson_interval_known_values():
+    # Textbook 95% Wilson intervals
+    low, high = wilson_interval(8, 10)
+    assert abs(low - 0.4902) < 1e-4 and abs(high - 0.9433) < 1e-4
+    low, high = wilson_interval(0, 10)
+    assert low == 0.0 and abs(high - 0.2775) < 1e-4
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    print("Wilson intervals OK!")
+
+def test_balanced_episodes_and_summary():
+    # Env 0 finished three (short) episodes, env 1 only one: only the first round counts
+    per_env = [[episode(True), episode(True), episode(True)], [episode(False)]]
+    episodes = balanced_episodes(per_env)
+    assert len(episodes) == 2
+    summary = summarize(episodes)
+    assert summary["episodes"] == 2 and summary["wins"] == 1 and summary["win_rate"] == 0.5
+    assert summary["mean_reward"] == 0.0 and summary["ci_low"] < 0.5 < summary["ci_high"]
+    print("Balanced episodes OK!")
+
+def test_early_stopper_false_stop_rate():
+    should_stop = early_stopper(0.8, 0.99, min_episodes=100, max_episodes=2000)
+    assert should_stop.looks == [100, 200, 400, 800, 1600]
+    # At exactly the threshold every stop is a false one; checked after every episode as run_episodes does
+    rng = np.random.default_rng(0)
+    runs, stops = 1000, 0
+    for _ in range(runs):
+        should_stop = early_stopper(0.8, 0.99, min_episodes=100, max_episodes=2000)
+        episodes = []
+        for win in rng.random(2000) < 0.8:
+            episodes.append(episode(bool(win)))
+            if should_stop([episodes]):
+                stops += 1
+                break
+    # 1% nominal (0.7-0.8% measured over 4000 runs; checking after every episode gives about 10%)
+    assert stops / runs <= 0.015, stops
+    # A clear result still stops at the first look
+    should_stop = early_stopper(0.8, 0.99, min_episodes=100, max_episodes=2000)
+    assert not should_stop([[episode(True)] * 99]) and should_stop([[episode(True)] * 100])
+    print(f"Early stopping: {stops}/{runs} false stops at the threshold")
+
+def test_run_episodes_is_balanced():
+    env = make_eval_env("batched", 4, 1)
+    env.seed(0)
+    model = PPO("MlpPolicy", env, device="cpu", seed=0)
+    per_env, stopped = run_episodes(model, env, 8)
+    env.close()
+    assert not stopped and all(len(episodes) >= 2 for episodes in per_env)
+    assert len(balanced_episodes(per_env)) == 8
+    print("Evaluation run OK!")
+
+if __name__ == "__main__":
+    test_wilson_interval_known_values()
+    test_balanced_episodes_and_summary()
+    test_early_stopper_false_stop_rate()
+    test_run_episodes_is_balanced()
@@ -0,0 +1,94 @@
+from envs.fighting_env import FightingGameEnv
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecNormalize
+import export_model
+import json
+import os
+
+def test_export_skips_unchanged_checkpoints(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    env = VecNormalize(VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    model = PPO("MlpPolicy", env, n_steps=64, device="cpu")
+    model.save(models / "ppo_fast_checkpoint_64_steps")
+    env.save(str(models / "ppo_fast_checkpoint_vecnormalize_64_steps.pkl"))
+
+    # The converters are not needed to check the cache; stand in for them and count calls
+    calls = []
+    def fake_export(model_path, onnx_path, opset=12, heads_json=None, stats_path=None):
+        calls.append(model_path)
+        open(onnx_path, "w").close()
+    def fake_convert(onnx_path, output_dir, saved_model_path=None, tfjs_format=None, metadata=None):
+        os.makedirs(output_dir, exist_ok=True)
+        open(os.path.join(output_dir, "model.json"), "w").close()
+    monkeypatch.setattr(export_model, "export_model", fake_export)
+    monkeypatch.setattr(export_model, "convert_to_tfjs", fake_convert)
+
+    paths = export_model.find_checkpoints(str(models))
+    assert [os.path.basename(p) for p in paths] == ["ppo_fast_checkpoint_64_steps.zip"]
+    out = str(tmp_path / "exports")
+    assert export_model.export_checkpoint(paths[0], out) == ("ppo_fast_checkpoint_64_steps", "exported")
+    # Stats are folded into the graph rather than shipped as norm_stats.json
+    assert not os.path.exists(os.path.join(out, "ppo_fast_checkpoint_64_steps", "tfjs", "norm_stats.json"))
+    assert export_model.export_checkpoint(paths[0], out)[1] == "cached"
+
+    # Saving the same weights again changes the zip bytes but not the cache key
+    model.save(models / "ppo_fast_checkpoint_64_steps")
+    assert export_model.export_checkpoint(paths[0], out)[1] == "cached"
+
+    # New normalization stats or settings invalidate the artifact
+    env.obs_rms.mean += 1.0
+    env.save(str(models / "ppo_fast_checkpoint_vecnormalize_64_steps.pkl"))
+    assert export_model.export_checkpoint(paths[0], out)[1] == "exported"
+    settings = dict(export_model.EXPORT_SETTINGS, opset=13)
+    assert export_model.export_checkpoint(paths[0], out, settings)[1] == "exported"
+    assert len(calls) == 3
+    print("Export cache skips unchanged checkpoints!")
+
+def test_export_only_uses_own_stats(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    env = VecNormalize(VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    model = PPO("MlpPolicy", env, n_steps=64, device="cpu")
+    # A train_fast.py run's final stats, next to a train.py checkpoint trained without normalization
+    models.mkdir()
+    env.save(str(models / "vec_normalize.pkl"))
+    model.save(models / "ppo_fighting_checkpoint_64_steps")
+    model.save(models / "plain_model")
+    model.vec_normalize_file = "vec_normalize.pkl"
+    model.save(models / "neural_nemesis_pro")
+
+    assert export_model.find_vecnormalize(str(models / "ppo_fighting_checkpoint_64_steps.zip")) is None
+    assert export_model.find_vecnormalize(str(models / "plain_model.zip")) is None
+    assert export_model.find_vecnormalize(str(models / "neural_nemesis_pro.zip")) == str(models / "vec_normalize.pkl")
+
+    stats, normalization = [], []
+    def fake_export(model_path, onnx_path, opset=12, heads_json=None, stats_path=None):
+        stats.append(stats_path)
+        open(onnx_path, "w").close()
+    def fake_convert(onnx_path, output_dir, saved_model_path=None, tfjs_format=None, metadata=None):
+        with open(metadata["export_info"]) as f:
+            normalization.append(json.load(f)["normalization"])
+        os.makedirs(output_dir, exist_ok=True)
+        open(os.path.join(output_dir, "model.json"), "w").close()
+    monkeypatch.setattr(export_model, "export_model", fake_export)
+    monkeypatch.setattr(export_model, "convert_to_tfjs", fake_convert)
+
+    out = str(tmp_path / "exports")
+    export_model.export_checkpoint(str(models / "ppo_fighting_checkpoint_64_steps.zip"), out)
+    # Explicit stats are still honored
+    export_model.export_checkpoint(str(models / "plain_model.zip"), out, stats_path=str(models / "vec_normalize.pkl"))
+    export_model.export_checkpoint(str(models / "neural_nemesis_pro.zip"), out, stats_path=export_model.NO_STATS)
+    assert stats == [None, str(models / "vec_normalize.pkl"), None]
+    # The worker reads this to skip norm_stats.json and normalize()
+    assert normalization == ["none", "folded", "none"]
+
+    # Publishing replaces the previous model, including a norm_stats.json the new one does not use
+    public = tmp_path / "public"
+    public.mkdir()
+    (public / "norm_stats.json").write_text("{}")
+    export_model.publish(out, "neural_nemesis_pro", str(public))
+    assert sorted(os.listdir(public)) == ["model.json"]
+    print("Export never borrows another run's normalization stats!")
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, "-q"])
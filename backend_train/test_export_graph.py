@@ -0,0 +1,53 @@
+from envs.fighting_env import FightingGameEnv
+from export_model import FullOnnxModel, check_folding, export_heads
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecNormalize
+import json
+import numpy as np
+import torch as th
+
+def make_model():
+    env = VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4)
+    return PPO("MlpPolicy", env, policy_kwargs=dict(activation_fn=th.nn.ReLU), device="cpu", seed=0)
+
+def test_export_graph_batches_and_names_heads(tmp_path):
+    model = make_model()
+    graph = FullOnnxModel(model).eval()
+    obs = th.randn(64, 72)
+    with th.no_grad():
+        logits, value, latent_pi, latent_vf = graph(obs)
+        probs = model.policy.get_distribution(obs).distribution.probs
+        assert th.allclose(th.softmax(logits, -1), probs, atol=1e-6)
+        assert th.allclose(value, model.policy.predict_values(obs), atol=1e-6)
+        # One batched call matches row-by-row calls
+        assert th.allclose(logits[5:6], graph(obs[5:6])[0], atol=1e-6)
+
+    # heads.json reproduces logits and values from the named latents the browser reads
+    export_heads(model, str(tmp_path / "heads.json"))
+    with open(tmp_path / "heads.json") as f:
+        heads = json.load(f)
+    actor_logits = latent_pi.numpy() @ np.array(heads["actor"]["weight"]) + np.array(heads["actor"]["bias"])
+    critic_value = latent_vf.numpy() @ np.array(heads["critic"]["weight"]) + np.array(heads["critic"]["bias"])
+    assert np.allclose(actor_logits, logits.numpy(), atol=1e-5)
+    assert np.allclose(critic_value, value.numpy(), atol=1e-5)
+    print("Export graph batches and exposes named heads!")
+
+def test_folded_normalization_matches_vec_normalize():
+    model = make_model()
+    vn = VecNormalize(model.get_env(), clip_obs=5.0)
+    rng = np.random.default_rng(1)
+    vn.obs_rms.mean = rng.normal(size=72) * 100
+    vn.obs_rms.var = rng.uniform(0.01, 1e4, size=72)
+    vn.obs_rms.var[::9] = 0.0  # Constant features, e.g. a round timer that never moved
+    graph = FullOnnxModel(model, vn).eval()
+    report = check_folding(model, graph, vn)
+    assert report["argmax_agreement"] == 1.0
+    # The original policy is untouched by folding
+    assert not th.equal(graph.policy.mlp_extractor.policy_net[0].weight, model.policy.mlp_extractor.policy_net[0].weight)
+    print(f"Folded normalization matches VecNormalize: {report}")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_export_graph_batches_and_names_heads(pathlib.Path(d))
+    test_folded_normalization_matches_vec_normalize()
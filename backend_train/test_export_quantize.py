@@ -0,0 +1,46 @@
+from envs.fighting_env import FightingGameEnv
+from envs.replay import RecordReplay, ReplayPlayer
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack
+from test_export_graph import make_model
+import export_model
+import numpy as np
+
+def test_uint8_matches_tfjs_affine_quantization():
+    data = np.random.default_rng(0).normal(size=(64, 64)).astype(np.float32) * 0.3 + 0.1
+    q = export_model.quantize_tensor(data, "uint8")
+    assert len(np.unique(q)) <= 256
+    # 0 stays exact (ReLU outputs, zero padding) and rounding error is at most half a step
+    assert export_model.quantize_tensor(np.array([0.0, 1.0, -0.5], np.float32), "uint8")[0] == 0.0
+    scale = (data.max() - min(data.min(), 0)) / 255
+    assert np.abs(q - data).max() <= scale * 0.5 + 1e-6
+    print("uint8 quantization matches tfjs!")
+
+def test_quantization_report_on_recorded_observations(tmp_path):
+    path = str(tmp_path / "replays" / "worker_0")
+    env = VecFrameStack(DummyVecEnv([lambda: RecordReplay(FightingGameEnv(), path, seed=3)]), n_stack=4)
+    rng = np.random.default_rng(0)
+    seen = [env.reset()[0]]
+    while True:
+        obs, _, done, _ = env.step(rng.integers(0, 9, size=1))
+        if done[0]: break
+        seen.append(obs[0])
+    env.close()
+
+    # Replays give back exactly what the policy saw during the recorded episode
+    player = ReplayPlayer(path)
+    assert np.array_equal(player.observations(n_stack=4), np.stack(seen))
+
+    model = make_model()
+    model.save(tmp_path / "model")
+    report = export_model.quantization_report(str(tmp_path / "model.zip"), parity_obs=path)
+    assert report["observations"] == min(len(seen), 4096)
+    assert report["float32"]["action_agreement"] == 1.0 and report["float32"]["value_max_error"] == 0.0
+    assert report["float16"]["weight_bytes"] * 2 == report["float32"]["weight_bytes"]
+    assert report["float16"]["action_agreement"] > 0.95
+    export_model.print_quantization_report(report)
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_uint8_matches_tfjs_affine_quantization()
+    with tempfile.TemporaryDirectory() as d:
+        test_quantization_report_on_recorded_observations(pathlib.Path(d))
@@ -0,0 +1,58 @@
+from envs.batched_fighting_env import BatchedFightingEnv
+from fast_inference import TracedPolicy, TracedPPO
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecFrameStack, VecNormalize
+import numpy as np
+import torch as th
+
+def make_env(n=8):
+    return VecNormalize(VecFrameStack(BatchedFightingEnv(n, seed=0), n_stack=4), clip_obs=10.)
+
+def test_traced_policy_matches_eager():
+    model = PPO("MlpPolicy", make_env(), device="cpu", seed=0, policy_kwargs=dict(activation_fn=th.nn.ReLU))
+    traced = TracedPolicy(model.policy, batch_size=8, threads=1)
+    obs = np.random.default_rng(0).normal(size=(256, 72)).astype(np.float32)
+
+    # Deterministic actions for batches of any size and single observations, like model.predict
+    assert np.array_equal(traced.predict(obs, deterministic=True)[0], model.predict(obs, deterministic=True)[0])
+    assert traced.predict(obs[3], deterministic=True)[0] == model.predict(obs[3], deterministic=True)[0]
+
+    # Sampled actions come with the values and log-probs SB3 computes for them
+    actions, values, log_probs = traced.forward(th.as_tensor(obs))
+    with th.no_grad():
+        eager_values, eager_log_probs, _ = model.policy.evaluate_actions(th.as_tensor(obs), actions)
+    assert values.shape == (256, 1) and actions.dtype == th.int64
+    assert th.allclose(values, eager_values, atol=1e-5) and th.allclose(log_probs, eager_log_probs, atol=1e-5)
+    print("Traced policy matches the eager policy!")
+
+class CheckRollout(BaseCallback):
+    # At the end of a rollout the weights are still the ones that collected it
+    def _on_rollout_end(self):
+        buffer = self.model.rollout_buffer
+        obs = th.as_tensor(buffer.observations.reshape(-1, 72))
+        with th.no_grad():
+            values, log_probs, _ = self.model.policy.evaluate_actions(obs, th.as_tensor(buffer.actions.reshape(-1)))
+        assert np.allclose(buffer.log_probs.reshape(-1), log_probs.numpy(), atol=1e-5)
+        assert np.allclose(buffer.values.reshape(-1), values.numpy().reshape(-1), atol=1e-5)
+        self.rollouts = getattr(self, "rollouts", 0) + 1
+
+    def _on_step(self):
+        return True
+
+def test_traced_ppo_rollouts(tmp_path):
+    model = TracedPPO("MlpPolicy", make_env(), device="cpu", seed=0, n_steps=64, batch_size=128, n_epochs=2)
+    callback = CheckRollout()
+    model.learn(3 * 64 * 8, callback=callback)
+    assert callback.rollouts == 3 and model.inference_threads >= 1
+    # The traced forward is only swapped in while collecting
+    assert "forward" not in model.policy.__dict__
+    model.save(tmp_path / "traced_model")
+    assert type(PPO.load(tmp_path / "traced_model", device="cpu")) is PPO
+    print("TracedPPO rollouts carry the right values and log-probs!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_traced_policy_matches_eager()
+    with tempfile.TemporaryDirectory() as d:
+        test_traced_ppo_rollouts(pathlib.Path(d))
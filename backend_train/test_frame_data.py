@@ -0,0 +1,40 @@
+from envs.fighting_env import FightingGameEnv, FightingGameRules
+from envs.frame_data import FrameData
+import numpy as np
+
+def test_frame_data_matches_rules():
+    fd = FrameData(FightingGameRules)
+    rules = FightingGameRules
+
+    # Attack type 0 (not attacking) never hits
+    assert fd.duration[0] == 0 and fd.damage[0] == 0 and not fd.active[0].any()
+
+    # Light, heavy and special attacks with the constants they were written with
+    moves = [
+        (1, rules.LIGHT_ATTACK_DUR, rules.LIGHT_PHASES, rules.ATTACK_REACH, 3.0, rules.LIGHT_STUN),
+        (2, rules.HEAVY_ATTACK_DUR, rules.HEAVY_PHASES, rules.ATTACK_REACH + 20, 7.0, rules.HEAVY_STUN),
+        (3, rules.SPECIAL_ATTACK_DUR, rules.SPECIAL_PHASES, rules.ATTACK_REACH + 50, 12.0, rules.SPECIAL_STUN),
+    ]
+    for atk, duration, phases, reach, damage, stun in moves:
+        assert rules.ATTACKS[atk]["duration"] == duration
+        assert fd.duration[atk] == duration
+        assert fd.reach[atk] == reach
+        assert fd.damage[atk] == damage
+        assert fd.stun[atk] == stun
+        assert fd.knockback_victim[atk] == rules.KNOCKBACK_VICTIM
+        assert fd.knockback_attacker[atk] == rules.KNOCKBACK_ATTACKER
+        # The hit window is the active phase, right after startup, and nothing else
+        startup, active = phases[0], phases[1]
+        hit_frames = np.flatnonzero(fd.active[atk]).tolist()
+        assert hit_frames == list(range(startup, startup + active)), f"attack {atk} hits on frames {hit_frames}"
+
+    # Actions 6, 7 and 8 start the three attacks
+    assert fd.attack_for_action.tolist() == [0, 0, 0, 0, 0, 0, 1, 2, 3]
+
+    # The scalar engine reads the same tables as lists
+    for name, table in fd.__dict__.items():
+        assert getattr(FightingGameEnv.FRAME_DATA, name) == table.tolist()
+    print("Frame data matches the attack rules!")
+
+if __name__ == "__main__":
+    test_frame_data_matches_rules()
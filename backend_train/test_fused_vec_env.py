@@ -0,0 +1,84 @@
+from envs.batched_fighting_env import BatchedFightingEnv
+from envs.fighting_env import FightingGameEnv
+from envs.fused_vec_env import FusedVecEnv
+from export_model import norm_stats
+from gymnasium.wrappers import TimeLimit
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack, VecMonitor, VecNormalize
+import numpy as np
+
+def test_fused_env_matches_wrapper_stack(tmp_path):
+    n = 8
+    wrapped = VecNormalize(VecFrameStack(VecMonitor(BatchedFightingEnv(n, seed=1)), n_stack=4), clip_obs=10.)
+    fused = FusedVecEnv(BatchedFightingEnv(n, seed=1), n_stack=4, clip_obs=10.)
+    assert fused.observation_space == wrapped.observation_space
+    assert np.array_equal(wrapped.reset(), fused.reset())
+    rng = np.random.default_rng(0)
+    episodes = 0
+    for t in range(2000):
+        actions = rng.integers(0, 9, size=n)
+        obs_a, rew_a, done_a, infos_a = wrapped.step(actions)
+        obs_b, rew_b, done_b, infos_b = fused.step(actions)
+        assert np.array_equal(obs_a, obs_b) and np.array_equal(rew_a, rew_b) and np.array_equal(done_a, done_b), t
+        for a, b in zip(infos_a, infos_b):
+            if "terminal_observation" in a:
+                episodes += 1
+                assert np.array_equal(a["terminal_observation"], b["terminal_observation"])
+                assert a["episode"]["l"] == b["episode"]["l"] and np.isclose(a["episode"]["r"], b["episode"]["r"], atol=1e-3)
+    assert episodes > 0
+    assert np.array_equal(wrapped.obs_rms.mean, fused.obs_rms.mean) and np.array_equal(wrapped.obs_rms.var, fused.obs_rms.var)
+    assert np.array_equal(wrapped.ret_rms.var, fused.ret_rms.var)
+    assert np.array_equal(wrapped.get_original_reward(), fused.get_original_reward())
+    assert np.array_equal(wrapped.get_original_obs(), fused.get_original_obs())
+    # Stacking is a view into the ring buffer
+    assert np.shares_memory(fused._window(), fused.frames)
+
+    # Saved stats load as a plain VecNormalize and export like any other
+    fused.save(str(tmp_path / "vec_normalize.pkl"))
+    loaded = VecNormalize.load(str(tmp_path / "vec_normalize.pkl"), VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4))
+    assert type(loaded) is VecNormalize
+    assert norm_stats(loaded) == norm_stats(fused) == norm_stats(wrapped)
+    print("Fused env matches the wrapper stack!")
+
+def test_fused_env_time_limit_matches_monitor():
+    limit = 50
+    wrapped = VecNormalize(VecFrameStack(DummyVecEnv([lambda: Monitor(TimeLimit(FightingGameEnv(), max_episode_steps=limit))]), n_stack=4))
+    fused = FusedVecEnv(DummyVecEnv([FightingGameEnv]), n_stack=4, max_episode_steps=limit)
+    wrapped.seed(3)
+    fused.seed(3)
+    assert np.array_equal(wrapped.reset(), fused.reset())
+    rng = np.random.default_rng(0)
+    for t in range(3 * limit):
+        actions = rng.integers(0, 9, size=1)
+        obs_a, rew_a, done_a, infos_a = wrapped.step(actions)
+        obs_b, rew_b, done_b, infos_b = fused.step(actions)
+        assert np.array_equal(obs_a, obs_b) and np.array_equal(done_a, done_b), t
+        if done_a[0]:
+            assert infos_b[0]["TimeLimit.truncated"] and infos_b[0]["episode"]["l"] == infos_a[0]["episode"]["l"] == limit
+            assert np.array_equal(infos_a[0]["terminal_observation"], infos_b[0]["terminal_observation"])
+    print("Fused env time limit matches TimeLimit + Monitor!")
+
+def test_fused_env_time_limit_on_batched_engine():
+    limit = 30
+    fused = FusedVecEnv(BatchedFightingEnv(4, seed=0), n_stack=4, max_episode_steps=limit)
+    fused.reset()
+    rng = np.random.default_rng(0)
+    truncated = 0
+    for t in range(3 * limit):
+        _, _, dones, infos = fused.step(rng.integers(0, 9, size=4))
+        for i in np.flatnonzero(dones):
+            assert infos[i]["episode"]["l"] <= limit
+            if infos[i].get("TimeLimit.truncated"):
+                truncated += 1
+                assert infos[i]["episode"]["l"] == limit
+                # The truncated match restarted in place
+                assert fused.venv.current_step[i] == 0
+    assert truncated > 0
+    print(f"Fused env time limit works on the batched engine ({truncated} truncations)!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_fused_env_matches_wrapper_stack(pathlib.Path(d))
+    test_fused_env_time_limit_matches_monitor()
+    test_fused_env_time_limit_on_batched_engine()
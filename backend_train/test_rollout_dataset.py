@@ -0,0 +1,52 @@
+from envs.batched_fighting_env import BatchedFightingEnv
+from envs.rollout_dataset import LOSS, TRUNCATED, WIN, RolloutDataset, VecRecordRollouts
+import numpy as np
+
+def record(directory, n_envs, steps, seed, chunk_size=1000):
+    env = VecRecordRollouts(BatchedFightingEnv(n_envs, seed=seed), directory, chunk_size=chunk_size, block_steps=64)
+    rng = np.random.default_rng(seed)
+    expected = {"obs": [], "actions": [], "rewards": [], "dones": [], "flags": []}
+    obs = env.reset()
+    for _ in range(steps):
+        actions = rng.integers(0, 9, size=n_envs)
+        new_obs, rewards, dones, infos = env.step(actions)
+        flags = [WIN * i.get("is_win", False) | LOSS * i.get("is_loss", False) | TRUNCATED * i.get("TimeLimit.truncated", False) for i in infos]
+        for key, value in zip(expected, (obs, actions, rewards, dones, flags)):
+            expected[key].append(np.asarray(value))
+        obs = new_obs
+    env.close()
+    return {key: np.concatenate(value) for key, value in expected.items()}
+
+def test_recorded_rollouts_round_trip(tmp_path):
+    directory = str(tmp_path / "rollouts")
+    expected = record(directory, 8, 1000, seed=0)
+    dataset = RolloutDataset(directory)
+    # 8000 rows in chunks of 1000, written in (step, env) order
+    assert len(dataset) == 8000 and len(dataset.chunks) == 8
+    for key, value in expected.items():
+        assert np.array_equal(dataset[key], value), key
+    assert np.array_equal(dataset["env"], np.tile(np.arange(8), 1000))
+    assert dataset["actions"].dtype == np.uint8 and (dataset["flags"][~dataset["dones"]] == 0).all()
+
+    # Shuffled minibatches visit every row once, straight from the memory maps
+    seen = []
+    for batch in dataset.minibatches(300, fields=["obs", "rewards"], seed=1):
+        assert set(batch) == {"obs", "rewards", "index"} and len(batch["index"]) <= 300
+        assert np.array_equal(batch["obs"], expected["obs"][batch["index"]])
+        assert np.array_equal(batch["rewards"], expected["rewards"][batch["index"]])
+        seen.append(batch["index"])
+    seen = np.concatenate(seen)
+    assert np.array_equal(np.sort(seen), np.arange(8000)) and not np.array_equal(seen, np.arange(8000))
+    assert sum(1 for _ in dataset.minibatches(300, drop_last=True)) == 8000 // 300
+
+    # Recording again appends chunks; the last partial chunk only counts its filled rows
+    more = record(directory, 8, 130, seed=1)
+    dataset.reload()
+    assert len(dataset) == 8000 + 1040 and dataset.manifest["chunks"][-1]["length"] == 40
+    assert np.array_equal(dataset["obs"][8000:], more["obs"])
+    print("Recorded rollouts read back in shuffled minibatches!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_recorded_rollouts_round_trip(pathlib.Path(d))
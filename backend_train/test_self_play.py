@@ -0,0 +1,58 @@
+from envs.fighting_env import FightingGameEnv
+from envs.opponents import mirror_obs, ScriptedOpponent
+from envs.self_play import SnapshotPool, VecSelfPlay
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack
+import numpy as np
+
+def test_mirror_obs_swaps_players():
+    env = FightingGameEnv(opponent=ScriptedOpponent(personality=0))
+    env.reset(seed=0)
+    for _ in range(50):
+        obs, *_ = env.step(6)
+    mirrored = mirror_obs(obs)
+    # Swap the players' rows and compare with what the env reports from P1's side
+    env.players.reverse()
+    assert np.allclose(mirrored, env._get_obs())
+    assert np.array_equal(mirror_obs(mirrored), obs)
+
+def test_external_p2_action_overrides_bot():
+    env = FightingGameEnv(opponent=ScriptedOpponent(personality=3))
+    env.reset(seed=0)
+    env.step((0, 6))
+    assert env.p2_attacking == 1, "P2 should start the light attack it was given"
+    env.step((0, -1))
+    assert env.p2_current_action == 0, "Negative P2 action falls back to the passive bot"
+
+def test_self_play_batches_snapshots(tmp_path):
+    venv = VecFrameStack(DummyVecEnv([FightingGameEnv]), n_stack=4)
+    PPO("MlpPolicy", venv, n_steps=64, device="cpu").save(str(tmp_path / "ppo_fast_checkpoint_64_steps"))
+
+    # A checkpoint acting every 2 frames would play at the wrong cadence here
+    model = PPO("MlpPolicy", venv, n_steps=64, device="cpu")
+    model.decision_interval = 2
+    model.save(str(tmp_path / "ppo_fast_checkpoint_128_steps"))
+
+    pool = SnapshotPool.from_dir(str(tmp_path))
+    assert len(pool) == 1 and pool.policies[0].path.endswith("_64_steps.zip")
+    assert len(SnapshotPool.from_dir(str(tmp_path), decision_interval=2)) == 1
+    env = VecSelfPlay(DummyVecEnv([FightingGameEnv for _ in range(4)]), pool, scripted_prob=0.0, seed=0)
+    env.reset()
+    assert all(opponent is pool.policies[0] for opponent in env.opponents)
+
+    snapshot = pool.policies[0]
+    batch_sizes = []
+    act = snapshot.act
+    snapshot.act = lambda stacked, deterministic: batch_sizes.append(len(stacked)) or act(stacked, deterministic)
+    for _ in range(50):
+        obs, rewards, dones, infos = env.step(np.zeros(4, dtype=np.int64))
+        assert obs.shape == (4, 18)
+    assert batch_sizes == [4] * 50, "All envs facing the snapshot should share one forward pass per step"
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_mirror_obs_swaps_players()
+    test_external_p2_action_overrides_bot()
+    with tempfile.TemporaryDirectory() as d:
+        test_self_play_batches_snapshots(pathlib.Path(d))
+    print("Self-play opponent checks passed!")
@@ -0,0 +1,50 @@
+from envs.fighting_env import FightingGameEnv
+from envs.shm_vec_env import SharedMemoryVecEnv
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv
+import numpy as np
+
+def make_env(rank):
+    def _init():
+        env = Monitor(FightingGameEnv())
+        # The random bot samples from the action space, which env.reset(seed) does not seed
+        env.action_space.seed(rank)
+        return env
+    return _init
+
+def test_shared_memory_matches_dummy():
+    n = 6
+    shm_env = SharedMemoryVecEnv([make_env(i) for i in range(n)], envs_per_worker=4)
+    ref_env = DummyVecEnv([make_env(i) for i in range(n)])
+    try:
+        assert len(shm_env.processes) == 2
+        shm_env.seed(7)
+        ref_env.seed(7)
+        assert np.array_equal(shm_env.reset(), ref_env.reset())
+
+        rng = np.random.default_rng(0)
+        episodes = 0
+        for step in range(1500):
+            actions = rng.integers(0, 9, size=n)
+            obs, rewards, dones, infos = shm_env.step(actions)
+            ref_obs, ref_rewards, ref_dones, ref_infos = ref_env.step(actions)
+
+            assert np.array_equal(obs, ref_obs), f"Observations diverged at step {step}"
+            assert np.array_equal(rewards, ref_rewards)
+            assert np.array_equal(dones, ref_dones)
+            for i in np.flatnonzero(dones):
+                episodes += 1
+                assert np.array_equal(infos[i]["terminal_observation"], ref_infos[i]["terminal_observation"])
+                assert infos[i]["episode"]["r"] == ref_infos[i]["episode"]["r"]
+                assert infos[i]["TimeLimit.truncated"] == ref_infos[i]["TimeLimit.truncated"]
+
+        assert episodes > 0, "Expected some episodes to finish"
+        assert shm_env.get_attr("MAX_STEPS", indices=[0, 5]) == [800, 800]
+        assert shm_env.env_is_wrapped(Monitor) == [True] * n
+    finally:
+        shm_env.close()
+        ref_env.close()
+    print("Shared-memory vec env matches DummyVecEnv!")
+
+if __name__ == "__main__":
+    test_shared_memory_matches_dummy()
@@ -0,0 +1,52 @@
+from sweep import rung_budgets, run_sweep, sample_params, write_table
+import numpy as np
+import json
+import os
+
+CONFIG = {
+    "trials": 4,
+    "seed": 0,
+    "budget": {"min_steps": 256, "max_steps": 512, "eta": 2},
+    "eval_episodes": 8,
+    "fixed": {"n_epochs": 1},
+    "space": {
+        "learning_rate": {"log_uniform": [1e-4, 1e-3]},
+        "n_steps": {"choice": [32, 64]},
+        "batch_size": {"choice": [64]},
+        "ent_coef": {"uniform": [0.0, 0.02]},
+        "num_envs": {"choice": [4, 8]},
+    },
+}
+
+def test_search_space_and_rungs():
+    a = sample_params(CONFIG["space"], np.random.default_rng(0))
+    assert a == sample_params(CONFIG["space"], np.random.default_rng(0))
+    assert 1e-4 <= a["learning_rate"] <= 1e-3 and a["n_steps"] in (32, 64)
+    assert rung_budgets(200000, 5400000, 3) == [200000, 600000, 1800000, 5400000]
+    print("Search space sampling and rung budgets OK!")
+
+def test_successive_halving(tmp_path):
+    out_dir = str(tmp_path)
+    rows = write_table(run_sweep(CONFIG, out_dir, workers=1), out_dir)
+    first = [r for r in rows if r["rung"] == 0]
+    second = [r for r in rows if r["rung"] == 1]
+    assert len(first) == 4 and len(second) == 2
+    # The promoted trials are the best of rung 0 and resumed their saved model
+    ranked = sorted(first, key=lambda r: (r["win_rate"], r["mean_reward"]), reverse=True)
+    assert {r["trial"] for r in second} == {r["trial"] for r in ranked[:2]}
+    assert {r["trial"] for r in first if r["status"] == "pruned"} == {r["trial"] for r in ranked[2:]}
+    assert all(r["steps"] >= 512 and r["status"] == "final" for r in second)
+    assert all(256 <= r["steps"] < 512 + 8 * 64 for r in first)
+    # Trials of a rung are evaluated on the same matches
+    assert len({r["eval_seed"] for r in first}) == 1 and len({r["eval_seed"] for r in second}) == 1
+    with open(os.path.join(out_dir, "results.json")) as f:
+        assert json.load(f) == rows
+    assert os.path.exists(os.path.join(out_dir, "results.csv"))
+    assert os.path.exists(os.path.join(out_dir, second[0]["trial"], "model.zip"))
+    print("Successive halving promotes the best trials!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_search_space_and_rungs()
+    with tempfile.TemporaryDirectory() as d:
+        test_successive_halving(pathlib.Path(d))
@@ -0,0 +1,51 @@
+from envs.fighting_env import FightingGameEnv
+from telemetry import TelemetryCallback, TimedSharedMemoryVecEnv, TimedSubprocVecEnv
+from stable_baselines3 import PPO
+from stable_baselines3.common.logger import configure
+from stable_baselines3.common.vec_env import SubprocVecEnv, VecFrameStack, VecNormalize
+import csv
+import numpy as np
+
+def test_telemetry_logs_rollout_and_worker_timings(tmp_path):
+    env = TimedSharedMemoryVecEnv([FightingGameEnv for _ in range(4)], envs_per_worker=2)
+    env = VecNormalize(VecFrameStack(env, n_stack=4))
+    model = PPO("MlpPolicy", env, n_steps=64, batch_size=64, n_epochs=1, device="cpu")
+    model.set_logger(configure(str(tmp_path), ["csv"]))
+    try:
+        model.learn(total_timesteps=3 * 64 * 4, callback=TelemetryCallback())
+    finally:
+        env.close()
+
+    with open(tmp_path / "progress.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3
+    last = rows[-1]
+    for key in ("env_steps_per_sec", "steps_per_sec", "train_time", "policy_forward_ms", "rss_mb",
+                "worker_latency_ms", "worker_stall_ms", "worker_0_latency_ms", "worker_1_latency_ms", "workers_rss_mb"):
+        assert float(last[f"telemetry/{key}"]) > 0, key
+    assert 0 < float(last["telemetry/rollout_fraction"]) < 1
+    assert float(last["telemetry/env_steps_per_sec"]) > float(last["telemetry/steps_per_sec"])
+    print("Telemetry callback logs throughput and worker timings!")
+
+def test_timed_subproc_env_matches_subproc():
+    envs = [TimedSubprocVecEnv([FightingGameEnv for _ in range(2)]), SubprocVecEnv([FightingGameEnv for _ in range(2)])]
+    try:
+        for env in envs:
+            env.seed(0)
+        first = [env.reset() for env in envs]
+        assert np.array_equal(*first)
+        for action in np.random.default_rng(0).integers(0, 9, size=(50, 2)):
+            (obs_a, rew_a, done_a, _), (obs_b, rew_b, done_b, _) = [env.step(action) for env in envs]
+            assert obs_a.shape == (2, 18) and np.array_equal(obs_a, obs_b)
+            assert np.array_equal(rew_a, rew_b) and np.array_equal(done_a, done_b)
+        assert envs[0].pop_timings()["steps"] == 50
+    finally:
+        for env in envs:
+            env.close()
+    print("Timed subproc env steps like SubprocVecEnv!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as d:
+        test_telemetry_logs_rollout_and_worker_timings(pathlib.Path(d))
+    test_timed_subproc_env_matches_subproc()
@@ -0,0 +1,101 @@
+from envs.batched_fighting_env import BatchedFightingEnv
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import VecFrameStack, VecNormalize
+from tournament import elo_ratings, run_tournament
+import json
+import numpy as np
+import torch as th
+
+def make_checkpoint(models, steps, seed, decision_interval=1):
+    env = VecNormalize(VecFrameStack(BatchedFightingEnv(4, seed=seed), n_stack=4))
+    model = PPO("MlpPolicy", env, device="cpu", seed=seed, n_steps=32, batch_size=64, n_epochs=1)
+    model.learn(128)
+    model.decision_interval = decision_interval
+    model.save(models / f"ppo_fast_checkpoint_{steps}_steps")
+    env.save(str(models / f"ppo_fast_checkpoint_vecnormalize_{steps}_steps.pkl"))
+    return str(models / f"ppo_fast_checkpoint_{steps}_steps.zip")
+
+def scripted_checkpoint(models, name, chaser):
+    # Hand-set weights: the chaser walks up to the opponent and attacks, the other one idles
+    model = PPO("MlpPolicy", VecFrameStack(BatchedFightingEnv(1), n_stack=4), device="cpu", seed=0)
+    net, head = model.policy.mlp_extractor.policy_net, model.policy.action_net
+    with th.no_grad():
+        for layer in (net[0], net[2], head):
+            layer.weight.zero_()
+            layer.bias.zero_()
+        if chaser:
+            # Hidden units 0 / 1: opponent more than 0.15 of the stage away to the right / left (newest frame)
+            net[0].weight[0, 54], net[0].bias[0] = 100.0, -15.0
+            net[0].weight[1, 54], net[0].bias[1] = -100.0, -15.0
+            net[2].weight[0, 0] = net[2].weight[1, 1] = 3.0
+            head.weight[2, 0] = head.weight[1, 1] = 10.0
+            head.bias[7] = 5.0
+        else:
+            head.bias[0] = 20.0
+    model.save(models / name)
+    return str(models / f"{name}.zip")
+
+def test_elo_ratings():
+    results = {("a", "b"): {"wins": 900, "losses": 100, "draws": 0}, ("b", "c"): {"wins": 250, "losses": 250, "draws": 500}}
+    ratings = elo_ratings(["a", "b", "c"], results)
+    # 9:1 odds are 400 * log10(9) = 382 points
+    assert abs(ratings["a"] - ratings["b"] - 382) < 5 and abs(ratings["b"] - ratings["c"]) < 1
+    assert abs(np.mean(list(ratings.values())) - 1500) < 1e-6
+    # An unbeaten player still gets a finite rating
+    assert np.isfinite(elo_ratings(["a", "b"], {("a", "b"): {"wins": 10, "losses": 0, "draws": 0}})["a"])
+    print("Elo ratings OK!")
+
+def test_tournament_caches_matches(tmp_path):
+    paths = [make_checkpoint(tmp_path, steps, seed) for steps, seed in ((100, 0), (200, 1), (300, 2))]
+    cache = str(tmp_path / "cache.json")
+    standings, played = run_tournament(paths, games=8, envs=4, workers=1, cache_path=cache)
+    assert played == 6 and len(standings) == 3
+    assert all(s["games"] == 32 for s in standings)
+    assert sorted(s["rating"] for s in standings) == [s["rating"] for s in standings][::-1]
+
+    # Nothing to replay, same standings
+    again, played = run_tournament(paths, games=8, envs=4, workers=1, cache_path=cache)
+    assert played == 0 and again == standings
+
+    # A new checkpoint only plays its own matches, both sides against everyone
+    paths.append(make_checkpoint(tmp_path, 400, 3))
+    standings, played = run_tournament(paths, games=8, envs=4, workers=1, cache_path=cache)
+    assert played == 6 and len(standings) == 4
+    with open(cache) as f:
+        assert len(json.load(f)) == 12
+    print("Tournament results are cached by checkpoint content!")
+
+def test_tournament_plays_at_decision_interval(tmp_path):
+    paths = [make_checkpoint(tmp_path, steps, seed, decision_interval=2) for steps, seed in ((100, 0), (200, 1))]
+    standings, played = run_tournament(paths, games=2, envs=2, workers=1)
+    assert played == 2 and all(s["games"] == 4 for s in standings)
+
+    # Players acting at different cadences cannot be rated against each other
+    paths.append(make_checkpoint(tmp_path, 300, 2))
+    try:
+        run_tournament(paths, games=2, envs=2, workers=1)
+        assert False, "mixed decision intervals were accepted"
+    except ValueError:
+        pass
+    print("Tournament plays checkpoints at their decision interval!")
+
+def test_tournament_ranks_stronger_player_first(tmp_path):
+    strong, weak = scripted_checkpoint(tmp_path, "chaser", True), scripted_checkpoint(tmp_path, "idle", False)
+    cache = str(tmp_path / "cache.json")
+    standings, played = run_tournament([weak, strong], games=8, envs=4, workers=1, cache_path=cache)
+    assert [s["model"] for s in standings] == [strong, weak]
+    assert standings[0]["rating"] - standings[1]["rating"] > 200 and standings[0]["score"] > 0.9
+    # Another env count plays other games, so its results are not taken from the cache
+    _, played = run_tournament([weak, strong], games=8, envs=8, workers=1, cache_path=cache)
+    assert played == 2
+    print("Tournament ranks the stronger player first!")
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_elo_ratings()
+    with tempfile.TemporaryDirectory() as d:
+        test_tournament_caches_matches(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_tournament_plays_at_decision_interval(pathlib.Path(d))
+    with tempfile.TemporaryDirectory() as d:
+        test_tournament_ranks_stronger_player_first(pathlib.Path(d))
@@ -0,0 +1,191 @@
+import argparse
+import glob
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from multiprocessing import get_context
+
+import numpy as np
+
+from envs.self_play import find_vecnormalize
+from model_hash import content_hash, file_hash, saved_attribute, weights_hash
+
+# Bump when match rules change, so cached results are replayed
+TOURNAMENT_VERSION = 1
+INITIAL_RATING = 1500
+
+
+def player_key(model_path):
+    """Content hash of a checkpoint: its policy weights and the normalization stats it plays with."""
+    stats_path = find_vecnormalize(model_path)
+    return content_hash(weights_hash(model_path), file_hash(stats_path) if stats_path else None)
+
+
+def play_match(p1_path, p2_path, games, envs, seed, deterministic, decision_interval=1):
+    """
+    ``p1_path`` plays P1 and ``p2_path`` P2 for ``games`` games (rounded up to a multiple of the
+    env count), both acting every ``decision_interval`` frames, on the batched engine (or on
+    FightingGameEnvs for an interval above 1). Returns P1's wins, losses and draws (time-outs and double KOs).
+    """
+    import torch as th
+    from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack
+    from envs.batched_fighting_env import BatchedFightingEnv
+    from envs.fighting_env import FightingGameEnv
+    from envs.self_play import FrozenPolicy, SnapshotPool, VecSelfPlay
+
+    th.set_num_threads(1)
+    n = min(envs, games)
+    rounds = math.ceil(games / n)
+    p1 = FrozenPolicy(p1_path, find_vecnormalize(p1_path))
+    pool = SnapshotPool([p2_path], decision_interval=decision_interval)
+    if decision_interval == 1:
+        venv = BatchedFightingEnv(n, seed=seed)
+    else:
+        # The batched engine plays one frame per step; these hold both actions for the interval
+        venv = DummyVecEnv([partial(FightingGameEnv, decision_interval=decision_interval)] * n)
+        venv.seed(seed)
+    env = VecFrameStack(VecSelfPlay(venv, pool, scripted_prob=0.0, deterministic=deterministic, refresh_interval=0, seed=seed),
+                        n_stack=4)
+    per_env = [[] for _ in range(n)]
+    obs = env.reset()
+    while min(len(outcomes) for outcomes in per_env) < rounds:
+        obs, _, dones, infos = env.step(p1.act(obs, deterministic))
+        for i in np.flatnonzero(dones):
+            # P2 knocked out: P1 wins
+            per_env[i].append(int(infos[i]["is_win"]) - int(infos[i]["is_loss"]))
+    env.close()
+    outcomes = [o for episodes in per_env for o in episodes[:rounds]]
+    return {"wins": outcomes.count(1), "losses": outcomes.count(-1), "draws": outcomes.count(0)}
+
+
+def elo_ratings(players, results, prior_games=2):
+    """
+    Maximum-likelihood Bradley-Terry strengths from ``results[(p1, p2)]`` on the Elo scale
+    (400 points = 10:1 odds), centered on INITIAL_RATING. Unlike sequential Elo updates this
+    does not depend on match order. Draws count half a win; every player also gets
+    ``prior_games`` drawn games against an average opponent so unbeaten players stay finite.
+    """
+    index = {p: i for i, p in enumerate(players)}
+    k = len(players)
+    wins = np.zeros((k, k))
+    for (a, b), r in results.items():
+        if a in index and b in index:
+            i, j = index[a], index[b]
+            wins[i, j] += r["wins"] + r["draws"] / 2
+            wins[j, i] += r["losses"] + r["draws"] / 2
+    games = wins + wins.T
+    score = wins.sum(axis=1) + prior_games / 2
+    gamma = np.ones(k)
+    # Minorization-maximization (Hunter 2004); the virtual opponent has strength 1
+    for _ in range(10000):
+        denom = (games / (gamma[:, None] + gamma[None, :])).sum(axis=1) + prior_games / (gamma + 1)
+        updated = score / denom
+        if np.allclose(updated, gamma, rtol=1e-10):
+            break
+        gamma = updated
+    ratings = 400 * np.log10(gamma)
+    return dict(zip(players, (ratings - ratings.mean() + INITIAL_RATING).tolist()))
+
+
+def load_cache(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(path, cache):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, path)
+
+
+def run_tournament(model_paths, games=64, envs=32, workers=None, cache_path=None, seed=0, deterministic=False):
+    """
+    Round-robin over ``model_paths``, every checkpoint against every other once as P1 and once as
+    P2. Results are cached by checkpoint content, so only pairs involving new checkpoints are
+    played. Every checkpoint must have been trained with the same decision interval (action
+    repeat), since both players act at that cadence. Returns (standings sorted by rating, number
+    of matches played).
+    """
+    keys = {path: player_key(path) for path in model_paths}
+    intervals = {path: saved_attribute(path, "decision_interval", 1) for path in model_paths}
+    if len(set(intervals.values())) > 1:
+        raise ValueError(f"Checkpoints were trained with different decision intervals, rate them separately: {intervals}")
+    decision_interval = next(iter(intervals.values()), 1)
+    # envs splits the games into seeded batches, so it changes which games are played
+    settings = {"games": games, "envs": envs, "seed": seed, "deterministic": deterministic,
+                "decision_interval": decision_interval, "version": TOURNAMENT_VERSION}
+    cache = load_cache(cache_path)
+    results, todo = {}, []
+    for a in model_paths:
+        for b in model_paths:
+            if keys[a] == keys[b]:
+                continue
+            match_key = content_hash(keys[a], keys[b], settings)
+            if match_key in cache:
+                results[(keys[a], keys[b])] = cache[match_key]
+            else:
+                todo.append((a, b, match_key))
+
+    if todo:
+        print(f"Playing {len(todo)} matches ({len(results)} cached) with {workers or os.cpu_count()} workers...")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+            futures = {pool.submit(play_match, a, b, games, envs, seed, deterministic, decision_interval): (a, b, key)
+                       for a, b, key in todo}
+            for future in as_completed(futures):
+                a, b, match_key = futures[future]
+                result = future.result()
+                results[(keys[a], keys[b])] = cache[match_key] = dict(result, p1=os.path.basename(a), p2=os.path.basename(b))
+                # Written after every match so an interrupted tournament keeps its progress
+                if cache_path: save_cache(cache_path, cache)
+
+    ratings = elo_ratings(sorted(set(keys.values())), results)
+    standings = []
+    for path in model_paths:
+        played = [(r, a == keys[path]) for (a, b), r in results.items() if keys[path] in (a, b)]
+        n = sum(r["wins"] + r["losses"] + r["draws"] for r, _ in played)
+        points = sum((r["wins"] if as_p1 else r["losses"]) + r["draws"] / 2 for r, as_p1 in played)
+        standings.append({"model": path, "rating": ratings[keys[path]], "games": n, "score": points / n if n else 0.0,
+                          "hash": keys[path]})
+    standings.sort(key=lambda s: s["rating"], reverse=True)
+    return standings, len(todo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin tournament between checkpoints with Elo ratings.")
+    parser.add_argument("models", nargs="*", help="checkpoint zips (default: --pattern in --models-dir)")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--pattern", default="ppo_fast_checkpoint_*_steps.zip")
+    parser.add_argument("--games", type=int, default=64, help="games per ordered pair")
+    parser.add_argument("--envs", type=int, default=32, help="parallel matches per pair")
+    parser.add_argument("--workers", type=int, default=None, help="pairs played in parallel (default: CPU count)")
+    parser.add_argument("--cache", default="models/tournament_cache.json")
+    parser.add_argument("--deterministic", action="store_true", help="greedy actions instead of sampling")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="models/tournament.json")
+    args = parser.parse_args()
+
+    paths = args.models or sorted(glob.glob(os.path.join(args.models_dir, args.pattern)))
+    if len(paths) < 2:
+        print(f"Need at least two checkpoints, found {len(paths)}")
+        return
+    start = time.perf_counter()
+    standings, played = run_tournament(paths, args.games, args.envs, args.workers, args.cache, args.seed, args.deterministic)
+
+    print(f"\n{'#':>3}  {'checkpoint':<44} {'Elo':>7} {'score':>7} {'games':>7}")
+    for rank, s in enumerate(standings, 1):
+        print(f"{rank:>3}  {os.path.basename(s['model']):<44} {s['rating']:7.0f} {100 * s['score']:6.1f}% {s['games']:7d}")
+    print(f"\n{played} new matches in {time.perf_counter() - start:.0f}s")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(standings, f, indent=2)
+    print(f"Standings written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,16 @@ from stable_baselines3 import PPO
 from stable_baselines3.common.vec_env import DummyVecEnv, VecFrameStack
 from stable_baselines3.common.evaluation import evaluate_policy
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.callbacks import CheckpointCallback
+from stable_baselines3.common.callbacks import CallbackList
 from gymnasium.wrappers import TimeLimit
 from envs.fighting_env import FightingGameEnv
+from checkpoints import AsyncCheckpointCallback
+from telemetry import TelemetryCallback
 import os
 
 def train():
+    telemetry = False # Log throughput, rollout/update split and memory to tensorboard
+
     # Create environment
     def make_env():
         env = FightingGameEnv()
@@ -36,16 +40,19 @@ def train():
         clip_range=0.2,
     )
     
-    # Setup Checkpoint Callback
-    checkpoint_callback = CheckpointCallback(
+    # Setup Checkpoint Callback (background writes, latest 5 + best 2 by evaluation kept)
+    checkpoint_callback = AsyncCheckpointCallback(
         save_freq=100_000,
         save_path="./models/",
-        name_prefix="ppo_fighting_checkpoint"
+        name_prefix="ppo_fighting_checkpoint",
+        keep_last=5,
+        keep_best=2
     )
     
     # Train for 1M timesteps as per PLAN.md
     print("Starting training for 1,000,000 timesteps...")
-    model.learn(total_timesteps=1_000_000, callback=checkpoint_callback)
+    callbacks = [checkpoint_callback] + ([TelemetryCallback()] if telemetry else [])
+    model.learn(total_timesteps=1_000_000, callback=CallbackList(callbacks))
     
     # Save the final model
     os.makedirs("models", exist_ok=True)
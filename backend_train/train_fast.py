@@ -1,37 +1,103 @@
 import torch as th
 from stable_baselines3 import PPO
-from stable_baselines3.common.vec_env import SubprocVecEnv, VecFrameStack, VecNormalize
+from stable_baselines3.common.vec_env import SubprocVecEnv, VecFrameStack, VecNormalize, VecMonitor
 from stable_baselines3.common.monitor import Monitor
-from stable_baselines3.common.callbacks import CheckpointCallback
+from stable_baselines3.common.callbacks import CallbackList
 from gymnasium.wrappers import TimeLimit
 from envs.fighting_env import FightingGameEnv
+from envs.batched_fighting_env import BatchedFightingEnv
+from envs.shm_vec_env import SharedMemoryVecEnv
+from envs.fused_vec_env import FusedVecEnv
+from envs.rollout_dataset import VecRecordRollouts
+from envs.self_play import SnapshotPool, VecSelfPlay
+from async_ppo import AsyncActorPool, AsyncPPO
+from fast_inference import TracedPPO
+from checkpoints import AsyncCheckpointCallback
+from autotune import tuned_layout
+from telemetry import TelemetryCallback, TimedSharedMemoryVecEnv, TimedSubprocVecEnv
 import os
 
-def make_env(rank, seed=0):
+def make_env(rank, seed=0, monitor=True, decision_interval=1):
+    # monitor=False leaves the time limit and episode stats to FusedVecEnv
     def _init():
-        env = FightingGameEnv()
-        env = TimeLimit(env, max_episode_steps=800)
-        env = Monitor(env)
+        env = FightingGameEnv(decision_interval=decision_interval)
+        if monitor:
+            env = TimeLimit(env, max_episode_steps=800)
+            env = Monitor(env)
         env.reset(seed=seed + rank)
         return env
     return _init
 
+def make_vec_env(vec_env_type, num_cpu, envs_per_worker=1, seed=0, self_play=False, timed=False, monitor=True, record=None,
+                 decision_interval=1):
+    # "subproc": one env per process, "shared_memory": envs_per_worker envs per process,
+    # "batched": every match simulated with array ops in this process.
+    # timed=True uses the variants that record per-worker latency for TelemetryCallback,
+    # record=<dir> streams the raw transitions into a RolloutDataset there
+    num_envs = num_cpu * envs_per_worker
+    if decision_interval > 1 and vec_env_type == "batched":
+        raise ValueError("decision_interval > 1 needs FightingGameEnv processes, not the batched engine")
+    if vec_env_type == "batched":
+        env = BatchedFightingEnv(num_envs, seed=seed)
+        if monitor: env = VecMonitor(env)
+    elif vec_env_type == "shared_memory":
+        # Self-play sends (p1, p2) action pairs through the shared action buffer
+        action_shape = (2,) if self_play else None
+        vec_cls = TimedSharedMemoryVecEnv if timed else SharedMemoryVecEnv
+        env = vec_cls([make_env(i, seed, monitor, decision_interval) for i in range(num_envs)], envs_per_worker=envs_per_worker,
+                      action_shape=action_shape)
+    else:
+        vec_cls = TimedSubprocVecEnv if timed else SubprocVecEnv
+        env = vec_cls([make_env(i, seed, monitor, decision_interval) for i in range(num_cpu)])
+    if self_play:
+        # P2 is either the scripted bot or a recent checkpoint, drawn per episode
+        env = VecSelfPlay(env, SnapshotPool.from_dir("models", max_size=8, decision_interval=decision_interval), scripted_prob=0.5, seed=seed)
+    if record:
+        env = VecRecordRollouts(env, record)
+    return env
+
 def train():
     # 1. Configuration
-    num_cpu = 10 
+    num_cpu = 10 # Worker processes; auto_tune may re-split num_cpu * envs_per_worker for "shared_memory" / "async"
     total_timesteps = 5_000_000
+    vec_env_type = "subproc" # "subproc", "shared_memory", "batched" or "async"
+    envs_per_worker = 1 # Envs per process for "shared_memory" / "async" (also multiplies the batched env count)
+    self_play = False # Mix frozen checkpoints from models/ into the P2 opponents (not with "async")
+    telemetry = False # Log throughput, rollout/update split, worker latency and memory to tensorboard
+    fused_wrappers = False # One FusedVecEnv instead of Monitor + VecFrameStack + VecNormalize (not with "async")
+    record_rollouts = None # Directory to stream every raw transition into, e.g. "rollouts/ppo_fast" (not with "async")
+    decision_interval = 1 # Frames each action is held for (action repeat); the exported model keeps the cadence (not with "batched")
+    traced_inference = False # Collect rollouts with a frozen TorchScript policy, re-traced after every update (not with "async")
+    auto_tune = True # Split num_cpu * envs_per_worker envs between processes the fastest way on this machine (see autotune.py); no-op with "subproc" / "batched"
+    
+    if auto_tune:
+        num_cpu, envs_per_worker = tuned_layout(vec_env_type, default=(num_cpu, envs_per_worker), decision_interval=decision_interval)
     
     # 2. Setup Parallel Environments
-    print(f"Initializing {num_cpu} parallel environments...")
-    env = SubprocVecEnv([make_env(i) for i in range(num_cpu)])
-    env = VecFrameStack(env, n_stack=4)
-    # Add normalization for observations and rewards
-    env = VecNormalize(env, norm_obs=True, norm_reward=True, clip_obs=10.)
+    if vec_env_type == "async":
+        # Actor processes frame-stack their own envs and keep collecting while PPO updates
+        env = AsyncActorPool([make_env(i, decision_interval=decision_interval) for i in range(num_cpu * envs_per_worker)],
+                             envs_per_actor=envs_per_worker, n_stack=4)
+    elif fused_wrappers:
+        env = make_vec_env(vec_env_type, num_cpu, envs_per_worker, self_play=self_play, timed=telemetry, monitor=False,
+                           record=record_rollouts, decision_interval=decision_interval)
+        # Frame stacking, episode stats and normalization for observations and rewards in one pass
+        env = FusedVecEnv(env, n_stack=4, norm_obs=True, norm_reward=True, clip_obs=10.)
+    else:
+        env = make_vec_env(vec_env_type, num_cpu, envs_per_worker, self_play=self_play, timed=telemetry, record=record_rollouts,
+                           decision_interval=decision_interval)
+        env = VecFrameStack(env, n_stack=4)
+    print(f"Initialized {env.num_envs} parallel environments ({vec_env_type})...")
+    if not isinstance(env, FusedVecEnv):
+        # Add normalization for observations and rewards
+        env = VecNormalize(env, norm_obs=True, norm_reward=True, clip_obs=10.)
     
     # 3. Setup PPO with ReLU for better TFJS compatibility
     policy_kwargs = dict(activation_fn=th.nn.ReLU)
     
-    model = PPO(
+    if vec_env_type == "async": algo = AsyncPPO
+    else: algo = TracedPPO if traced_inference else PPO
+    model = algo(
         "MlpPolicy",
         env,
         policy_kwargs=policy_kwargs,
@@ -47,22 +113,35 @@ def train():
         clip_range=0.2,
         ent_coef=0.02, # Slightly higher entropy to encourage breaking out of "staring contest"
     )
+    print(f"Rollout size: {env.num_envs} envs x {model.n_steps} steps = {env.num_envs * model.n_steps} transitions per update")
+    # Saved with every checkpoint; evaluate_only.py and export_model.py read it back
+    model.decision_interval = decision_interval
     
     # 4. Callbacks
-    checkpoint_callback = CheckpointCallback(
-        save_freq=max(100_000 // num_cpu, 1),
+    # Written on a background thread; keeps the 10 latest checkpoints and the 3 best in a short evaluation against the bot
+    checkpoint_callback = AsyncCheckpointCallback(
+        save_freq=max(100_000 // env.num_envs, 1),
         save_path="./models/",
-        name_prefix="ppo_fast_checkpoint"
+        name_prefix="ppo_fast_checkpoint",
+        # Snapshots need their normalization stats to be replayed as self-play opponents
+        save_vecnormalize=True,
+        keep_last=10,
+        keep_best=3
     )
+    callbacks = [checkpoint_callback] + ([TelemetryCallback()] if telemetry else [])
     
     print(f"Starting High-Speed CPU training for {total_timesteps} steps...")
-    model.learn(total_timesteps=total_timesteps, callback=checkpoint_callback)
+    model.learn(total_timesteps=total_timesteps, callback=CallbackList(callbacks))
     
     # 5. Save
     os.makedirs("models", exist_ok=True)
+    # Pairs the final model with its stats (find_vecnormalize); checkpoints carry their own
+    model.vec_normalize_file = "vec_normalize.pkl"
     model.save("models/neural_nemesis_pro")
     # Save the normalization stats as well
     env.save("models/vec_normalize.pkl")
+    # Writes out the last partial block of recorded rollouts
+    env.close()
     print("Training Complete. Model and stats saved to models/")
 
 if __name__ == "__main__":
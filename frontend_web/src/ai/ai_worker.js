@@ -3,44 +3,67 @@ import * as tf from '@tensorflow/tfjs';
 const N_STACK = 4;
 const FEATURES = 18;
 
+// Fixed-capacity ring of transitions in preallocated typed arrays: constant-time push that
+// overwrites the oldest entry once full, and no per-transition objects on the heap.
 class ReplayBuffer {
-    constructor(maxSize = 100000) {
-        this.buffer = [];
+    constructor(maxSize = 100000, stateSize = FEATURES * N_STACK) {
         this.maxSize = maxSize;
+        this.stateSize = stateSize;
+        this.states = new Float32Array(maxSize * stateSize);
+        this.actions = new Int32Array(maxSize);
+        this.rewards = new Float32Array(maxSize);
+        this.dones = new Uint8Array(maxSize);
+        this.head = 0;
+        this.size = 0;
     }
 
-    push(transition) {
-        if (this.buffer.length >= this.maxSize) {
-            this.buffer.shift();
-        }
-        this.buffer.push(transition);
+    push(state, action, reward, done) {
+        this.states.set(state, this.head * this.stateSize);
+        this.actions[this.head] = action;
+        this.rewards[this.head] = reward;
+        this.dones[this.head] = done ? 1 : 0;
+        this.head = (this.head + 1) % this.maxSize;
+        this.size = Math.min(this.size + 1, this.maxSize);
     }
 
     clear() {
-        this.buffer = [];
+        this.head = 0;
+        this.size = 0;
     }
 
+    // Uniform sample with replacement, gathered into flat arrays ready for tf.tensor2d / tensor1d
     sample(batchSize) {
-        if (this.buffer.length === 0) return [];
-        
-        const batch = [];
+        if (this.size === 0) return null;
+
+        const d = this.stateSize;
+        const states = new Float32Array(batchSize * d);
+        const actions = new Int32Array(batchSize);
+        const rewards = new Float32Array(batchSize);
         for (let i = 0; i < batchSize; i++) {
-            const index = Math.floor(Math.random() * this.buffer.length);
-            batch.push(this.buffer[index]);
+            const index = Math.floor(Math.random() * this.size);
+            states.set(this.states.subarray(index * d, (index + 1) * d), i * d);
+            actions[i] = this.actions[index];
+            rewards[i] = this.rewards[index];
         }
-        return batch;
+        return { states, actions, rewards };
     }
 
-    get length() { return this.buffer.length; }
+    get length() { return this.size; }
 }
 
 let model = null;
 let normStats = null;
 let frameBuffer = [];
 let currentStack = null;
+// Models trained with action repeat decide every decisionInterval frames and hold the action in between
+let decisionInterval = 1;
+let frameCount = 0;
+let lastDecision = null;
+let pendingExperience = null;
 let replayBuffer = new ReplayBuffer(100000);
 let isInitialized = false;
-let outputNames = [];
+let baseHeads = null;
+let latentNodes = [];
 
 // Entropy/Difficulty settings
 let difficulty = 'hard'; // easy, medium, hard
@@ -103,17 +126,55 @@ async function loadWeights() {
     });
 }
 
-// In GraphModel, weights are stored in model.weights object
-// The structure is { [name: string]: tf.Tensor[] }
-const findWeight = (name) => {
-    if (!model) return null;
-    const weightGroup = model.weights[name];
-    if (!weightGroup || weightGroup.length === 0) {
-        console.error(`AI Worker: Weight ${name} not found in model.weights`);
-        return null;
+// Models exported by export_model.py name their outputs (logits, value, latent_pi, latent_vf)
+// and take any batch size. Older exports only had the internal ReLU nodes of a batch-1 graph.
+const LEGACY_LATENT_NODES = ['PartitionedCall/model/tf.nn.relu_2/Relu', 'PartitionedCall/model/tf.nn.relu_3/Relu'];
+const LEGACY_HEAD_WEIGHTS = { actorWeights: 'unknown_12', actorBias: 'unknown_16', criticWeights: 'unknown_11', criticBias: 'unknown_15' };
+
+function findLatentNodes() {
+    const outputs = (model.modelSignature && model.modelSignature.outputs) || {};
+    if (outputs.latent_pi && outputs.latent_vf) {
+        return [outputs.latent_pi.name, outputs.latent_vf.name];
     }
-    return weightGroup[0];
-};
+    console.warn("AI Worker: Model has no named latent outputs, using legacy nodes (batch size 1)");
+    return LEGACY_LATENT_NODES;
+}
+
+// Initial actor/critic heads as plain arrays: heads.json from the exporter, else the legacy weight names
+async function loadBaseHeads(base) {
+    const response = await fetch(`${base}assets/model/heads.json`);
+    if (response.ok) {
+        const heads = await response.json();
+        return {
+            actorWeights: heads.actor.weight, actorBias: heads.actor.bias,
+            criticWeights: heads.critic.weight, criticBias: heads.critic.bias
+        };
+    }
+    const legacy = {};
+    for (const [key, name] of Object.entries(LEGACY_HEAD_WEIGHTS)) {
+        const weightGroup = model.weights[name];
+        if (!weightGroup || weightGroup.length === 0) {
+            throw new Error(`Head weight ${name} not found in model.json and no heads.json`);
+        }
+        legacy[key] = await weightGroup[0].array();
+    }
+    return legacy;
+}
+
+// One forward pass of the frozen backbone for a [batch, 72] tensor
+function executeLatents(states) {
+    if (latentNodes !== LEGACY_LATENT_NODES) {
+        return model.execute(states, latentNodes);
+    }
+    const alList = [];
+    const clList = [];
+    for (let j = 0; j < states.shape[0]; j++) {
+        const out = model.execute(states.slice([j, 0], [1, -1]), latentNodes);
+        alList.push(out[0]);
+        clList.push(out[1]);
+    }
+    return [tf.concat(alList, 0), tf.concat(clList, 0)];
+}
 
 async function init(baseUrl = '/') {
     try {
@@ -124,6 +185,8 @@ async function init(baseUrl = '/') {
         // Ensure baseUrl ends with a slash if not empty
         const base = baseUrl.endsWith('/') ? baseUrl : baseUrl + '/';
         model = await tf.loadGraphModel(`${base}assets/model/model.json`);
+        latentNodes = findLatentNodes();
+        baseHeads = await loadBaseHeads(base);
         
         // Try to load from IndexedDB first
         const saved = await loadWeights();
@@ -134,24 +197,10 @@ async function init(baseUrl = '/') {
             criticWeights = tf.variable(tf.tensor2d(saved.criticWeights));
             criticBias = tf.variable(tf.tensor1d(saved.criticBias));
         } else {
-            // Map weight indices from model.json (converted SB3 PPO)
-            // unknown_12: Policy/Actor Weights [64, 9]
-            // unknown_16: Policy/Actor Bias [9]
-            // unknown_11: Value/Critic Weights [64, 1]
-            // unknown_15: Value/Critic Bias [1]
-            const w12 = findWeight('unknown_12');
-            const w16 = findWeight('unknown_16');
-            const w11 = findWeight('unknown_11');
-            const w15 = findWeight('unknown_15');
-
-            if (!w12 || !w16 || !w11 || !w15) {
-                throw new Error("Required head weights not found in model. Check model.json names.");
-            }
-
-            actorWeights = tf.variable(w12);
-            actorBias = tf.variable(w16);
-            criticWeights = tf.variable(w11);
-            criticBias = tf.variable(w15);
+            actorWeights = tf.variable(tf.tensor2d(baseHeads.actorWeights));
+            actorBias = tf.variable(tf.tensor1d(baseHeads.actorBias));
+            criticWeights = tf.variable(tf.tensor2d(baseHeads.criticWeights));
+            criticBias = tf.variable(tf.tensor1d(baseHeads.criticBias));
         }
 
         optimizer = tf.train.adam(LEARNING_RATE);
@@ -159,10 +208,24 @@ async function init(baseUrl = '/') {
 
         console.log("AI Worker: Nemesis Heads initialized as trainable variables.");
 
-        console.log("AI Worker: Fetching normalization stats...");
-        const statsResponse = await fetch(`${base}assets/model/norm_stats.json`);
-        normStats = await statsResponse.json();
-        console.log("AI Worker: Normalization stats loaded");
+        decisionInterval = model.metadata?.export_info?.decision_interval || 1;
+        console.log(`AI Worker: Deciding every ${decisionInterval} frame(s)`);
+
+        // Newer exports fold the normalization into the graph and take raw observations,
+        // as do models trained without normalization
+        const exportInfo = model.metadata?.export_info;
+        if (exportInfo?.normalization === 'none') {
+            normStats = null;
+            console.log("AI Worker: Model was exported without normalization");
+        } else if (exportInfo?.normalization_folded) {
+            normStats = null;
+            console.log("AI Worker: Normalization is folded into the model");
+        } else {
+            console.log("AI Worker: Fetching normalization stats...");
+            const statsResponse = await fetch(`${base}assets/model/norm_stats.json`);
+            normStats = await statsResponse.json();
+            console.log("AI Worker: Normalization stats loaded");
+        }
         
         isInitialized = true;
         self.postMessage({ type: 'ready' });
@@ -180,6 +243,19 @@ function normalize(obs) {
     });
 }
 
+// Round over: flush the last held decision's transition and start the next match from an empty
+// frame stack, on a decision frame, with no reward carried over
+function endEpisode() {
+    if (pendingExperience && currentStack) {
+        replayBuffer.push(currentStack, pendingExperience.action, pendingExperience.reward, true);
+    }
+    pendingExperience = null;
+    frameBuffer = [];
+    currentStack = null;
+    frameCount = 0;
+    lastDecision = null;
+}
+
 function updateFrameBuffer(newState) {
     if (frameBuffer.length === 0) {
         for (let i = 0; i < N_STACK; i++) {
@@ -213,15 +289,12 @@ self.onmessage = async (e) => {
     if (type === 'reset_weights') {
         console.log("AI Worker: Resetting weights to base model...");
         try {
-            const w12 = findWeight('unknown_12');
-            const w16 = findWeight('unknown_16');
-            const w11 = findWeight('unknown_11');
-            const w15 = findWeight('unknown_15');
-            
-            actorWeights.assign(w12);
-            actorBias.assign(w16);
-            criticWeights.assign(w11);
-            criticBias.assign(w15);
+            tf.tidy(() => {
+                actorWeights.assign(tf.tensor2d(baseHeads.actorWeights));
+                actorBias.assign(tf.tensor1d(baseHeads.actorBias));
+                criticWeights.assign(tf.tensor2d(baseHeads.criticWeights));
+                criticBias.assign(tf.tensor1d(baseHeads.criticBias));
+            });
             
             const request = indexedDB.deleteDatabase(DB_NAME);
             request.onsuccess = () => console.log("AI Worker: IndexedDB cleared");
@@ -233,25 +306,37 @@ self.onmessage = async (e) => {
         return;
     }
 
+    if (type === 'end_episode') {
+        endEpisode();
+        return;
+    }
+
     if (type === 'predict') {
         if (!isInitialized || !model) return;
 
+        // Between decisions: repeat the held action without running the model. Like in training,
+        // the frame stack only sees the frames a decision is made on.
+        if (frameCount++ % decisionInterval !== 0 && lastDecision) {
+            self.postMessage(lastDecision);
+            return;
+        }
+        if (pendingExperience && currentStack) {
+            replayBuffer.push(currentStack, pendingExperience.action, pendingExperience.reward, pendingExperience.done);
+        }
+        pendingExperience = null;
+
         const stackedState = updateFrameBuffer(payload);
         const normalizedStack = normalize(stackedState);
         
-        // Cache the current stack for the NEXT store_experience call
-        currentStack = [...stackedState];
+        // Cache the network input for the NEXT store_experience call; stats are fixed after init,
+        // so training can reuse it without normalizing again. A copy, since a folded model's
+        // normalize() hands back frameBuffer itself.
+        currentStack = Float32Array.from(normalizedStack);
 
         try {
             tf.tidy(() => {
                 const inputTensor = tf.tensor2d([normalizedStack], [1, FEATURES * N_STACK]);
-                
-                const latentActorNode = 'PartitionedCall/model/tf.nn.relu_2/Relu';
-                const latentCriticNode = 'PartitionedCall/model/tf.nn.relu_3/Relu';
-                
-                const latents = model.execute(inputTensor, [latentActorNode, latentCriticNode]);
-                const actorLatent = latents[0];
-                const criticLatent = latents[1];
+                const [actorLatent, criticLatent] = executeLatents(inputTensor);
 
                 const logits = actorLatent.matMul(actorWeights).add(actorBias);
                 const value = criticLatent.matMul(criticWeights).add(criticBias);
@@ -280,12 +365,13 @@ self.onmessage = async (e) => {
 
                 const confidence = value.dataSync()[0];
                 
-                self.postMessage({ 
+                lastDecision = {
                     type: 'action', 
                     payload: action,
                     confidence: confidence,
                     probs: Array.from(probs)
-                });
+                };
+                self.postMessage(lastDecision);
             });
         } catch (err) {
             console.error("AI Worker: Prediction error", err);
@@ -295,12 +381,15 @@ self.onmessage = async (e) => {
     if (type === 'store_experience') {
         // payload: { state, action, reward, nextState, done }
         // We use the cached currentStack for the 'state' to include history
-        if (currentStack) {
-            replayBuffer.push({
-                ...payload,
-                stackedState: currentStack
-            });
+        if (decisionInterval > 1) {
+            // One transition per decision: rewards of the repeated frames add up until the next one
+            pendingExperience = pendingExperience || { action: payload.action, reward: 0, done: false };
+            pendingExperience.reward += payload.reward;
+            pendingExperience.done = pendingExperience.done || payload.done;
+        } else if (currentStack) {
+            replayBuffer.push(currentStack, payload.action, payload.reward, payload.done);
         }
+        if (payload.done) endEpisode();
         
         if (replayBuffer.length % 100 === 0) {
             self.postMessage({ type: 'stats', bufferSize: replayBuffer.length });
@@ -323,30 +412,16 @@ self.onmessage = async (e) => {
         
         for (let i = 0; i < iterations; i++) {
             const batch = replayBuffer.sample(batchSize);
-            if (batch.length === 0) continue;
+            if (!batch) continue;
             
             // 1. Compute Advantage and Latents outside minimize to control gradients
-            // Note: GraphModel has fixed batch size of 1, so we must execute sample-by-sample
+            // The frozen backbone runs once for the whole batch
             const { states, rewards, actions, adv, actorLatent, criticLatent } = tf.tidy(() => {
-                const s = tf.tensor2d(batch.map(b => normalize(b.stackedState)), [batchSize, FEATURES * N_STACK]);
-                const r = tf.tensor1d(batch.map(b => b.reward), 'float32');
-                const a = tf.tensor1d(batch.map(b => b.action), 'int32');
+                const s = tf.tensor2d(batch.states, [batchSize, FEATURES * N_STACK]);
+                const r = tf.tensor1d(batch.rewards, 'float32');
+                const a = tf.tensor1d(batch.actions, 'int32');
 
-                const latentActorNode = 'PartitionedCall/model/tf.nn.relu_2/Relu';
-                const latentCriticNode = 'PartitionedCall/model/tf.nn.relu_3/Relu';
-                
-                // Process each sample in the batch individually for the frozen backbone
-                const alList = [];
-                const clList = [];
-                for (let j = 0; j < batchSize; j++) {
-                    const singleState = s.slice([j, 0], [1, -1]);
-                    const out = model.execute(singleState, [latentActorNode, latentCriticNode]);
-                    alList.push(out[0]);
-                    clList.push(out[1]);
-                }
-                
-                const al = tf.concat(alList, 0);
-                const cl = tf.concat(clList, 0);
+                const [al, cl] = executeLatents(s);
 
                 // Advantage = Reward - CurrentValue
                 const values = cl.matMul(criticWeights).add(criticBias).squeeze();
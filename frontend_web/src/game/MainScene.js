@@ -531,6 +531,8 @@ export default class MainScene extends Phaser.Scene {
                 
                 // Trigger Training at end of round
                 console.log("MainThread: Round ended. Triggering AI Training...");
+                // The next round starts from a fresh frame stack and decision cadence
+                this.aiWorker.postMessage({ type: 'end_episode' });
                 this.aiWorker.postMessage({ type: 'train' });
                 
                 // Reset round after a delay